@@ -1,9 +1,24 @@
+import time
+import hashlib
 import streamlit as st
 import pandas as pd
-from src.client.loader import Loader
+from src.client.trabajos import ColaTrabajos
 
 # # Modelo de base de datos
 
+# Nombre de cada fase en la página
+NOMBRES_FASES = {'carga': 'Cargando el archivo',
+                 'fase_01': 'Fase 1: evitar backorder',
+                 'fase_02': 'Fase 2: alcanzar safety stock',
+                 'fase_03': 'Fase 3: incrementar DIO',
+                 'flujo': 'Flujo de despacho',
+                 'fase_04': 'Fase 4: modelo de costo mínimo',
+                 'reportes': 'Generando reportes'}
+
+ICONOS_FASES = {'pendiente': '⬜', 'ejecutando': '⏳', 'terminada': '✅', 'fallida': '❌'}
+
+# Segundos entre cada consulta del avance del trabajo
+INTERVALO_AVANCE = 1.0
 
 
 @st.cache_data
@@ -12,74 +27,116 @@ def convert_df(df):
     return df.to_csv().encode("utf-8")
 
 
-st.set_page_config(layout="wide")
+@st.cache_resource
+def obtener_cola() -> ColaTrabajos:
+    # Una sola cola por servidor, compartida por todas las sesiones
+    return ColaTrabajos(directorio='trabajos')
 
-st.button(label='call_back')
 
-st.title('Optimizador BIOS. V2.72')
+@st.cache_resource
+def encolar_archivo(hash_archivo: str, intento: int, nombre: str, _contenido: bytes) -> str:
+    # Las subidas con el mismo contenido reutilizan el trabajo y sus resultados, aunque vengan
+    # de otra sesión. El contenido no entra en la llave, ya está representado por el hash.
+    return obtener_cola().encolar(nombre, _contenido, formato='parquet')
 
-if 'resultado' not in st.session_state:
 
-    st.write('Seleccione un archivo para trabajar')
+@st.cache_resource
+def leer_reportes(id_trabajo: str) -> dict:
+
+    cola = obtener_cola()
+
+    return {nombre: pd.read_parquet(cola.reporte(id_trabajo, f"reporte_{nombre}.parquet"))
+            for nombre in ['puertos', 'despachos', 'plantas']}
+
+
+def mostrar_avance(cola: ColaTrabajos, id_trabajo: str) -> dict:
+
+    # Actualiza el avance por fase en la página hasta que el trabajo termine
+    contenedor = st.empty()
 
-    uploaded_file = st.file_uploader("Seleccione un archivo para trabajar")
+    while True:
 
-    if uploaded_file is not None:
+        estado = cola.estado(id_trabajo)
+        fases = estado['fases']
+        terminadas = len([x for x in fases.values() if x['estado'] == 'terminada'])
 
-        with st.spinner(text='Espere un momento por favor, se esta cargando el archivo'):
+        with contenedor.container():
+            if estado['estado'] == 'en_cola':
+                st.write('El archivo está en cola, se ejecutará cuando termine alguno de los trabajos en curso')
 
-            loader = Loader(input_file=uploaded_file)
-            loader.load_data()
+            st.progress(terminadas/len(fases), text=f"{terminadas} de {len(fases)} fases")
 
-        with st.spinner(text='Espere un momento por favor, se esta ejecutando fase 1'):    
-            loader.gen_solucion_fase_01()
-        with st.spinner(text='Espere un momento por favor, se esta ejecutando fase 2'):
-            loader.gen_solucion_fase_02()
-        with st.spinner(text='Espere un momento por favor, se esta ejecutando fase 3'):
-            loader.gen_solucion_fase_03()
-        with st.spinner(text='Espere un momento por favor, se esta ejecutando fase 4'):
-            loader.gen_solucion_fase_04()
+            for fase, valores in fases.items():
+                segundos = f" ({valores['segundos']:.1f} s)" if valores['segundos'] is not None else ''
+                st.write(f"{ICONOS_FASES[valores['estado']]} {NOMBRES_FASES[fase]}{segundos}")
 
-        plantas_df, puertos_df, despachos_df = loader.save_reports()
-        reportes_dict = {
-            "puerto":puertos_df,
-            "despacho":despachos_df,
-            "planta":plantas_df
-        }
-            
-        st.session_state['resultado'] = reportes_dict
+        if estado['estado'] in ['terminado', 'fallido']:
+            return estado
 
-        st.write('Ha terminado la fase 4. Por favor haga click en "call_back"')
+        time.sleep(INTERVALO_AVANCE)
+
+
+st.set_page_config(layout="wide")
+
+st.title('Optimizador BIOS. V2.72')
+
+if 'intento' not in st.session_state:
+    st.session_state['intento'] = 0
+
+uploaded_file = st.file_uploader("Seleccione un archivo para trabajar")
+
+if uploaded_file is None:
+
+    st.write('Seleccione un archivo para trabajar')
 
 else:
 
-    reportes_dict = st.session_state['resultado']
-    puerto = convert_df(reportes_dict['puerto'])
-    despachos = convert_df(reportes_dict['despacho'])
-    plantas = convert_df(reportes_dict['planta'])
-    puertos_tab, despachos_tab, plantas_tab = st.tabs(
-        tabs=['Puerto', 'Despachos', 'Plantas'])
-    with puertos_tab:
-        st.dataframe(reportes_dict['puerto'])
-        st.download_button(
-            label="Descargar reporte de Puertos",
-            data=puerto,
-            file_name="reporte_puerto.csv",
-            mime="text/csv",
-        )
-    with despachos_tab:
-        st.dataframe(reportes_dict['despacho'])
-        st.download_button(
-            label="Descargar reporte de Despachos",
-            data=despachos,
-            file_name="reporte_despachos.csv",
-            mime="text/csv",
-        )
-    with plantas_tab:
-        st.dataframe(reportes_dict['planta'])
-        st.download_button(
-            label="Descargar reporte de Plantas",
-            data=plantas,
-            file_name="reporte_plantas.csv",
-            mime="text/csv",
-        )
\ No newline at end of file
+    # La optimización corre en el pool de la cola, la página solo consulta su avance
+    contenido = uploaded_file.getvalue()
+    hash_archivo = hashlib.sha256(contenido).hexdigest()
+
+    cola = obtener_cola()
+    id_trabajo = encolar_archivo(hash_archivo, st.session_state['intento'], uploaded_file.name, contenido)
+
+    estado = mostrar_avance(cola, id_trabajo)
+
+    if estado['estado'] == 'fallido':
+
+        st.error(f"La optimización falló: {estado['error']}")
+
+        if st.button(label='Reintentar'):
+            st.session_state['intento'] += 1
+            st.rerun()
+
+    else:
+
+        reportes_dict = leer_reportes(id_trabajo)
+        puerto = convert_df(reportes_dict['puertos'])
+        despachos = convert_df(reportes_dict['despachos'])
+        plantas = convert_df(reportes_dict['plantas'])
+        puertos_tab, despachos_tab, plantas_tab = st.tabs(
+            tabs=['Puerto', 'Despachos', 'Plantas'])
+        with puertos_tab:
+            st.dataframe(reportes_dict['puertos'])
+            st.download_button(
+                label="Descargar reporte de Puertos",
+                data=puerto,
+                file_name="reporte_puerto.csv",
+                mime="text/csv",
+            )
+        with despachos_tab:
+            st.dataframe(reportes_dict['despachos'])
+            st.download_button(
+                label="Descargar reporte de Despachos",
+                data=despachos,
+                file_name="reporte_despachos.csv",
+                mime="text/csv",
+            )
+        with plantas_tab:
+            st.dataframe(reportes_dict['plantas'])
+            st.download_button(
+                label="Descargar reporte de Plantas",
+                data=plantas,
+                file_name="reporte_plantas.csv",
+                mime="text/csv",
+            )
@@ -2,7 +2,7 @@ from bios_utils.problema import Problema
 from tqdm import tqdm
 import pulp as pu
 import numpy as np
-import os
+from src.client.motores import ConfiguracionSolver, crear_motor_pulp
 
 class AlcanceObjetivoModel():
 
@@ -288,9 +288,14 @@ class AlcanceObjetivoModel():
                 for periodo in self.problema.periodos:
                     self.fobj_backorder.append(100*self.problema.objetivo_inventario[planta][ingrediente]*self.backorder[planta][ingrediente][periodo])
 
-    def solve(self):
-        # Cantidad CPU habilitadas para trabajar
-        cpu_count = max(1, os.cpu_count()-1)
+    def solve(self, configuracion: ConfiguracionSolver = None):
+
+        t_limit_minutes = 15
+
+        if configuracion is None:
+            configuracion = ConfiguracionSolver(tiempo_limite=60*t_limit_minutes,
+                                                gap_relativo=0.05,
+                                                arranque_en_caliente=False)
 
         solucionador_01 = pu.LpProblem(name='Bios_Solver_fase_1', sense=pu.LpMinimize)
 
@@ -313,25 +318,11 @@ class AlcanceObjetivoModel():
         for rest in self.faltante_inventario_objetivo:
             solucionador_01 += rest
 
-        t_limit_minutes = 15
-
-        print('cpu count', cpu_count)
+        print('cpu count', configuracion.hilos)
         print('ejecutando ', len(self.problema.periodos), 'periodos')
-        engine_cbc = pu.PULP_CBC_CMD(
-            timeLimit=60*t_limit_minutes,
-            gapRel=0.05,
-            warmStart=False,
-            threads=cpu_count)
-
-        engine_glpk = pu.GLPK_CMD(
-            mip=True,
-            timeLimit=60*t_limit_minutes,
-            path=r"C:\glpk-4.65\w64\glpsol.exe",
-            
-        )
-
-        solucionador_01.writeLP('model.lp')
-
-        solucionador_01.solve(solver=engine_cbc)
+
+        # solucionador_01.writeLP('model.lp')
+
+        solucionador_01.solve(solver=crear_motor_pulp(configuracion))
 
         pu.LpStatus[solucionador_01.status]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from bios_utils.problema import Problema
 from tqdm import tqdm
 import pulp as pu
-import os
+from src.client.motores import ConfiguracionSolver, crear_motor_pulp
 
 class Cumplir_Safety_Stock():
 
@@ -215,9 +215,12 @@ class Cumplir_Safety_Stock():
                 for periodo in self.problema.periodos:
                     self.fobj_ejecucion_consumo.append(self.ejecucion_consumo[planta][ingrediente][periodo])
 
-    def solve(self, t_limit_minutes=15):
-        # Cantidad CPU habilitadas para trabajar
-        cpu_count = max(1, os.cpu_count()-1)
+    def solve(self, t_limit_minutes=15, configuracion: ConfiguracionSolver = None):
+
+        if configuracion is None:
+            configuracion = ConfiguracionSolver(tiempo_limite=60*t_limit_minutes,
+                                                gap_relativo=0.05,
+                                                arranque_en_caliente=False)
 
         solucionador = pu.LpProblem(name='Bios_Solver_fase_1', sense=pu.LpMaximize)
 
@@ -236,26 +239,13 @@ class Cumplir_Safety_Stock():
         for rest in self.rest_recepcion_planta:
             solucionador += rest
 
-        print('cpu count', cpu_count)
+        print('cpu count', configuracion.hilos)
         print('ejecutando ', len(self.problema.periodos), 'periodos')
-        print(f'ejecutando por {t_limit_minutes} minutos')
-
-        engine_cbc = pu.PULP_CBC_CMD(
-            timeLimit=60*t_limit_minutes,
-            gapRel=0.05,
-            warmStart=False,
-            threads=cpu_count)
-
-        engine_glpk = pu.GLPK_CMD(
-            mip=True,
-            timeLimit=60*t_limit_minutes,
-            path=r"C:\glpk-4.65\w64\glpsol.exe",
-            
-        )
+        print(f'ejecutando por {configuracion.tiempo_limite} segundos')
 
         # solucionador.writeLP('model.lp')
 
-        solucionador.solve(solver=engine_cbc)
+        solucionador.solve(solver=crear_motor_pulp(configuracion))
 
         pu.LpStatus[solucionador.status]
 
@@ -12,6 +12,7 @@ from bios_utils.asignador_capacidad import AsignadorCapacidad
 from datetime import datetime, timedelta
 from bios_utils.objetivo_inventario import obtener_objetivo_inventario
 from tqdm import tqdm
+from src.client.lector_libro import abrir_libro
 
 
 def get_inventario_capacidad_planta(bios_input_file:str)->pd.DataFrame:
@@ -28,15 +29,14 @@ def get_inventario_capacidad_planta(bios_input_file:str)->pd.DataFrame:
 
 def get_llegadas_programadas_planta(bios_input_file:str)->pd.DataFrame:
     # llegadas programadas a planta
-    df = pd.read_excel(
-        io=bios_input_file, sheet_name='tto_plantas')
+    df = abrir_libro(bios_input_file, hojas=['tto_plantas']).hoja('tto_plantas')
     df = df.groupby(['planta', 'ingrediente', 'fecha_llegada'])[['cantidad']].sum().reset_index().rename(columns={
         'planta': 'Planta', 'ingrediente': 'Ingrediente', 'fecha_llegada': 'Fecha', 'cantidad': 'Llegadas_planeadas'})
     return df
 
 def get_consumo_proyectado(bios_input_file:str)->pd.DataFrame:
     # Consumo proyectado
-    df = pd.read_excel(io=bios_input_file, sheet_name='consumo_proyectado').rename(
+    df = abrir_libro(bios_input_file, hojas=['consumo_proyectado']).hoja('consumo_proyectado').rename(
         columns={'planta': 'Planta', 'ingrediente': 'Ingrediente'})
 
     columns = df.drop(columns=['Planta', 'Ingrediente']).columns
@@ -51,7 +51,7 @@ def get_consumo_proyectado(bios_input_file:str)->pd.DataFrame:
 
 def get_tiempos_proceso(bios_input_file:str)->pd.DataFrame:
     # Tiempos de proceso
-    df = pd.read_excel(io=bios_input_file, sheet_name='plantas')
+    df = abrir_libro(bios_input_file, hojas=['plantas']).hoja('plantas')
     # Tiempos de proceso
     columns = ['planta',	'empresa',	'operacion_minutos',
             'minutos_limpieza', 'plataformas']
@@ -72,8 +72,7 @@ def get_objetivo_inventario(bios_input_file:str)->pd.DataFrame:
 
 def get_costo_operacion_portuaria(bios_input_file:str)->pd.DataFrame:
     # Costo de Operaciones portuarias
-    operaciones_portuarias_df = pd.read_excel(
-        io=bios_input_file, sheet_name='costos_operacion_portuaria')
+    operaciones_portuarias_df = abrir_libro(bios_input_file, hojas=['costos_operacion_portuaria']).hoja('costos_operacion_portuaria')
     costo_portuario_directo_df = operaciones_portuarias_df[operaciones_portuarias_df['tipo_operacion'] == 'directo'].copy(
     ).drop(columns='tipo_operacion')
     costo_portuario_bodegaje_df = operaciones_portuarias_df[operaciones_portuarias_df['tipo_operacion'] == 'bodega'].copy(
@@ -82,7 +81,7 @@ def get_costo_operacion_portuaria(bios_input_file:str)->pd.DataFrame:
 
 def get_transitos_a_puerto(bios_input_file:str, cap_descarge=5000000)->pd.DataFrame:
     # Transitos a puerto
-    df = pd.read_excel(io=bios_input_file, sheet_name='tto_puerto')
+    df = abrir_libro(bios_input_file, hojas=['tto_puerto']).hoja('tto_puerto')
     transitos_list = list()
     print('cargando tránsitos a puerto')
     for i in tqdm(df.index):
@@ -136,7 +135,7 @@ def get_transitos_a_puerto(bios_input_file:str, cap_descarge=5000000)->pd.DataFr
 
 def get_inventario_puerto(bios_input_file:str)->pd.DataFrame:
 
-    df = pd.read_excel(io=bios_input_file, sheet_name='inventario_puerto')
+    df = abrir_libro(bios_input_file, hojas=['inventario_puerto']).hoja('inventario_puerto')
     inventario_puerto_list = list()
     print('cargando inventario en puerto')
     for i in tqdm(df.index):
@@ -167,6 +166,8 @@ def get_inventario_puerto(bios_input_file:str)->pd.DataFrame:
 
 def get_cargas_despachables(bios_input_file:str)->pd.DataFrame:
 
+    bios_input_file = abrir_libro(bios_input_file, hojas=['inventario_puerto', 'tto_puerto'])
+
     inventario_puerto_df = get_inventario_puerto(bios_input_file=bios_input_file)
     
     tto_puerto_df = get_transitos_a_puerto(bios_input_file=bios_input_file)
@@ -179,8 +180,7 @@ def get_cargas_despachables(bios_input_file:str)->pd.DataFrame:
 
 def get_costo_almaceniento_puerto(bios_input_file:str)->pd.DataFrame:
     # Leer el archivo de excel
-    costos_almacenamiento_df = pd.read_excel(
-        io=bios_input_file, sheet_name='costos_almacenamiento_cargas')
+    costos_almacenamiento_df = abrir_libro(bios_input_file, hojas=['costos_almacenamiento_cargas']).hoja('costos_almacenamiento_cargas')
 
     costos_almacenamiento_df['fecha_corte'] = costos_almacenamiento_df['fecha_corte'].apply(
         lambda x: x.strftime('%Y-%m-%d'))
@@ -188,17 +188,20 @@ def get_costo_almaceniento_puerto(bios_input_file:str)->pd.DataFrame:
     return costos_almacenamiento_df
 
 def get_fletes(bios_input_file:str)->pd.DataFrame:
-    df = pd.read_excel(io=bios_input_file, sheet_name='fletes_cop_per_kg')
+    df = abrir_libro(bios_input_file, hojas=['fletes_cop_per_kg']).hoja('fletes_cop_per_kg')
     return df
 
 def get_intercompany(bios_input_file:str)->pd.DataFrame:
-    df = pd.read_excel(io=bios_input_file, sheet_name='venta_entre_empresas')
+    df = abrir_libro(bios_input_file, hojas=['venta_entre_empresas']).hoja('venta_entre_empresas')
     return df
 
 
 def get_all_data(bios_input_file:str, cap_descarga=5000000)-> dict:
     
     dataframes = dict()
+
+    # Leer el archivo una sola vez y compartir las hojas entre todas las consultas
+    bios_input_file = abrir_libro(bios_input_file)
     
     dataframes['capacidad_planta'] = get_inventario_capacidad_planta(bios_input_file)
     dataframes['llegadas_planta'] = get_llegadas_programadas_planta(bios_input_file)
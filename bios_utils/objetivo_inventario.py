@@ -1,6 +1,7 @@
 # %%
 from datetime import datetime, timedelta
 from bios_utils.asignador_capacidad import AsignadorCapacidad
+from src.client.lector_libro import abrir_libro
 from sklearn.cluster import KMeans
 import numpy as np
 import pandas as pd
@@ -8,29 +9,21 @@ pd.options.display.max_columns = None
 
 
 def obtener_objetivo_inventario(bios_input_file: str, cap_camion=34000, cap_descarge=5000000) -> dict:
-    # Leer el archivo de excel
-    productos_df = pd.read_excel(io=bios_input_file, sheet_name='ingredientes')
-    plantas_df = pd.read_excel(io=bios_input_file, sheet_name='plantas')
-    asignador = AsignadorCapacidad(bios_input_file)
+    # Leer el archivo de excel una sola vez
+    libro = abrir_libro(bios_input_file)
+    productos_df = libro.hoja('ingredientes')
+    plantas_df = libro.hoja('plantas')
+    asignador = AsignadorCapacidad(libro)
     unidades_almacenamiento_df = asignador.obtener_unidades_almacenamiento()
-    safety_stock_df = pd.read_excel(
-        io=bios_input_file, sheet_name='safety_stock')
-    consumo_proyectado_df = pd.read_excel(
-        io=bios_input_file, sheet_name='consumo_proyectado')
-    transitos_puerto_df = pd.read_excel(
-        io=bios_input_file, sheet_name='tto_puerto')
-    transitos_planta_df = pd.read_excel(
-        io=bios_input_file, sheet_name='tto_plantas')
-    inventario_puerto_df = pd.read_excel(
-        io=bios_input_file, sheet_name='inventario_puerto')
-    costos_almacenamiento_df = pd.read_excel(
-        io=bios_input_file, sheet_name='costos_almacenamiento_cargas')
-    operaciones_portuarias_df = pd.read_excel(
-        io=bios_input_file, sheet_name='costos_operacion_portuaria')
-    fletes_df = pd.read_excel(
-        io=bios_input_file, sheet_name='fletes_cop_per_kg')
-    intercompany_df = pd.read_excel(
-        io=bios_input_file, sheet_name='venta_entre_empresas')
+    safety_stock_df = libro.hoja('safety_stock')
+    consumo_proyectado_df = libro.hoja('consumo_proyectado')
+    transitos_puerto_df = libro.hoja('tto_puerto')
+    transitos_planta_df = libro.hoja('tto_plantas')
+    inventario_puerto_df = libro.hoja('inventario_puerto')
+    costos_almacenamiento_df = libro.hoja('costos_almacenamiento_cargas')
+    operaciones_portuarias_df = libro.hoja('costos_operacion_portuaria')
+    fletes_df = libro.hoja('fletes_cop_per_kg')
+    intercompany_df = libro.hoja('venta_entre_empresas')
 
     # %% [markdown]
     # ## Armando el dataset
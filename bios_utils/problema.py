@@ -12,6 +12,7 @@ from bios_utils.loader import get_costo_almaceniento_puerto
 from bios_utils.loader import get_cargas_despachables
 from bios_utils.loader import get_fletes
 from bios_utils.loader import get_intercompany
+from src.client.lector_libro import abrir_libro
 
 class Problema():
     
@@ -42,49 +43,52 @@ class Problema():
 
     def __load_file(self):
 
+        # Leer el archivo una sola vez y compartirlo con todas las consultas
+        self.libro = abrir_libro(self.bios_input_file)
+
         # Plantas
-        self.plantas_df = pd.read_excel(io=self.bios_input_file, sheet_name='plantas')
+        self.plantas_df = self.libro.hoja('plantas')
 
         # Inventarios y capacidad de almacenamiento en planta
         self.inventario_planta_df = get_inventario_capacidad_planta(
-            bios_input_file=self.bios_input_file)
+            bios_input_file=self.libro)
 
         # Transito a plantas
         self.llegadas_programadas_df = get_llegadas_programadas_planta(
-            bios_input_file=self.bios_input_file)
+            bios_input_file=self.libro)
 
         # Consumo Proyectado
-        self.consumo_proyectado_df = get_consumo_proyectado(bios_input_file=self.bios_input_file)
+        self.consumo_proyectado_df = get_consumo_proyectado(bios_input_file=self.libro)
 
         # Tiempos de Proceso
-        self.tiempos_proceso_df = get_tiempos_proceso(bios_input_file=self.bios_input_file)
+        self.tiempos_proceso_df = get_tiempos_proceso(bios_input_file=self.libro)
 
         # Objetivo de inventario
-        self.objetivo_df = get_objetivo_inventario(bios_input_file=self.bios_input_file)
+        self.objetivo_df = get_objetivo_inventario(bios_input_file=self.libro)
 
         # Costo de Operaciones portuarias
         self.costo_portuario_bodegaje_df, self.costo_portuario_directo_df = get_costo_operacion_portuaria(
-            bios_input_file=self.bios_input_file)
+            bios_input_file=self.libro)
 
         # Transitos a Puerto
-        self.tto_puerto_df = get_transitos_a_puerto(bios_input_file=self.bios_input_file)
+        self.tto_puerto_df = get_transitos_a_puerto(bios_input_file=self.libro)
 
         # Inventarios en Puerto
-        self.inventario_puerto_df = get_inventario_puerto(bios_input_file=self.bios_input_file)
+        self.inventario_puerto_df = get_inventario_puerto(bios_input_file=self.libro)
 
         # Cargas despachables
         self.cargas_despachables_df = get_cargas_despachables(
-            bios_input_file=self.bios_input_file)
+            bios_input_file=self.libro)
 
         # Costos Almacenamiento Cargas
         self.costos_almacenamiento_df = get_costo_almaceniento_puerto(
-            bios_input_file=self.bios_input_file)
+            bios_input_file=self.libro)
 
         # Fletes
-        self.fletes_df = get_fletes(bios_input_file=self.bios_input_file)
+        self.fletes_df = get_fletes(bios_input_file=self.libro)
 
         # Intercompany
-        self.intercompany_df = get_intercompany(bios_input_file=self.bios_input_file)
+        self.intercompany_df = get_intercompany(bios_input_file=self.libro)
 
     def __load_costos_almacenamiento(self):
         df = self.costos_almacenamiento_df.set_index(['empresa', 'puerto', 'operador', 'ingrediente', 'importacion', 'fecha_corte'])
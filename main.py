@@ -3,32 +3,31 @@ import logging
 import time
 import argparse
 from datetime import datetime
-import pandas as pd
 
-def solve_model(input_file:str):
+def solve_model(input_file:str, cache_dir=None, por_ingrediente=False, procesos=None, motor='cbc', hilos=None, tiempo_limite=300, gap=0.00005, despacho='heuristica', ventana=None, avance=None, agregacion=None, formato='excel', separados=False, fuente='excel'):
     
     inicio = time.time()
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s: %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
 
     print(f"cargando el archivo \"{input_file}\"")
 
-    from src.client.loader import Loader 
-    loader = Loader(input_file)
-    loader.load_data()
+    from src.client.trabajos import ejecutar_optimizacion
 
+    def progreso(fase, estado):
+        print(f"{fase}: {estado}")
 
-    loader.gen_solucion_fase_01()
-    loader.gen_solucion_fase_02()
-    loader.gen_solucion_fase_03()
-    loader.gen_solucion_fase_04()
-    plantas_df, puertos_df, despachos_df = loader.save_reports()
+    # Con una url de base de datos los reportes quedan en el directorio actual
+    nombre = os.path.splitext(input_file)[0] if '://' not in input_file else 'bios'
+    base = f"{nombre}_{datetime.now().strftime('%Y-%m-%d_%HH%MM%SS')}"
 
-    output_file = input_file.replace(".xlsm", f"_{datetime.now().strftime("%Y-%m-%d_%HH%MM%SS")}.xlsx")
+    reportes = ejecutar_optimizacion(input_file, base, progreso=progreso, cache_dir=cache_dir, fuente=fuente,
+                                     despacho=despacho, por_ingrediente=por_ingrediente, procesos=procesos,
+                                     motor=motor, hilos=hilos, tiempo_limite=tiempo_limite, gap=gap,
+                                     ventana=ventana, avance=avance, agregacion=agregacion,
+                                     formato=formato, separados=separados)
 
-    with pd.ExcelWriter(output_file) as writer:
-        plantas_df.to_excel(writer, sheet_name="Reporte_Plantas", index=False)
-        puertos_df.to_excel(writer, sheet_name="Reporte_Puertos", index=False)
-        despachos_df.to_excel(writer, sheet_name="Reporte_Despachos", index=False)
+    for archivo in reportes:
+        print('reporte guardado en', archivo)
 
     fin = time.time()
     print('tiempo total',fin-inicio, 'segundos')
@@ -41,13 +40,75 @@ def main():
     parser = argparse.ArgumentParser(description="Procesar archivo de consumo proyectado.")
     parser.add_argument('file', 
                         type=str, 
-                        help='Ruta del archivo de Excel a procesar.')
+                        help='Ruta del archivo de Excel a procesar, o del sqlite / url de la base con --fuente base_datos.')
+    parser.add_argument('--fuente',
+                        type=str,
+                        choices=['excel', 'base_datos'],
+                        default='excel',
+                        help='Leer las hojas del archivo de Excel o de la base de datos que crea load_file_db.')
+    parser.add_argument('--cache',
+                        type=str,
+                        default=None,
+                        help='Directorio donde guardar las hojas ya leídas para reutilizarlas en las siguientes ejecuciones.')
+    parser.add_argument('--por-ingrediente',
+                        action='store_true',
+                        help='Resolver la fase 4 con un modelo por ingrediente en paralelo.')
+    parser.add_argument('--procesos',
+                        type=int,
+                        default=None,
+                        help='Cantidad de modelos de fase 4 que se resuelven a la vez, por defecto el número de núcleos.')
+    parser.add_argument('--despacho',
+                        type=str,
+                        choices=['heuristica', 'flujo'],
+                        default='heuristica',
+                        help='Cómo generar los despachos de las fases 1 a 3: camion por camion o como red de flujo.')
+    parser.add_argument('--ventana',
+                        type=int,
+                        default=None,
+                        help='Resolver con horizonte rodante en ventanas de esta cantidad de periodos.')
+    parser.add_argument('--avance',
+                        type=int,
+                        default=None,
+                        help='Periodos que se fijan en cada ventana del horizonte rodante, por defecto la mitad de la ventana.')
+    parser.add_argument('--agregacion',
+                        type=str,
+                        choices=['ingrediente', 'puerto'],
+                        default=None,
+                        help='Resolver la fase 4 sobre importaciones agregadas y repartir los despachos entre las importaciones reales.')
+    parser.add_argument('--formato',
+                        type=str,
+                        choices=['excel', 'parquet', 'csv'],
+                        default='excel',
+                        help='Formato de los reportes: libro de excel, parquet o csv comprimido con gzip.')
+    parser.add_argument('--separados',
+                        action='store_true',
+                        help='Escribir cada reporte en su propio archivo de excel, en paralelo.')
+    parser.add_argument('--motor',
+                        type=str,
+                        choices=['cbc', 'highs'],
+                        default='cbc',
+                        help='Motor de optimización para la fase 4.')
+    parser.add_argument('--hilos',
+                        type=int,
+                        default=None,
+                        help='Hilos del motor de optimización, por defecto los núcleos menos uno.')
+    parser.add_argument('--tiempo-limite',
+                        type=float,
+                        default=300,
+                        help='Tiempo máximo de la fase 4 en segundos.')
+    parser.add_argument('--gap',
+                        type=float,
+                        default=0.00005,
+                        help='Gap relativo con el que se detiene la fase 4.')
 
     # Parsear los argumentos de la línea de comandos
     args = parser.parse_args()
 
     # Crear una instancia de ConsumosProcessor y cargar los consumos
-    solve_model(args.file)
+    solve_model(args.file, cache_dir=args.cache, por_ingrediente=args.por_ingrediente, procesos=args.procesos,
+                motor=args.motor, hilos=args.hilos, tiempo_limite=args.tiempo_limite, gap=args.gap, despacho=args.despacho,
+                ventana=args.ventana, avance=args.avance, agregacion=args.agregacion,
+                formato=args.formato, separados=args.separados, fuente=args.fuente)
 
 if __name__ == "__main__":
 
@@ -0,0 +1,145 @@
+import numpy as np
+import logging
+from src.client.problema_arreglos import ProblemaArreglos
+
+
+# Niveles de agregación de las importaciones soportados
+NIVELES_AGREGACION = ['ingrediente', 'puerto']
+
+
+class ImportacionesAgregadas():
+
+    def __init__(self, arreglos: ProblemaArreglos, nivel='ingrediente') -> None:
+
+        # Junta las importaciones de un ingrediente (o de un ingrediente en un puerto) en una
+        # sola importación agregada con los mismos arreglos que ProblemaArreglos, para resolver
+        # un modelo mucho más pequeño y luego repartir sus despachos entre las importaciones reales.
+        # Solo se juntan importaciones que pueden despachar a las mismas plantas.
+
+        if nivel not in NIVELES_AGREGACION:
+            logging.critical("El nivel de agregación %s no está soportado, use uno de %s", nivel, NIVELES_AGREGACION)
+            raise Exception(f"El nivel de agregación {nivel} no está soportado, use uno de {NIVELES_AGREGACION}")
+
+        self.arreglos = arreglos
+        self.nivel = nivel
+        self.cap_camion = arreglos.cap_camion
+        self.periodos = arreglos.periodos
+        self.ingredientes = arreglos.ingredientes
+        self.plantas = arreglos.plantas
+
+        self.grupo_importacion = None  # [I] importación agregada de cada importación
+        self.miembros = list()         # importaciones de cada importación agregada
+        self.camiones = None           # [I,T] camiones que la importación puede haber despachado al final de t
+
+        self._generar_grupos()
+        self._generar_arreglos()
+
+    def _generar_grupos(self):
+
+        arreglos = self.arreglos
+        df = arreglos.importaciones_df
+
+        llave = [df['codigo_ingrediente'].to_numpy()]
+        if self.nivel == 'puerto':
+            llave.append(df['codigo_puerto'].to_numpy())
+
+        # Plantas a las que puede despachar cada importación
+        _, patron = np.unique(arreglos.factible, axis=0, return_inverse=True)
+        llave.append(patron.ravel())
+
+        # Las importaciones que en algún periodo ahorran al despachar (costo negativo) no se mezclan con
+        # las demás, el modelo despacha camiones adicionales desde ellas
+        ahorro = (arreglos.costo_despacho_camion < 0).any(axis=2) & arreglos.factible
+        llave.append(ahorro.any(axis=1).astype(np.int64))
+
+        _, self.grupo_importacion = np.unique(np.stack(llave, axis=1), axis=0, return_inverse=True)
+        self.grupo_importacion = self.grupo_importacion.ravel()
+
+        G = int(self.grupo_importacion.max(initial=-1)) + 1
+        self.miembros = [np.flatnonzero(self.grupo_importacion == g) for g in range(G)]
+
+        print('importaciones agregadas', G, 'de', df.shape[0])
+
+    def _generar_arreglos(self):
+
+        arreglos = self.arreglos
+        cap = self.cap_camion
+        G = len(self.miembros)
+        P = len(self.plantas)
+        T = self.periodos
+
+        # Camiones completos que cada importación tiene disponibles hasta t sin quedar negativa
+        # después, el agregado no promete carga que ninguna importación pueda despachar sola
+        entradas = arreglos.llegadas.copy()
+        entradas[:, 0] += arreglos.inventario_inicial
+        camiones = np.maximum(0, np.floor(np.cumsum(entradas, axis=1)/cap))
+        self.camiones = np.minimum.accumulate(camiones[:, ::-1], axis=1)[:, ::-1].astype(np.int64)
+
+        camiones_grupo = np.zeros((G, T), dtype=np.int64)
+        np.add.at(camiones_grupo, self.grupo_importacion, self.camiones)
+
+        self.ingrediente = np.array([arreglos.ingrediente[miembros[0]] for miembros in self.miembros], dtype=np.int32)  # [G]
+        self.inventario_inicial = cap*camiones_grupo[:, 0]  # [G]
+        self.llegadas = cap*np.diff(camiones_grupo, axis=1, prepend=camiones_grupo[:, :1]).astype(np.float64)  # [G,T]
+
+        self.factible = np.zeros((G, P), dtype=bool)  # [G,P]
+        np.logical_or.at(self.factible, self.grupo_importacion, arreglos.factible)
+
+        self.despachos = np.zeros((G, P, T, arreglos.despachos.shape[3]), dtype=np.int64)  # [G,P,T,K]
+        np.add.at(self.despachos, self.grupo_importacion, arreglos.despachos)
+
+        # El agregado despacha al costo promedio de sus importaciones ponderado por los camiones que
+        # aportan. Con el costo de la más barata el modelo despacharía camiones de más que luego
+        # no salen a ese costo.
+        peso = self.camiones[:, -1].astype(np.float64)
+        peso_grupo = np.zeros(G, dtype=np.float64)
+        np.add.at(peso_grupo, self.grupo_importacion, peso)
+
+        sin_peso = peso_grupo[self.grupo_importacion] == 0
+        peso[sin_peso] = 1
+        np.add.at(peso_grupo, self.grupo_importacion[sin_peso], 1)
+
+        self.costo_despacho_camion = np.zeros((G, P, T), dtype=np.float64)  # [G,P,T]
+        np.add.at(self.costo_despacho_camion, self.grupo_importacion, peso[:, None, None]*arreglos.costo_despacho_camion)
+        self.costo_despacho_camion /= peso_grupo[:, None, None]
+
+    def desagregar(self, despachos: np.ndarray) -> np.ndarray:
+
+        # Reparte los camiones [G,P,T] del modelo agregado entre las importaciones reales.
+        # Periodo a periodo se asignan primero los pares importación-planta más baratos, con los
+        # camiones que cada importación tiene disponibles hasta ese periodo.
+
+        arreglos = self.arreglos
+        T = self.periodos
+
+        resultado = np.zeros((arreglos.importaciones_df.shape[0], len(self.plantas), T), dtype=np.int64)  # [I,P,T]
+
+        for g, miembros in enumerate(self.miembros):
+
+            usados = np.zeros(miembros.shape[0], dtype=np.int64)
+
+            for t in np.flatnonzero(despachos[g].sum(axis=0) > 0):
+
+                pendientes = despachos[g, :, t].copy()
+                disponibles = self.camiones[miembros, t] - usados
+
+                plantas = np.flatnonzero(pendientes > 0)
+                costos = arreglos.costo_despacho_camion[miembros[:, None], plantas[None, :], t]
+
+                for m, q in zip(*np.unravel_index(np.argsort(costos, axis=None, kind='stable'), costos.shape)):
+
+                    p = plantas[q]
+                    camiones = min(pendientes[p], disponibles[m])
+                    if camiones <= 0:
+                        continue
+
+                    resultado[miembros[m], p, t] += camiones
+                    pendientes[p] -= camiones
+                    disponibles[m] -= camiones
+                    usados[m] += camiones
+
+                if pendientes.sum() > 0:
+                    logging.error("No hay camiones suficientes para desagregar el grupo %s en el periodo %s", g, t)
+                    raise Exception(f"No hay camiones suficientes para desagregar el grupo {g} en el periodo {t}")
+
+        return resultado
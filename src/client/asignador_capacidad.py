@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+import heapq
+import logging
+from src.client.lector_libro import abrir_libro
 
 
 class AsignadorCapacidad():
@@ -7,6 +10,7 @@ class AsignadorCapacidad():
     def __init__(self, file: str) -> None:
 
         self.file = file
+        self.libro = abrir_libro(file)
 
         self.ingredientes_list = self._cargar_ingredientes()
         self.plantas_list = self._cargar_plantas()
@@ -21,20 +25,18 @@ class AsignadorCapacidad():
 
     def _cargar_ingredientes(self):
 
-        ingredientes_df = pd.read_excel(
-            io=self.file, sheet_name='ingredientes')
+        ingredientes_df = self.libro.hoja('ingredientes')
         ingredientes_list = list(ingredientes_df['nombre'].unique())
         return ingredientes_list
 
     def _cargar_plantas(self):
-        plantas_df = pd.read_excel(io=self.file, sheet_name='plantas')
+        plantas_df = self.libro.hoja('plantas')
         plantas_list = list(plantas_df['planta'].unique())
         return plantas_list
 
     def _cargar_consumo(self):
         # Obtener consumo
-        consumo_df = pd.read_excel(
-            io=self.file, sheet_name='consumo_proyectado')
+        consumo_df = self.libro.hoja('consumo_proyectado')
         indexvar = ['planta', 'ingrediente']
         consumo_columns = list(consumo_df.drop(columns=indexvar).columns)
         consumo_df['promedio'] = consumo_df[consumo_columns].apply(
@@ -44,15 +46,12 @@ class AsignadorCapacidad():
 
     def _cargar_safety_stock(self):
         # Obtener minumo
-        safety_stock_df = pd.read_excel(
-            io=self.file, sheet_name='safety_stock')
+        safety_stock_df = self.libro.hoja('safety_stock')
         return safety_stock_df
 
     def _cargar_unidades_almacenamiento(self):
         # Leer unidades
-        unidades_df = pd.read_excel(
-            io=self.file,
-            sheet_name='unidades_almacenamiento')
+        unidades_df = self.libro.hoja('unidades_almacenamiento')
 
         unidades_df['ingrediente_actual'] = unidades_df.apply(
             lambda x: x['ingrediente_actual'] if x['cantidad_actual'] > 0 else '', axis=1)
@@ -61,8 +60,7 @@ class AsignadorCapacidad():
 
     def _cargar_inventario_actual(self):
         # Obtener inventario actual
-        inventario_df = pd.read_excel(io=self.file,
-                                      sheet_name='unidades_almacenamiento')
+        inventario_df = self.libro.hoja('unidades_almacenamiento')
         inventario_df = inventario_df[inventario_df['ingrediente_actual'].isin(
             self.ingredientes_list)].copy()
 
@@ -141,35 +139,90 @@ class AsignadorCapacidad():
         self.estadisticas_df = solucion_df
 
     def calcular(self):
+
+        # Cada unidad vacía se asigna, en orden, al ingrediente que puede guardar con menos días de
+        # capacidad en su planta y, a igual capacidad, al de mayor consumo promedio.
+        # Las estadísticas se calculan una sola vez. Cada planta guarda sus ingredientes en un heap
+        # con versiones: al asignar una unidad solo cambia la clave del ingrediente elegido y su
+        # entrada anterior queda obsoleta.
         values = list(self.unidades_df['ingrediente_actual'])
         cantidades = list(self.unidades_df['cantidad_actual'])
 
-        for i in self.unidades_df.index:
-            if i in self.unidades_df[self.unidades_df['cantidad_actual'] <= 0].index:
-
-                # Obtener información sobre lo que puede guardar la primera unidad vacia
-                planta = self.unidades_df.loc[i]['planta']
-                unidad = self.unidades_df.loc[i]['unidad_almacenamiento']
-                posibles = [
-                    x for x in self.ingredientes_list if self.unidades_df.loc[i][x] > 0]
-
-                # Totalizar la capacidad actual
-                self._calcular_capacidad_actual()
-
-                # Calcular capacidad en dias
-                self._calcular_estadisticas()
-
-                # Obtener el ingrediente con menor cantidad de capacidad en días
-                ingrediente_a_asignar = self.estadisticas_df[(self.estadisticas_df['planta'] == planta) & (
-                    self.estadisticas_df['ingrediente'].isin(posibles))].iloc[0]['ingrediente']
-                # print('trabajando con', planta, unidad, posibles, ingrediente_a_asignar)
-
-                # Asignar la unidad vacia al ingrediente
-                values[i] = ingrediente_a_asignar
-                cantidades[i] = 1.0
-
-                self.unidades_df['ingrediente_actual'] = values
-                self.unidades_df['cantidad_actual'] = cantidades
+        vacias = [k for k, cantidad in enumerate(cantidades) if cantidad <= 0]
+        if len(vacias) == 0:
+            return
+
+        self._calcular_capacidad_actual()
+        self._calcular_estadisticas()
+
+        heaps = dict()
+        capacidad = dict()
+        promedio = dict()
+        version = dict()
+
+        estadisticas = zip(self.estadisticas_df['planta'], self.estadisticas_df['ingrediente'],
+                           self.estadisticas_df['capacidad'], self.estadisticas_df['promedio'],
+                           self.estadisticas_df['capacidad_dias'], self.estadisticas_df['index'])
+
+        # El orden del producto plantas x ingredientes desempata igual que el sort estable
+        for planta, ingrediente, capacidad_actual, promedio_actual, capacidad_dias, orden in estadisticas:
+            capacidad[(planta, ingrediente)] = capacidad_actual
+            promedio[(planta, ingrediente)] = promedio_actual
+            version[(planta, ingrediente)] = 0
+            heaps.setdefault(planta, list()).append((capacidad_dias, -promedio_actual, orden, 0, ingrediente))
+
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        plantas = list(self.unidades_df['planta'])
+        unidades = self.unidades_df['unidad_almacenamiento']
+        capacidades = self.unidades_df[self.ingredientes_list].to_numpy(dtype=np.float64)
+
+        for i in vacias:
+
+            # Ingredientes que puede guardar la unidad vacia
+            planta = plantas[i]
+            posibles = set(ingrediente for ingrediente, cap in zip(self.ingredientes_list, capacidades[i]) if cap > 0)
+
+            heap = heaps.get(planta, list())
+            apartadas = list()
+            elegida = None
+
+            while len(heap) > 0:
+                entrada = heapq.heappop(heap)
+                ingrediente = entrada[4]
+                if entrada[3] != version[(planta, ingrediente)]:
+                    continue
+                if ingrediente in posibles:
+                    elegida = entrada
+                    break
+                apartadas.append(entrada)
+
+            for entrada in apartadas:
+                heapq.heappush(heap, entrada)
+
+            if elegida is None:
+                logging.critical("No hay ingredientes para la unidad vacia %s de la planta %s", unidades.iloc[i], planta)
+                raise Exception(f"No hay ingredientes para la unidad vacia {unidades.iloc[i]} de la planta {planta}")
+
+            # Asignar la unidad vacia al ingrediente y actualizar su capacidad en dias
+            ingrediente_a_asignar = elegida[4]
+            clave = (planta, ingrediente_a_asignar)
+
+            capacidad[clave] += capacidades[i, self.ingredientes_list.index(ingrediente_a_asignar)]
+            version[clave] += 1
+            capacidad_dias = capacidad[clave]/promedio[clave] if promedio[clave] > 0 else 1000
+            heapq.heappush(heap, (capacidad_dias, -promedio[clave], elegida[2], version[clave], ingrediente_a_asignar))
+
+            values[i] = ingrediente_a_asignar
+            cantidades[i] = 1.0
+
+        self.unidades_df['ingrediente_actual'] = values
+        self.unidades_df['cantidad_actual'] = cantidades
+
+        # Estadisticas con todas las unidades asignadas
+        self._calcular_capacidad_actual()
+        self._calcular_estadisticas()
 
     def obtener_unidades_almacenamiento(self):
         return self.unidades_df
@@ -1,9 +1,15 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+
+
+# Etiquetas de los 3 niveles de costo, de menor a mayor
+NIVELES = ['bajo', 'medio', 'alto']
 
 
 def asignar_etiquetas(df: pd.DataFrame, column_name: str, n_clusters=3):
+
+    from sklearn.cluster import KMeans
+
     # Copiamos el DataFrame para no modificar el original
     df_resultado = df.copy()
 
@@ -37,4 +43,129 @@ def asignar_etiquetas(df: pd.DataFrame, column_name: str, n_clusters=3):
             'medio'
         )
 
-    return df_resultado
\ No newline at end of file
+    return df_resultado
+
+
+def asignar_niveles(valores: np.ndarray, grupos: np.ndarray) -> np.ndarray:
+
+    # Etiqueta alto, medio y bajo dentro de cada grupo con k-means exacto de una dimensión (k=3).
+    # Sobre los valores ordenados cada cluster es un segmento contiguo, la partición óptima se
+    # obtiene con programación dinámica y el óptimo de 2 segmentos de cada prefijo se busca por
+    # dividir y conquistar, ya que su punto de corte es monótono. Todos los grupos se procesan a
+    # la vez con arreglos planos, en O(N log N) y sin inicializaciones aleatorias. No es lineal:
+    # el ordenamiento ya cuesta O(N log N) y cada nivel del dividir y conquistar recorre todos
+    # los grupos; SMAWK solo quitaría el log de la segunda parte.
+
+    valores = np.asarray(valores, dtype=np.float64)
+    grupos = np.asarray(grupos)
+
+    etiquetas = np.empty(valores.shape[0], dtype=object)
+
+    if valores.shape[0] == 0:
+        return etiquetas
+
+    orden = np.lexsort((valores, grupos))
+    x = valores[orden]
+    g = grupos[orden]
+
+    inicio = np.flatnonzero(np.concatenate(([True], g[1:] != g[:-1])))
+    tamano = np.diff(np.concatenate((inicio, [x.shape[0]])))
+    grupo = np.repeat(np.arange(inicio.shape[0]), tamano)  # grupo de cada fila ordenada
+    posicion = np.arange(x.shape[0]) - inicio[grupo]  # posición de la fila dentro de su grupo
+
+    # Estandarizar por grupo mantiene las sumas acumuladas en una escala pequeña
+    media = np.add.reduceat(x, inicio)/tamano
+    z = x - media[grupo]
+    escala = np.sqrt(np.add.reduceat(z*z, inicio)/tamano)
+    escala[escala == 0] = 1
+    z = z/escala[grupo]
+
+    s1 = np.concatenate(([0.0], np.cumsum(z)))
+    s2 = np.concatenate(([0.0], np.cumsum(z*z)))
+
+    def sse(base, a, b):
+        # Suma de cuadrados del segmento [a, b) de cada grupo, con a < b
+        n = b - a
+        suma = s1[base+b] - s1[base+a]
+        return (s2[base+b] - s2[base+a]) - suma*suma/n
+
+    # Etapa 1: mejor partición en 2 segmentos de cada prefijo [0, j), para 2 <= j <= n-1
+    costo_2 = np.full(x.shape[0], np.inf)
+    corte_2 = np.zeros(x.shape[0], dtype=np.int64)
+
+    validos = np.flatnonzero(tamano >= 3)
+    tareas = (validos,  # grupo
+              np.full(validos.shape[0], 2),  # j desde
+              tamano[validos]-1,  # j hasta
+              np.ones(validos.shape[0], dtype=np.int64),  # corte desde
+              tamano[validos]-2)  # corte hasta
+
+    while tareas[0].shape[0] > 0:
+
+        t_grupo, j_desde, j_hasta, a_desde, a_hasta = tareas
+        j = (j_desde + j_hasta)//2
+
+        a_fin = np.minimum(a_hasta, j-1)
+        cantidad = a_fin - a_desde + 1
+
+        tarea = np.repeat(np.arange(t_grupo.shape[0]), cantidad)
+        desplazamiento = np.arange(tarea.shape[0]) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+        a = a_desde[tarea] + desplazamiento
+        base = inicio[t_grupo][tarea]
+
+        costo = sse(base, 0, a) + sse(base, a, j[tarea])
+
+        # Primer minimo de cada tarea para que los empates sean deterministicos
+        minimo = np.minimum.reduceat(costo, np.cumsum(cantidad) - cantidad)
+        es_minimo = np.flatnonzero(costo == minimo[tarea])
+        _, primero = np.unique(tarea[es_minimo], return_index=True)
+        mejor = a[es_minimo[primero]]
+
+        fila = inicio[t_grupo] + j
+        costo_2[fila] = minimo
+        corte_2[fila] = mejor
+
+        izquierda = j_desde <= j-1
+        derecha = j+1 <= j_hasta
+
+        tareas = tuple(np.concatenate((izq, der)) for izq, der in zip(
+            (t_grupo[izquierda], j_desde[izquierda], j[izquierda]-1, a_desde[izquierda], mejor[izquierda]),
+            (t_grupo[derecha], j[derecha]+1, j_hasta[derecha], mejor[derecha], a_hasta[derecha])))
+
+    # Etapa 2: el tercer segmento es [b, n), se elige b con el menor costo total
+    corte_a = np.minimum(1, tamano)
+    corte_b = np.minimum(2, tamano)
+
+    filas = np.flatnonzero((posicion >= 2) & (posicion <= tamano[grupo]-1) & (tamano[grupo] >= 3))
+
+    if filas.shape[0] > 0:
+        total = costo_2[filas] + sse(inicio[grupo[filas]], posicion[filas], tamano[grupo[filas]])
+
+        # filas está ordenado por grupo, el primer minimo de cada grupo define b
+        grupo_filas = grupo[filas]
+        minimo = np.full(inicio.shape[0], np.inf)
+        np.minimum.at(minimo, grupo_filas, total)
+        es_minimo = np.flatnonzero(total == minimo[grupo_filas])
+        grupos_validos, primero = np.unique(grupo_filas[es_minimo], return_index=True)
+        mejor = filas[es_minimo[primero]]
+
+        corte_b[grupos_validos] = posicion[mejor]
+        corte_a[grupos_validos] = corte_2[mejor]
+
+    # Segmento de cada fila y etiqueta según el centroide, como en asignar_etiquetas
+    segmento = (posicion >= corte_a[grupo]).astype(np.int64) + (posicion >= corte_b[grupo]).astype(np.int64)
+    llave = grupo*3 + segmento
+
+    conteo = np.bincount(llave, minlength=3*inicio.shape[0]).reshape(-1, 3)
+    suma = np.bincount(llave, weights=x, minlength=3*inicio.shape[0]).reshape(-1, 3)
+
+    con_datos = conteo > 0
+    centroide = np.divide(suma, conteo, out=np.zeros(suma.shape), where=con_datos)
+    maximo = np.where(con_datos, centroide, -np.inf).max(axis=1)
+    minimo = np.where(con_datos, centroide, np.inf).min(axis=1)
+
+    nivel = np.where(centroide == maximo[:, None], 2, np.where(centroide == minimo[:, None], 0, 1))
+
+    etiquetas[orden] = np.array(NIVELES, dtype=object)[nivel[grupo, segmento]]
+
+    return etiquetas
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class CostosDespacho():
+
+    def __init__(self, problema: dict, cap_camion: int) -> None:
+
+        # Costos por camion de todas las importaciones sobre arreglos:
+        # costo_despacho_camion[I,P,T] = flete[I,P] + despacho_directo[I,T] + intercompany[I,P] - ahorro_camion[I,T]
+        # Las series del diccionario de cada importación quedan como vistas sobre estos arreglos.
+
+        self.problema = problema
+        self.cap_camion = cap_camion
+        self.periodos = len(problema['fechas'])
+
+        self.claves_importacion = list()
+        self.plantas = list(problema['plantas'].keys())
+        self.indice_planta = dict()
+
+        self._generar_indices()
+        self._generar_arreglos()
+        self._vincular_problema()
+
+    def _get_importaciones(self):
+
+        importaciones = self.problema['importaciones']
+
+        for ingrediente in importaciones.keys():
+            for puerto in importaciones[ingrediente].keys():
+                for operador in importaciones[ingrediente][puerto].keys():
+                    for empresa in importaciones[ingrediente][puerto][operador].keys():
+                        for importacion, importacion_values in importaciones[ingrediente][puerto][operador][empresa].items():
+                            yield (ingrediente, puerto, operador, empresa, importacion), importacion_values
+
+    def _generar_indices(self):
+
+        for clave, importacion_values in self._get_importaciones():
+
+            self.claves_importacion.append(clave)
+
+            # Plantas con flete que no tienen consumo proyectado
+            for planta in importacion_values['flete_camion'].keys():
+                if planta not in self.plantas:
+                    self.plantas.append(planta)
+
+        self.indice_planta = {planta: p for p, planta in enumerate(self.plantas)}
+
+    def _generar_arreglos(self):
+
+        I = len(self.claves_importacion)
+        P = len(self.plantas)
+        T = self.periodos
+
+        self.costo_almacenamiento = np.zeros((I, T), dtype=np.float64)  # [I,T] por kg
+        costos_bodegaje = np.zeros((I, T), dtype=np.float64)
+        self.costos_despacho_directo = np.zeros((I, T), dtype=np.float64)  # [I,T] por kg
+        costo_almacenamiento = self.costo_almacenamiento
+        costos_despacho_directo = self.costos_despacho_directo
+
+        self.flete_camion = np.zeros((I, P), dtype=np.int64)  # [I,P]
+        self.intercompany_camion = np.zeros((I, P), dtype=np.float64)  # [I,P]
+        self.con_costo = np.zeros((I, P), dtype=bool)  # [I,P]
+
+        for i, (clave, importacion_values) in enumerate(self._get_importaciones()):
+
+            costo_almacenamiento[i] = importacion_values['costo_almacenamiento']
+            costos_bodegaje[i] = importacion_values['costos_bodegaje']
+            costos_despacho_directo[i] = importacion_values['costos_despacho_directo']
+
+            for planta, flete in importacion_values['flete_camion'].items():
+                p = self.indice_planta[planta]
+                self.con_costo[i, p] = True
+                self.flete_camion[i, p] = flete
+                self.intercompany_camion[i, p] = importacion_values['intercompany_camion'][planta]
+
+        # Costos de almacenamiento por camion y su ahorro acumulado desde t hasta el final del horizonte
+        ahorro_almacenamiento = self.cap_camion*costo_almacenamiento
+        ahorro_bodegaje = self.cap_camion*costos_bodegaje
+
+        self.costo_almacenamiento_camion = np.trunc(self.cap_camion*(costo_almacenamiento + costos_bodegaje)).astype(np.int64)  # [I,T]
+        self.ahorro_camion = np.ascontiguousarray(np.cumsum(self.costo_almacenamiento_camion[:, ::-1], axis=1)[:, ::-1])  # [I,T]
+        self.ahorro_almacenamiento_camion = np.ascontiguousarray(np.cumsum(ahorro_almacenamiento[:, ::-1], axis=1)[:, ::-1])  # [I,T]
+        self.ahorro_bodegaje_camion = np.ascontiguousarray(np.cumsum(ahorro_bodegaje[:, ::-1], axis=1)[:, ::-1])  # [I,T]
+
+        despacho_directo = np.trunc(self.cap_camion*costos_despacho_directo).astype(np.int64)  # [I,T]
+        intercompany = np.trunc(self.intercompany_camion).astype(np.int64)  # [I,P]
+
+        self.costo_despacho_camion = (self.flete_camion[:, :, None] +
+                                      despacho_directo[:, None, :] +
+                                      intercompany[:, :, None] -
+                                      self.ahorro_camion[:, None, :])  # [I,P,T]
+
+        # Las plantas sin flete no tienen costo de despacho
+        self.costo_despacho_camion[~self.con_costo] = 0
+
+    def _vincular_problema(self):
+
+        for i, (clave, importacion_values) in enumerate(self._get_importaciones()):
+
+            importacion_values['costo_almacenamiento_camion'] = self.costo_almacenamiento_camion[i]
+            importacion_values['ahorro_camion'] = self.ahorro_camion[i]
+            importacion_values['ahorro_almacenamiento_camion'] = self.ahorro_almacenamiento_camion[i]
+            importacion_values['ahorro_bodegaje_camion'] = self.ahorro_bodegaje_camion[i]
+
+            importacion_values['costo_despacho_camion'] = dict()
+            for planta in importacion_values['flete_camion'].keys():
+                importacion_values['costo_despacho_camion'][planta] = self.costo_despacho_camion[i, self.indice_planta[planta]]
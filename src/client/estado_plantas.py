@@ -0,0 +1,166 @@
+import numpy as np
+import logging
+
+
+class EstadoPlantas():
+
+    def __init__(self, problema: dict) -> None:
+
+        # Estado de inventarios en planta sobre arreglos [J,T], donde J son las
+        # combinaciones planta-ingrediente con capacidad. Las series del diccionario
+        # problema['plantas'] quedan como vistas sobre estos arreglos.
+
+        self.problema = problema
+        self.cap_camion = problema['capacidad_camion']
+        self.periodos = len(problema['fechas'])
+
+        self.plantas = list(problema['plantas'].keys())
+        self.indice_planta = {planta: p for p, planta in enumerate(self.plantas)}
+        self.indice = dict()  # (planta, ingrediente) -> j
+        self.claves = list()  # j -> (planta, ingrediente)
+        self.planta_de = list()  # j -> p
+        self.ingredientes_planta = {p: list() for p in range(len(self.plantas))}  # p -> [j]
+
+        self._generar_arreglos()
+        self._vincular_problema()
+
+    def _generar_arreglos(self):
+
+        plantas = self.problema['plantas']
+
+        for planta in self.plantas:
+            for ingrediente, ingrediente_values in plantas[planta]['ingredientes'].items():
+                if 'capacidad' in ingrediente_values.keys():
+                    p = self.indice_planta[planta]
+                    self.indice[(planta, ingrediente)] = len(self.planta_de)
+                    self.ingredientes_planta[p].append(len(self.planta_de))
+                    self.claves.append((planta, ingrediente))
+                    self.planta_de.append(p)
+
+        J = len(self.planta_de)
+        T = self.periodos
+
+        self.consumo = np.zeros((J, T), dtype=np.int64)
+        self.llegada_planeada = np.zeros((J, T), dtype=np.int64)
+        self.llegadas = np.zeros((J, T), dtype=np.int64)  # camiones que llegan desde las importaciones
+        self.inventario_inicial = np.zeros(J, dtype=np.int64)
+        self.capacidad = np.zeros(J, dtype=np.int64)
+        self.tiempo_proceso = np.zeros(J, dtype=np.int64)
+        self.media_consumo = np.zeros((J, T), dtype=np.float64)  # promedio del consumo desde t hasta el final
+        self.consumo_pendiente = np.zeros((J, T), dtype=np.int64)  # consumo desde t hasta el final
+
+        self.inventario = np.zeros((J, T), dtype=np.int64)
+        self.backorder = np.zeros((J, T), dtype=np.int64)
+        self.dio = np.zeros((J, T), dtype=np.int64)
+        self.capacidad_dio = np.zeros((J, T), dtype=np.int64)
+        self.camion_dio = np.zeros((J, T), dtype=np.int64)
+
+        self.tiempo_consumido = np.zeros((len(self.plantas), T), dtype=np.int64)
+
+        for (planta, ingrediente), j in self.indice.items():
+
+            ingrediente_values = plantas[planta]['ingredientes'][ingrediente]
+
+            self.consumo[j] = ingrediente_values['consumo']
+            self.llegada_planeada[j] = ingrediente_values['llegada_planeada']
+            self.inventario_inicial[j] = ingrediente_values['inventario_inicial']
+            self.capacidad[j] = ingrediente_values['capacidad']
+            self.tiempo_proceso[j] = ingrediente_values['tiempo_proceso']
+
+            # Promedios de consumo por sufijo, calculados una sola vez
+            self.media_consumo[j] = [np.mean(ingrediente_values['consumo'][t:]) for t in range(self.periodos)]
+
+        self.consumo_pendiente[:] = np.cumsum(self.consumo[:, ::-1], axis=1)[:, ::-1]
+
+        # Capacidad y aporte de un camion en dias no dependen de los despachos
+        self.capacidad_dio[:] = self._get_dio(self.capacidad[:, None], self.media_consumo)
+        self.camion_dio[:] = self._get_dio(self.cap_camion, self.media_consumo)
+
+    def _vincular_problema(self):
+
+        plantas = self.problema['plantas']
+
+        for planta in self.plantas:
+            plantas[planta]['tiempo_consumido'] = self.tiempo_consumido[self.indice_planta[planta]]
+
+        for (planta, ingrediente), j in self.indice.items():
+
+            ingrediente_values = plantas[planta]['ingredientes'][ingrediente]
+
+            ingrediente_values['inventario'] = self.inventario[j]
+            ingrediente_values['backorder'] = self.backorder[j]
+            ingrediente_values['dio'] = self.dio[j]
+            ingrediente_values['capacidad_dio'] = self.capacidad_dio[j]
+            ingrediente_values['camion_dio'] = self.camion_dio[j]
+
+    def _get_dio(self, inventario, media: np.ndarray) -> np.ndarray:
+        # Días de inventario sobre el consumo promedio, para varios periodos a la vez
+        inventario = np.broadcast_to(inventario, media.shape).astype(np.float64)
+        dio = np.zeros(media.shape, dtype=np.float64)
+        np.divide(inventario, media, out=dio, where=media > 0)
+        return dio.astype(np.int64)
+
+    def _calcular_ingrediente(self, j: int, desde=0):
+
+        # Recalcula inventario, backorder y dio de un ingrediente desde el periodo 'desde'.
+        # inventario[t] = max(0, inventario[t-1] + neto[t]) se resuelve como la suma
+        # acumulada menos su minimo acumulado (cuando este es negativo)
+
+        if desde == 0:
+            inventario_anterior = self.inventario_inicial[j]
+        else:
+            inventario_anterior = self.inventario[j, desde-1]
+
+        neto = self.llegadas[j, desde:]*self.cap_camion + self.llegada_planeada[j, desde:] - self.consumo[j, desde:]
+
+        acumulado = inventario_anterior + np.cumsum(neto)
+        inventario = acumulado - np.minimum(0, np.minimum.accumulate(acumulado))
+
+        anterior = np.concatenate(([inventario_anterior], inventario[:-1]))
+
+        self.inventario[j, desde:] = inventario
+        self.backorder[j, desde:] = np.maximum(0, -(anterior + neto))
+        self.dio[j, desde:] = self._get_dio(inventario, self.media_consumo[j, desde:])
+
+    def calcular_planta(self, planta: str):
+
+        # Recalculo completo de la planta a partir de las llegadas registradas en el diccionario
+
+        plantas = self.problema['plantas']
+        p = self.indice_planta[planta]
+
+        self.tiempo_consumido[p] = 0
+
+        for ingrediente, ingrediente_values in plantas[planta]['ingredientes'].items():
+
+            if (planta, ingrediente) not in self.indice.keys():
+                logging.critical(
+                    f"No hay capacidad para {ingrediente} en la planta {planta}")
+
+                if 'inventario_inicial' not in ingrediente_values.keys():
+                    logging.critical(
+                        f"No hay inventario inicial de {ingrediente} en la planta {planta}")
+
+                continue
+
+            j = self.indice[(planta, ingrediente)]
+
+            self.llegadas[j] = 0
+            if 'llegadas' in ingrediente_values.keys():
+                for impo in ingrediente_values['llegadas'].keys():
+                    self.llegadas[j] += ingrediente_values['llegadas'][impo]
+
+            self.tiempo_consumido[p] += self.llegadas[j]*self.tiempo_proceso[j]
+
+            self._calcular_ingrediente(j)
+
+    def registrar_llegada(self, planta: str, ingrediente: str, t: int, camiones=1):
+
+        # Actualización incremental: solo cambia el ingrediente que recibe el camion
+        # y solo desde el periodo de llegada en adelante
+        j = self.indice[(planta, ingrediente)]
+
+        self.llegadas[j, t] += camiones
+        self.tiempo_consumido[self.indice_planta[planta], t] += camiones*self.tiempo_proceso[j]
+
+        self._calcular_ingrediente(j, desde=t)
@@ -1,142 +1,103 @@
-import pulp as pu
 import pandas as pd
-from datetime import datetime
+import numpy as np
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src.client.problema_arreglos import ProblemaArreglos, TIPOS_DESPACHO
+from src.client.modelo_lineal import ModeloLineal, resolver, resolver_por_ventanas
+from src.client.motores import ConfiguracionSolver
+from src.client.agregacion import ImportacionesAgregadas
 
 class Fase4Model():
 
-    def __init__(self, problema:dict) -> None:
+    def __init__(self, problema:dict, arreglos: ProblemaArreglos = None, por_ingrediente=False, procesos: int = None,
+                 configuracion: ConfiguracionSolver = None, ventana: int = None, avance: int = None,
+                 agregacion: str = None) -> None:
         self.problema = problema
-        
+
+        if configuracion is None:
+            configuracion = ConfiguracionSolver(tiempo_limite=60*5, gap_relativo=0.00005)
+
+        self.configuracion = configuracion
+
+        # Con por_ingrediente se resuelve un modelo por ingrediente, hasta 'procesos' a la vez
+        self.por_ingrediente = por_ingrediente
+        self.procesos = procesos if procesos is not None else os.cpu_count()
+
+        # Con ventana se resuelve con horizonte rodante, fijando 'avance' periodos en cada paso
+        self.ventana = ventana
+        self.avance = avance if avance is not None or ventana is None else max(1, ventana//2)
+
+        # Sin arreglos se construyen a partir del diccionario, lo que vuelve a vincular sus series
+        if arreglos is None:
+            arreglos = ProblemaArreglos(problema)
+
+        self.arreglos = arreglos
+
+        # Con agregacion ('ingrediente' o 'puerto') el modelo se arma sobre importaciones agregadas
+        # y sus despachos se reparten después entre las importaciones reales
+        self.agregadas = ImportacionesAgregadas(arreglos, agregacion) if agregacion is not None else None
+        self.fuente = self.agregadas if self.agregadas is not None else arreglos
+
         self.periodos = self.problema['fechas']
         self.plantas = list(self.problema['plantas'].keys())
         self.ingredientes = list(self.problema['importaciones'].keys())
-        
-        self.M_set = None
-        self.I_set = None
-        self.P_set = None
-        self.T_set = None
-        self.Xipt = None
-        self.Cipt = None
-        self.Tipt = None
-        self.Iit  = None
-        self.Ait  = None
-        self.Ai   = None
-        
+
+        self.arco_importacion = None # importacion (o importacion agregada) de cada arco factible (i,p)
+        self.arco_planta = None      # planta de cada arco factible (i,p)
+        self.TIpt = None
+        self.modelo = None
+        self.inicial = None          # plan de la heuristica en el orden de columnas del modelo
+        self.reserva = None          # inventario en puerto que necesita el resto del plan de la heuristica
+        self.ingrediente_fila = None     # ingrediente de cada restricción del modelo
+        self.ingrediente_columna = None  # ingrediente de cada variable del modelo
+        self.periodo_fila = None         # periodo de cada restricción del modelo
+        self.periodo_columna = None      # periodo de cada variable del modelo
+        self.Xipt = None             # solucion [arcos,T]
+        self.Iit = None              # solucion [I,T]
+        self.resuelto = False        # sin solución se conserva el plan de la heuristica
+        self.reporte_df = None
+        self.reporte2_df = None
+
         self._generar_parametros_modelo()
         self._resolver_problema()
-        self._generar_reporte_optimizacion()
-        self._generar_reporte_fase4()
- 
-         
+
+        if self.resuelto:
+            self._generar_reporte_optimizacion()
+            self._generar_reporte_fase4()
+
+
     def _generar_parametros_modelo(self):
-        
-        importaciones = self.problema['importaciones']
-        fechas = self.problema['fechas']
-        
-        M_set = list()
-        I_set = list()
-        P_set = list()
-        T_set = list(range(len(fechas)))     
-        Xipt = dict() # Cantidad de camiones que se despachan desde la importacion i hacia la planta p durante el periodo t
-        Cipt = dict() # Costo de enviar un camion desde la importacion i hacia la planta p durante el periodo t
-        TIpt = dict() # Cantidad de camiones que se despacharán a la planta p durante el periodo t
-        Iit  = dict() # Inventario de producto en la importacion i al final de t
-        Ait  = dict() # Cantidad de producto en kilogramos que esta llegando a la importacion i durante el periodo t
-        Ai   = dict() # Inventario inicial de la importacion i
-        
-        for ingrediente in importaciones.keys():
-            M_set.append(ingrediente)
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            
-                            impo_obj = importaciones[ingrediente][puerto][operador][empresa][importacion]
-                            impo_name = f"{ingrediente}_{puerto}_{operador}_{empresa}_{importacion}" 
-                            I_set.append(impo_name)
-                            
-                            # Variable de inventario puerto
-                            Iit[impo_name] = dict()
-                            Ait[impo_name] = dict()
-                            
-                            # inventario inicial puerto
-                            Ai[impo_name] = impo_obj['inventario_inicial'] 
-                            
-                            
-                            for t in range(len(fechas)):
-                                # Generar variable Iit
-                                inventario_puerto_var_name = f"{impo_name}_{t}"
-                                inventario_puerto_var = pu.LpVariable(name=inventario_puerto_var_name, lowBound=0, cat=pu.LpContinuous)
-                                Iit[impo_name][t] = inventario_puerto_var  
-                                
-                                # Llegadas de inventario a puerto
-                                Ait[impo_name][t] = impo_obj['llegadas'][t]
-                                
-                            
-                            Xipt[impo_name] = dict()
-                            Cipt[impo_name] = dict()
-                            
-                            for planta in impo_obj['despachos']:
-                                
-                                if not planta in P_set:
-                                    P_set.append(planta)
-                              
-                                if len(impo_obj['despachos'][planta]):
-                                
-                                    Xipt[impo_name][planta] = dict() 
-                                    Cipt[impo_name][planta] = dict()
-                                    
-                                    for t in range(len(fechas)):
-                                        
-                                        # Llenar el valor del costo de despacho
-                                        Cipt[impo_name][planta][t] = impo_obj['costo_despacho_camion'][planta][t]
-                                        # Generar variable Xipt
-                                        despacho_var_name = f"_{impo_name}_{planta}_{t}"
-                                        despacho_var = pu.LpVariable(name=despacho_var_name, lowBound=0, cat=pu.LpInteger)
-                                        Xipt[impo_name][planta][t] = despacho_var
-
-
-        # Ir por los totales despachados a las plantas
-        for ingrediente in importaciones.keys():
-            TIpt[ingrediente] = dict()
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'].keys():
-                                
-                                if not planta in TIpt[ingrediente].keys():
-                                    TIpt[ingrediente][planta] = dict() 
-                                
-                                if 'minimo' in importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta].keys():
-                                    
-                                    for t in range(len(fechas)):
-                                        if not t in TIpt[ingrediente][planta].keys():
-                                                # Completar parametro Tipt    
-                                                TIpt[ingrediente][planta][t] = {'minimo':0, 'safety_stock':0, 'target':0}
-
-                                        # Llenar la cantidad de camiones despachados haacia la planta
-                                        TIpt[ingrediente][planta][t]['minimo']       += importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['minimo'][t]
-                                        TIpt[ingrediente][planta][t]['safety_stock'] += importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['safety_stock'][t]
-                                        TIpt[ingrediente][planta][t]['target']       += importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['target'][t] 
-
-        print('camiones en modelo lp', sum([sum(TIpt[i][p][t].values()) for i in TIpt.keys() for p in TIpt[i].keys() for t in TIpt[i][p].keys()])  )                    
-                                            
-                                            
-        self.M_set = M_set
-        self.I_set = I_set
-        self.P_set = P_set
-        self.T_set = T_set
-        self.Xipt = Xipt
-        self.Cipt = Cipt
+
+        arreglos = self.fuente
+        T = len(self.problema['fechas'])
+
+        # Solo los arcos importacion-planta donde la planta consume el ingrediente
+        self.arco_importacion, self.arco_planta = np.nonzero(arreglos.factible)
+
+        # Cantidad de camiones que se despacharán a la planta p durante el periodo t, por ingrediente y tipo
+        arco_ingrediente = arreglos.ingrediente[self.arco_importacion]
+        llave = arco_ingrediente.astype(np.int64)*len(arreglos.plantas) + self.arco_planta
+        self.grupos, self.arco_grupo = np.unique(llave, return_inverse=True)
+
+        self.totales = np.zeros((self.grupos.shape[0], T, len(TIPOS_DESPACHO)), dtype=np.int64)
+        np.add.at(self.totales, self.arco_grupo, arreglos.despachos[self.arco_importacion, self.arco_planta])
+
+        TIpt = {ingrediente: {planta: dict() for planta in self.plantas} for ingrediente in self.ingredientes}
+        for g, llave_grupo in enumerate(self.grupos):
+            ingrediente = arreglos.ingredientes[llave_grupo // len(arreglos.plantas)]
+            planta = arreglos.plantas[llave_grupo % len(arreglos.plantas)]
+            TIpt[ingrediente][planta] = {t: {tipo: int(self.totales[g, t, k]) for k, tipo in enumerate(TIPOS_DESPACHO)} for t in range(T)}
+
+        print('camiones en modelo lp', int(self.totales.sum()))
+
         self.TIpt = TIpt
-        self.Iit = Iit
-        self.Ait = Ait
-        self.Ai = Ai
- 
+        self.modelo = self._generar_modelo()
+        self.inicial = self._generar_solucion_inicial()
+
+
+    def _generar_modelo(self) -> ModeloLineal:
 
-    def _resolver_problema(self):
-        
         # Xipt : Cantidad de camiones que se despachan desde la importacion i hacia la planta p durante el periodo t
         # Cipt : Costo de enviar un camion desde la importacion i hacia la planta p durante el periodo t
         # TIpt : Cantidad de camiones que se despacharán a la planta p durante el periodo t
@@ -147,196 +108,293 @@ class Fase4Model():
         # Funcion objetivo
         # Min Sum(i,p,t){Cipt*Xipt}
         # Sujeto a:
-        # Sum(i,p,t){Xipt} == TIpt
+        # Iit = Ii(t-1) + Ait - cap_camion*Sum(p){Xipt}
+        # Sum(i de m){Xipt} >= TImpt,  para t en 1..T-3
+
+        arreglos = self.fuente
+        cap_camion = self.problema['capacidad_camion']
+
+        I = arreglos.ingrediente.shape[0]
+        A = self.arco_importacion.shape[0]
+        T = len(self.problema['fechas'])
+
+        # Columnas: Xipt en arco*T + t, seguidas de Iit en A*T + i*T + t
+        x = np.arange(A*T).reshape(A, T)
+        inv = A*T + np.arange(I*T).reshape(I, T)
+        t = np.arange(T)
+
+        c = np.concatenate((arreglos.costo_despacho_camion[self.arco_importacion, self.arco_planta].ravel(),
+                            np.zeros(I*T)))
+
+        # Balance de inventario en puerto, fila i*T + t
+        filas = [np.arange(I*T), (np.arange(I)[:, None]*T + t[1:]).ravel(), (self.arco_importacion[:, None]*T + t).ravel()]
+        columnas = [inv.ravel(), inv[:, :-1].ravel(), x.ravel()]
+        coeficientes = [np.ones(I*T), -np.ones(I*(T-1)), np.full(A*T, cap_camion, dtype=np.float64)]
+
+        rhs_balance = arreglos.llegadas.copy()
+        rhs_balance[:, 0] += arreglos.inventario_inicial
+
+        # Cumplir con el despacho total de cada ingrediente, planta y periodo
+        requerido = self.totales.sum(axis=2)  # [grupos,T]
+        activo = np.zeros(requerido.shape, dtype=bool)
+        activo[:, 1:T-2] = requerido[:, 1:T-2] > 0
+
+        fila_demanda = np.full(requerido.shape, -1, dtype=np.int64)
+        fila_demanda[activo] = I*T + np.arange(activo.sum())
+
+        arco_fila = fila_demanda[self.arco_grupo]  # [A,T]
+        usado = arco_fila >= 0
+        filas.append(arco_fila[usado])
+        columnas.append(x[usado])
+        coeficientes.append(np.ones(usado.sum()))
+
+        fila_inf = np.concatenate((rhs_balance.ravel(), requerido[activo]))
+        fila_sup = np.concatenate((rhs_balance.ravel(), np.full(activo.sum(), np.inf)))
 
+        enteras = np.concatenate((np.ones(A*T, dtype=bool), np.zeros(I*T, dtype=bool)))
 
-        model = pu.LpProblem(f"Bios", sense=pu.LpMinimize)
-        
+        # Los ingredientes no comparten filas ni columnas, el modelo es separable por ingrediente
+        grupo_ingrediente = self.grupos // len(arreglos.plantas)
+        self.ingrediente_fila = np.concatenate((np.repeat(arreglos.ingrediente, T),
+                                                grupo_ingrediente[np.nonzero(activo)[0]]))
+        self.ingrediente_columna = np.concatenate((np.repeat(arreglos.ingrediente[self.arco_importacion], T),
+                                                   np.repeat(arreglos.ingrediente, T)))
+
+        self.periodo_fila = np.concatenate((np.tile(t, I), np.nonzero(activo)[1]))
+        self.periodo_columna = np.concatenate((np.tile(t, A), np.tile(t, I)))
+
+        return ModeloLineal(c=c,
+                            filas=np.concatenate(filas),
+                            columnas=np.concatenate(columnas),
+                            coeficientes=np.concatenate(coeficientes),
+                            fila_inf=fila_inf,
+                            fila_sup=fila_sup,
+                            x_inf=np.zeros(A*T + I*T),
+                            x_sup=np.full(A*T + I*T, np.inf),
+                            enteras=enteras)
+
+
+    def _generar_solucion_inicial(self) -> np.ndarray:
+
+        # Los despachos de las fases 1 a 3 cumplen las restricciones de demanda con igualdad,
+        # el inventario en puerto se obtiene del mismo balance del modelo
+
+        arreglos = self.fuente
         cap_camion = self.problema['capacidad_camion']
-        
-        # Funcion objetivo        
-        fobj = [self.Cipt[i][p][t]*self.Xipt[i][p][t] for i in self.Xipt.keys() for p in self.Xipt[i].keys() for t in self.Xipt[i][p].keys()]
-
-        # Restriccion Balance inventario
-        balance_inv = list()
-        
-        for i in self.Iit.keys():
-
-            inv_inicial = self.Ai[i]
-            for t in self.Iit[i].keys():
-                rest_name = f"balinv_{i}_{t}"
-                inv_actual = self.Iit[i][t]
-                llegada = self.Ait[i][t]
-
-                despachos = list()
-                for p in self.Xipt[i].keys():
-                    if t in self.Xipt[i][p].keys():
-                        despachos.append(self.Xipt[i][p][t])
-
-                despachos = cap_camion*pu.lpSum(despachos)
-
-                if t >0:
-                    inv_anterior =   self.Iit[i][t-1]              
-                    rest = (inv_actual ==  inv_anterior + llegada - despachos, rest_name)
-                else:
-                    rest = (inv_actual ==  inv_inicial + llegada - despachos, rest_name)
-        
-                balance_inv.append(rest)        
-        
-        # Cumplir con el despacho total
-        despacho_total = list()
-        for m in self.TIpt.keys():
-            for p in self.TIpt[m].keys():
-                for t in self.T_set[1:-2:]:
-                
-                    rest_name = f"despacho_{p}_{m}_{t}"
-
-                    sum_despachos = [self.Xipt[i][p][t] for i in self.Xipt.keys() if m in i and p in self.Xipt[i].keys()]
-                    
-                    if len(sum_despachos) > 0:
-                        if t in self.TIpt[m][p].keys():
-                            if sum(self.TIpt[m][p][t].values())>0:
-                                rest = (pu.lpSum(sum_despachos) >= sum(self.TIpt[m][p][t].values()), rest_name)
-                                despacho_total.append(rest)
-            
-                        
-        model += pu.lpSum(fobj)
-
-        for rest in balance_inv:
-            model += rest  
-
-        for rest in despacho_total:
-            model += rest  
-
-
-        engine_cbc = pu.PULP_CBC_CMD(
-            gapRel=0.00005,
-            timeLimit=60*5,
-            # gapAbs=5000000,
-            warmStart=False,
-            # threads=cpu_count
-        )
-
-        model.solve(engine_cbc)                     
 
+        I = arreglos.ingrediente.shape[0]
+        T = len(self.problema['fechas'])
 
-    def _generar_reporte_optimizacion(self)->pd.DataFrame:
+        Xipt = arreglos.despachos[self.arco_importacion, self.arco_planta].sum(axis=2)  # [A,T]
 
-        registros = list()
-        for i in self.Xipt.keys():
-            for p in self.Xipt[i].keys():
-                for t in self.Xipt[i][p].keys():
-                    if self.Xipt[i][p][t].varValue>0:
-                        campos = i.split('_')
-                        dato = {
-                            "ingrediente" : campos[0],
-                            "puerto" : campos[1],
-                            "operador" : campos[2],
-                            "empresa" : campos[3],
-                            "importacion" : campos[4],
-                            "planta" : p,
-                            "periodo": t,
-                            "camiones": int(self.Xipt[i][p][t].varValue),
-                            "costo_camion": self.Cipt[i][p][t]
-                        }
-                        registros.append(dato)
-
-        self.reporte_df = pd.DataFrame(registros)
-        self.reporte_df = self.reporte_df.sort_values(['planta', 'ingrediente', 'periodo', 'costo_camion'], ascending=[True, True, True, False]).copy()
-        
-       
-    def _generar_reporte_fase4(self):
-        
-        df = self.reporte_df.copy()
-        TIpt = self.TIpt.copy()
-        
-        minimo_list = list()
-        safety_list = list()
-        target_list = list()
-            
-        for i in df.index:
-            
-            ingrediente = df.loc[i]['ingrediente']
-            planta = df.loc[i]['planta']
-            t = df.loc[i]['periodo']
-            camiones = df.loc[i]['camiones']
-            
-            minimo = 0
-            safety = 0
-            target = 0
-            
-            while camiones >0:
-                
-                if TIpt[ingrediente][planta][t]['minimo'] > 0:
-                    
-                    TIpt[ingrediente][planta][t]['minimo'] -=1
-                    minimo +=1
-                    
-                elif TIpt[ingrediente][planta][t]['safety_stock'] > 0:
-                    
-                    TIpt[ingrediente][planta][t]['safety_stock'] -=1
-                    safety += 1
-                
-                elif TIpt[ingrediente][planta][t]['target'] > 0:
-                    
-                    TIpt[ingrediente][planta][t]['target'] -=1
-                    target+=1
-                    
-                camiones -=1
-                    
-            minimo_list.append(minimo)
-            safety_list.append(safety)
-            target_list.append(target)
-        
-        df['minimo'] = minimo_list
-        df['safety_stock'] = safety_list
-        df['target'] = target_list
-        
-        self.reporte2_df = df.copy()
-        
-        
-        
-        
-                
-                
-        
-        
+        salidas = np.zeros((I, T), dtype=np.float64)
+        np.add.at(salidas, self.arco_importacion, cap_camion*Xipt)
 
+        entradas = arreglos.llegadas.copy()
+        entradas[:, 0] += arreglos.inventario_inicial
+        Iit = np.cumsum(entradas - salidas, axis=1)
 
+        inicial = np.concatenate((Xipt.ravel(), Iit.ravel())).astype(np.float64)
 
+        if not self.modelo.es_factible(inicial):
+            logging.warning("El plan de la heuristica no es factible para el modelo de fase 4, se resuelve sin solución inicial")
+            return None
 
+        return inicial
 
+    def _resolver_problema(self):
 
+        A = self.arco_importacion.shape[0]
+        T = len(self.problema['fechas'])
 
+        if self.ventana is not None and self.inicial is not None:
+            self.reserva = self._generar_reserva()
 
+        try:
+            if self.por_ingrediente:
+                solucion = self._resolver_por_ingrediente()
+            else:
+                solucion = self._resolver(self.modelo, self.periodo_fila, self.periodo_columna, self.configuracion,
+                                          self.inicial, self.reserva)
+
+            self.Xipt = solucion[:A*T].reshape(A, T)
+            self.Iit = solucion[A*T:].reshape(-1, T)
+
+            if self.agregadas is not None:
+                self._desagregar_solucion()
+
+        except Exception as e:
+            logging.error("La fase 4 no encontró una solución, se conserva el plan de la heuristica: %s", e)
+            return
+
+        self.resuelto = True
+
+
+    def _desagregar_solucion(self):
+
+        # Los camiones de cada arco agregado se reparten entre las importaciones reales y el
+        # resto del modelo sigue con los arcos y el inventario en puerto de esas importaciones
+        arreglos = self.arreglos
+        agregadas = self.agregadas
+        cap_camion = self.problema['capacidad_camion']
 
+        despachos = np.zeros((len(agregadas.miembros), len(arreglos.plantas), self.Xipt.shape[1]), dtype=np.int64)
+        despachos[self.arco_importacion, self.arco_planta] = np.rint(self.Xipt).astype(np.int64)
 
+        Xipt = agregadas.desagregar(despachos)
 
+        self.arco_importacion, self.arco_planta = np.nonzero(arreglos.factible)
+        self.Xipt = Xipt[self.arco_importacion, self.arco_planta].astype(np.float64)
 
+        entradas = arreglos.llegadas.copy()
+        entradas[:, 0] += arreglos.inventario_inicial
+        self.Iit = np.cumsum(entradas - cap_camion*Xipt.sum(axis=1), axis=1)
 
+    def _generar_reserva(self) -> np.ndarray:
 
+        # Una ventana miope puede agotar una importación que la demanda posterior necesita.
+        # Si al final de t queda en puerto lo que el plan de la heuristica saca después de t,
+        # ese plan sigue siendo factible para el resto del horizonte y ninguna ventana queda infactible
+        A = self.arco_importacion.shape[0]
+        T = len(self.problema['fechas'])
 
+        Iit = self.inicial[A*T:].reshape(-1, T)
+        flujo = np.diff(Iit, axis=1)  # entradas menos salidas de t+1
 
+        necesario = np.zeros_like(Iit)
+        for t in range(T-2, -1, -1):
+            necesario[:, t] = np.maximum(0, necesario[:, t+1] - flujo[:, t])
 
+        return np.concatenate((np.full(A*T, -np.inf), necesario.ravel()))
+
+    def _resolver(self, modelo: ModeloLineal, periodo_fila: np.ndarray, periodo_columna: np.ndarray,
+                  configuracion: ConfiguracionSolver, inicial: np.ndarray, reserva: np.ndarray) -> np.ndarray:
+        return _resolver_modelo(modelo, periodo_fila, periodo_columna, configuracion, inicial, reserva,
+                                self.ventana, self.avance)
+
+    def _resolver_por_ingrediente(self) -> np.ndarray:
+
+        # CBC corre en un proceso aparte por cada subproblema, así que basta con hilos que esperen
+        # su resultado. HiGHS resuelve dentro del proceso que lo llama, con hilos los subproblemas
+        # compiten por el GIL y se usan procesos.
+        bloques = list()
+        for k in np.unique(self.ingrediente_columna):
+            filas = np.flatnonzero(self.ingrediente_fila == k)
+            columnas = np.flatnonzero(self.ingrediente_columna == k)
+            bloques.append((filas, columnas))
+
+        # Los hilos del motor se reparten entre los subproblemas que corren a la vez
+        procesos = max(1, self.procesos)
+        configuracion = self.configuracion.copiar(msg=False, hilos=max(1, self.configuracion.hilos//procesos))
+
+        argumentos = [(self.modelo.submodelo(filas, columnas),
+                       self.periodo_fila[filas],
+                       self.periodo_columna[columnas],
+                       configuracion,
+                       self.inicial[columnas] if self.inicial is not None else None,
+                       self.reserva[columnas] if self.reserva is not None else None,
+                       self.ventana,
+                       self.avance) for filas, columnas in bloques]
+
+        solucion = np.zeros(self.modelo.variables, dtype=np.float64)
+
+        Executor = ProcessPoolExecutor if configuracion.motor == 'highs' else ThreadPoolExecutor
+
+        with Executor(max_workers=procesos) as executor:
+            for (filas, columnas), parcial in zip(bloques, executor.map(_resolver_modelo, *zip(*argumentos))):
+                solucion[columnas] = parcial
+
+        return solucion
+
+
+    def _generar_reporte_optimizacion(self)->pd.DataFrame:
+
+        arreglos = self.arreglos
+
+        arco, t = np.nonzero(self.Xipt > 0)
+
+        registros = list()
+        for a, periodo in zip(arco, t):
+            i = self.arco_importacion[a]
+            p = self.arco_planta[a]
+            ingrediente, puerto, operador, empresa, importacion = arreglos.claves_importacion[i]
+            dato = {
+                "ingrediente" : ingrediente,
+                "puerto" : puerto,
+                "operador" : operador,
+                "empresa" : empresa,
+                "importacion" : importacion,
+                "planta" : arreglos.plantas[p],
+                "periodo": int(periodo),
+                "camiones": int(self.Xipt[a, periodo]),
+                "costo_camion": arreglos.costo_despacho_camion[i, p, periodo]
+            }
+            registros.append(dato)
+
+        columnas = ['ingrediente', 'puerto', 'operador', 'empresa', 'importacion', 'planta', 'periodo', 'camiones', 'costo_camion']
+        self.reporte_df = pd.DataFrame(registros, columns=columnas)
+        self.reporte_df = self.reporte_df.sort_values(['planta', 'ingrediente', 'periodo', 'costo_camion'], ascending=[True, True, True, False]).copy()
 
 
+    def _generar_reporte_fase4(self):
 
+        df = self.reporte_df.copy()
+        TIpt = self.TIpt.copy()
 
+        minimo_list = list()
+        safety_list = list()
+        target_list = list()
 
+        for i in df.index:
 
+            ingrediente = df.loc[i]['ingrediente']
+            planta = df.loc[i]['planta']
+            t = df.loc[i]['periodo']
+            camiones = df.loc[i]['camiones']
 
+            minimo = 0
+            safety = 0
+            target = 0
 
+            while camiones >0:
 
+                if TIpt[ingrediente][planta][t]['minimo'] > 0:
 
+                    TIpt[ingrediente][planta][t]['minimo'] -=1
+                    minimo +=1
 
+                elif TIpt[ingrediente][planta][t]['safety_stock'] > 0:
 
+                    TIpt[ingrediente][planta][t]['safety_stock'] -=1
+                    safety += 1
 
+                elif TIpt[ingrediente][planta][t]['target'] > 0:
 
+                    TIpt[ingrediente][planta][t]['target'] -=1
+                    target+=1
 
+                camiones -=1
 
+            minimo_list.append(minimo)
+            safety_list.append(safety)
+            target_list.append(target)
 
+        df['minimo'] = minimo_list
+        df['safety_stock'] = safety_list
+        df['target'] = target_list
 
+        self.reporte2_df = df.copy()
 
 
+def _resolver_modelo(modelo: ModeloLineal, periodo_fila: np.ndarray, periodo_columna: np.ndarray,
+                     configuracion: ConfiguracionSolver, inicial: np.ndarray, reserva: np.ndarray,
+                     ventana: int, avance: int) -> np.ndarray:
 
+    # Función de módulo para que los subproblemas se puedan enviar a otro proceso
+    if ventana is None:
+        return resolver(modelo, configuracion, inicial=inicial)
 
+    # Con los periodos anteriores fijos el plan de la heuristica deja de ser factible,
+    # cada ventana se resuelve sin solución inicial
+    return resolver_por_ventanas(modelo, periodo_fila, periodo_columna, ventana, avance,
+                                 lambda submodelo: resolver(submodelo, configuracion), reserva=reserva)
@@ -0,0 +1,310 @@
+import numpy as np
+import logging
+from src.client.problema_arreglos import ProblemaArreglos, TIPOS_DESPACHO
+from src.client.estado_plantas import EstadoPlantas
+from src.client.modelo_lineal import ModeloLineal, resolver, resolver_por_ventanas
+from src.client.motores import ConfiguracionSolver
+
+
+# Peso de cada faltante respecto al costo del camion más caro, en el orden de TIPOS_DESPACHO
+PESO_FALTANTE = [200.0, 20.0, 2.0]
+PESO_BACKORDER = 2000.0
+
+
+class FlujoDespacho():
+
+    def __init__(self, problema: dict, arreglos: ProblemaArreglos, estado: EstadoPlantas,
+                 configuracion: ConfiguracionSolver = None, exacto=False, ventana: int = None, avance: int = None) -> None:
+
+        # Red expandida en el tiempo de las fases 1 a 3: cada importación es un nodo por periodo
+        # que pasa inventario al siguiente y envía camiones a las plantas, que llegan 2 periodos
+        # después. Cada planta-ingrediente es un nodo por periodo que pasa inventario al siguiente,
+        # acotado por la capacidad de almacenamiento, y entrega el consumo. El tiempo de recepción
+        # de la planta limita los camiones que llegan en cada periodo. Los faltantes contra el
+        # minimo, el safety stock y el target se penalizan en ese orden por encima del flete.
+        # La matriz es casi de red, por lo que la relajación lineal es casi entera: salvo con
+        # exacto=True solo se decide si cada camion fraccionario se redondea arriba o abajo.
+
+        if configuracion is None:
+            configuracion = ConfiguracionSolver(tiempo_limite=60, gap_relativo=0.01)
+
+        self.problema = problema
+        self.arreglos = arreglos
+        self.estado = estado
+        self.configuracion = configuracion
+        self.exacto = exacto
+
+        # Con ventana se resuelve con horizonte rodante, fijando 'avance' periodos en cada paso
+        self.ventana = ventana
+        self.avance = avance if avance is not None or ventana is None else max(1, ventana//2)
+
+        self.cap_camion = problema['capacidad_camion']
+        self.periodos = len(problema['fechas'])
+        self.despacho_desde = 1  # periodos de despacho como en la heuristica, range(1, T-2)
+        self.despacho_hasta = self.periodos - 3
+
+        self.arco_importacion = None  # importacion de cada arco
+        self.arco_planta = None  # planta de cada arco en arreglos
+        self.arco_ingrediente = None  # planta-ingrediente j de cada arco en estado
+        self.niveles = None  # [tipo,J,T] inventario en kg que cubre cada tipo de despacho
+        self.modelo = None
+        self.periodo_fila = None  # periodo de cada restricción del modelo
+        self.periodo_columna = None  # periodo de cada variable del modelo
+        self.camiones = None  # solucion [arcos,periodos de despacho]
+
+        self._generar_arcos()
+        self._generar_niveles()
+        self.modelo = self._generar_modelo()
+        self._resolver_problema()
+
+    def _generar_arcos(self):
+
+        arreglos = self.arreglos
+        estado = self.estado
+
+        # Arcos con flete hacia plantas que consumen el ingrediente y tienen capacidad
+        importaciones, plantas = np.nonzero(arreglos.factible & arreglos.con_costo)
+
+        arco_ingrediente = np.array([estado.indice.get((arreglos.plantas[p], arreglos.ingredientes[arreglos.ingrediente[i]]), -1)
+                                     for i, p in zip(importaciones, plantas)], dtype=np.int64)
+        validos = arco_ingrediente >= 0
+
+        self.arco_importacion = importaciones[validos]
+        self.arco_planta = plantas[validos]
+        self.arco_ingrediente = arco_ingrediente[validos]
+
+    def _generar_niveles(self):
+
+        # Niveles donde se detiene cada fase: dio mayor a 1, dio mayor al safety stock y
+        # la capacidad menos un camion
+        estado = self.estado
+        J = len(estado.claves)
+
+        self.niveles = np.zeros((len(TIPOS_DESPACHO), J, self.periodos), dtype=np.float64)
+        self.niveles[0] = 2*estado.media_consumo
+
+        for (planta, ingrediente), j in estado.indice.items():
+            ingrediente_values = self.problema['plantas'][planta]['ingredientes'][ingrediente]
+            if 'safety_stock_dio' in ingrediente_values.keys():
+                self.niveles[1, j] = (np.array(ingrediente_values['safety_stock_dio']) + 1)*estado.media_consumo[j]
+
+        self.niveles[2] = np.maximum(0, estado.capacidad - self.cap_camion)[:, None]
+
+    def _generar_modelo(self) -> ModeloLineal:
+
+        # Xat : camiones por el arco a despachados en t, llegan a la planta en t+2
+        # Pit : inventario de la importacion i al final de t
+        # Sjt : inventario de la planta-ingrediente j al final de t, hasta su capacidad
+        # Bjt : consumo no atendido de j en t
+        # Fkjt: faltante de j en t contra el nivel del tipo k
+        #
+        # Min Sum{costo*X} + Sum{peso_backorder*B} + Sum{peso_k*F}
+        # Pit = Pi(t-1) + llegadas - cap_camion*Sum(a de i){Xat}
+        # Sjt = Sj(t-1) + planeada - consumo + Bjt + cap_camion*Sum(a hacia j){Xa(t-2)}
+        # Sjt + Fkjt >= nivel_kjt
+        # Sum(a hacia p){tiempo_proceso*Xa(t-2)} <= tiempo disponible de p
+
+        arreglos = self.arreglos
+        estado = self.estado
+        cap = self.cap_camion
+        T = self.periodos
+
+        A = self.arco_importacion.shape[0]
+        I = arreglos.importaciones_df.shape[0]
+        J = len(estado.claves)
+        P = len(estado.plantas)
+        K = len(TIPOS_DESPACHO)
+
+        d = np.arange(self.despacho_desde, self.despacho_hasta)  # periodos de despacho
+        D = d.shape[0]
+
+        # Columnas
+        x = np.arange(A*D).reshape(A, D)
+        n = A*D
+        inv_puerto = n + np.arange(I*T).reshape(I, T)
+        n += I*T
+        inv_planta = n + np.arange(J*T).reshape(J, T)
+        n += J*T
+        backorder = n + np.arange(J*T).reshape(J, T)
+        n += J*T
+        faltante = n + np.arange(K*J*T).reshape(K, J, T)
+        n += K*J*T
+
+        self.periodo_columna = np.concatenate((np.tile(d, A), np.tile(np.arange(T), I + J + J + K*J)))
+        periodo_fila = [np.tile(np.arange(T), I + J)]
+
+        costo_maximo = max(1.0, float(np.abs(arreglos.costo_despacho_camion[self.arco_importacion, self.arco_planta]).max(initial=0)))
+        peso_kg = costo_maximo/cap
+
+        c = np.zeros(n, dtype=np.float64)
+        c[x] = arreglos.costo_despacho_camion[self.arco_importacion[:, None], self.arco_planta[:, None], d[None, :]]
+        c[backorder] = PESO_BACKORDER*peso_kg
+        for k in range(K):
+            c[faltante[k]] = PESO_FALTANTE[k]*peso_kg
+
+        x_inf = np.zeros(n, dtype=np.float64)
+        x_sup = np.full(n, np.inf)
+
+        # Lo que ya se despachó se respeta, el inventario de la planta puede superar la
+        # capacidad solo si ya lo hace sin camiones nuevos
+        x_sup[inv_planta] = np.maximum(estado.capacidad[:, None], estado.inventario)
+
+        filas = list()
+        columnas = list()
+        coeficientes = list()
+        fila_inf = list()
+        fila_sup = list()
+        fila = 0
+
+        # Balance en puerto
+        despachado = arreglos.despachos.sum(axis=(1, 3))*cap  # [I,T]
+        rhs = arreglos.llegadas - despachado
+        rhs[:, 0] += arreglos.inventario_inicial
+
+        # Lo que queda en puerto al final de t debe cubrir los despachos ya programados de
+        # los periodos siguientes. La cota está implícita en el modelo completo, pero sin ella
+        # una ventana del horizonte rodante puede gastar ese inventario
+        reserva = np.zeros((I, T), dtype=np.float64)
+        for t in range(T-2, -1, -1):
+            reserva[:, t] = np.maximum(0, reserva[:, t+1] - rhs[:, t+1])
+        x_inf[inv_puerto] = reserva
+
+        balance = fila + np.arange(I*T).reshape(I, T)
+        filas += [balance.ravel(), balance[:, 1:].ravel(), balance[self.arco_importacion][:, d].ravel()]
+        columnas += [inv_puerto.ravel(), inv_puerto[:, :-1].ravel(), x.ravel()]
+        coeficientes += [np.ones(I*T), -np.ones(I*(T-1)), np.full(A*D, cap, dtype=np.float64)]
+        fila_inf.append(rhs.ravel())
+        fila_sup.append(rhs.ravel())
+        fila += I*T
+
+        # Balance en planta, los camiones despachados en t llegan en t+2
+        rhs = estado.llegada_planeada + estado.llegadas*cap - estado.consumo
+        rhs = rhs.astype(np.float64)
+        rhs[:, 0] += estado.inventario_inicial
+
+        balance = fila + np.arange(J*T).reshape(J, T)
+        filas += [balance.ravel(), balance[:, 1:].ravel(), balance.ravel(), balance[self.arco_ingrediente][:, d+2].ravel()]
+        columnas += [inv_planta.ravel(), inv_planta[:, :-1].ravel(), backorder.ravel(), x.ravel()]
+        coeficientes += [np.ones(J*T), -np.ones(J*(T-1)), -np.ones(J*T), np.full(A*D, -cap, dtype=np.float64)]
+        fila_inf.append(rhs.ravel())
+        fila_sup.append(rhs.ravel())
+        fila += J*T
+
+        # Faltantes contra cada nivel
+        for k in range(K):
+            activo = self.niveles[k] > 0
+            m = int(activo.sum())
+            nivel = fila + np.arange(m)
+            filas += [nivel, nivel]
+            columnas += [inv_planta[activo], faltante[k][activo]]
+            coeficientes += [np.ones(m), np.ones(m)]
+            fila_inf.append(self.niveles[k][activo])
+            fila_sup.append(np.full(m, np.inf))
+            fila += m
+            periodo_fila.append(np.nonzero(activo)[1])
+
+        # Tiempo de recepción de cada planta en el periodo de llegada
+        disponible = np.array([self.problema['plantas'][planta]['tiempo_disponible'] for planta in estado.plantas], dtype=np.float64)
+        planta_arco = np.array(estado.planta_de, dtype=np.int64)[self.arco_ingrediente]
+
+        recepcion = fila + np.arange(P*T).reshape(P, T)
+        filas.append(recepcion[planta_arco][:, d+2].ravel())
+        columnas.append(x.ravel())
+        coeficientes.append(np.repeat(estado.tiempo_proceso[self.arco_ingrediente].astype(np.float64), D))
+        fila_inf.append(np.full(P*T, -np.inf))
+        fila_sup.append(np.maximum(0, disponible[:, None] - estado.tiempo_consumido).ravel())
+        fila += P*T
+        periodo_fila.append(np.tile(np.arange(T), P))
+
+        self.periodo_fila = np.concatenate(periodo_fila)
+
+        enteras = np.zeros(n, dtype=bool)
+        enteras[x] = True
+
+        return ModeloLineal(c=c,
+                            filas=np.concatenate(filas),
+                            columnas=np.concatenate(columnas),
+                            coeficientes=np.concatenate(coeficientes),
+                            fila_inf=np.concatenate(fila_inf),
+                            fila_sup=np.concatenate(fila_sup),
+                            x_inf=x_inf,
+                            x_sup=x_sup,
+                            enteras=enteras)
+
+    def _resolver_problema(self):
+
+        A = self.arco_importacion.shape[0]
+        D = self.despacho_hasta - self.despacho_desde
+
+        if self.ventana is None:
+            solucion = self._resolver_modelo(self.modelo)
+        else:
+            solucion = resolver_por_ventanas(self.modelo, self.periodo_fila, self.periodo_columna,
+                                             self.ventana, self.avance, self._resolver_modelo)
+
+        self.camiones = np.rint(solucion[:A*D]).astype(np.int64).reshape(A, D)
+
+        print('camiones en flujo de despacho', int(self.camiones.sum()))
+
+        self._validar_inventario_puerto()
+
+    def _validar_inventario_puerto(self):
+
+        # Ninguna importación puede quedar con inventario negativo después de los despachos del plan
+        arreglos = self.arreglos
+
+        salidas = np.zeros(arreglos.inventario.shape, dtype=np.int64)
+        np.add.at(salidas, (self.arco_importacion, slice(self.despacho_desde, self.despacho_hasta)), self.cap_camion*self.camiones)
+
+        inventario = arreglos.inventario - np.cumsum(salidas, axis=1)
+
+        if (inventario < 0).any():
+            i, t = np.unravel_index(np.argmin(inventario), inventario.shape)
+            logging.critical("El flujo de despacho deja la importación %s con inventario %s en el periodo %s",
+                             arreglos.claves_importacion[i], inventario[i, t], t)
+            raise Exception(f"El flujo de despacho deja la importación {arreglos.claves_importacion[i]} con inventario {inventario[i, t]} en el periodo {t}")
+
+    def _resolver_modelo(self, modelo: ModeloLineal) -> np.ndarray:
+
+        if self.exacto:
+            return resolver(modelo, self.configuracion)
+
+        continuo = np.zeros(modelo.variables, dtype=bool)
+        relajado = resolver(modelo.variante(enteras=continuo), self.configuracion)
+
+        # Redondear los camiones hacia abajo siempre es factible, el modelo acotado
+        # decide cuales fracciones se completan
+        x_inf = modelo.x_inf.copy()
+        x_sup = modelo.x_sup.copy()
+        x_inf[modelo.enteras] = np.floor(relajado[modelo.enteras] + 1e-6)
+        x_sup[modelo.enteras] = np.ceil(relajado[modelo.enteras] - 1e-6)
+
+        try:
+            return resolver(modelo.variante(x_inf=x_inf, x_sup=x_sup), self.configuracion)
+        except Exception as e:
+            logging.warning("El modelo acotado del flujo no terminó con una solución entera, se redondea hacia abajo: %s", e)
+
+        # Con los camiones fijos en el redondeo hacia abajo solo queda un problema lineal para
+        # los inventarios y faltantes, que lo completa de forma consistente
+        x_sup[modelo.enteras] = x_inf[modelo.enteras]
+
+        return resolver(modelo.variante(x_inf=x_inf, x_sup=x_sup, enteras=continuo), self.configuracion)
+
+    def get_despachos(self):
+
+        # Camiones por (importacion, planta, periodo de despacho) en orden de periodo
+        periodo, arco = np.nonzero(self.camiones.T)
+
+        for a, t in zip(arco, periodo):
+            yield self.arco_importacion[a], self.arco_planta[a], self.arco_ingrediente[a], int(t + self.despacho_desde), int(self.camiones[a, t])
+
+    def get_tipo(self, j: int, t: int) -> str:
+
+        # Tipo del siguiente camion que llega a j en t según su inventario actual
+        inventario = self.estado.inventario[j, t]
+
+        for k, tipo in enumerate(TIPOS_DESPACHO[:-1]):
+            if inventario < self.niveles[k, j, t]:
+                return tipo
+
+        return TIPOS_DESPACHO[-1]
@@ -0,0 +1,84 @@
+import numpy as np
+from src.client.problema_arreglos import ProblemaArreglos
+
+
+class IndiceFuentes():
+
+    def __init__(self, arreglos: ProblemaArreglos) -> None:
+
+        # Importaciones candidatas por (ingrediente, planta, periodo) ordenadas por costo de despacho.
+        # Las listas se construyen la primera vez que se consultan. Mientras la heuristica asigna
+        # camiones el inventario en puerto solo disminuye, por lo que una importación agotada en t
+        # no vuelve a estar disponible y se salta de forma permanente.
+
+        self.arreglos = arreglos
+        self.candidatos = dict()  # (ingrediente, p, t) -> importaciones ordenadas por (costo, orden)
+        self.posicion = dict()  # (ingrediente, p, t) -> primer candidato que no se ha agotado
+        self.recorrido_lineal = set()  # llaves con costo cero, ver _get_fuente_lineal
+
+    def _generar_candidatos(self, clave: tuple):
+
+        ingrediente, p, t = clave
+
+        importaciones = self.arreglos.get_importaciones_ingrediente(ingrediente)
+        importaciones = importaciones[self.arreglos.con_costo[importaciones, p]]
+        costos = self.arreglos.costo_despacho_camion[importaciones, p, t]
+
+        # El ordenamiento estable conserva el orden del recorrido en los empates
+        self.candidatos[clave] = importaciones[np.argsort(costos, kind='stable')]
+        self.posicion[clave] = 0
+
+        if np.any(costos == 0):
+            self.recorrido_lineal.add(clave)
+
+    def disponible(self, i: int, t: int) -> bool:
+        # Al menos un camion completo en t sin dejar inventario negativo después
+        return self.arreglos.camiones_disponibles[i, t] > 0
+
+    def get_fuente(self, ingrediente: str, planta: str, t: int):
+
+        # Retorna el indice de la importación disponible de menor costo o None si no hay
+
+        clave = (ingrediente, self.arreglos.indice_planta[planta], t)
+
+        if clave not in self.candidatos.keys():
+            self._generar_candidatos(clave)
+
+        if clave in self.recorrido_lineal:
+            return self._get_fuente_lineal(clave)
+
+        candidatos = self.candidatos[clave]
+        posicion = self.posicion[clave]
+
+        while posicion < len(candidatos) and not self.disponible(candidatos[posicion], t):
+            posicion += 1
+
+        self.posicion[clave] = posicion
+
+        if posicion < len(candidatos):
+            return candidatos[posicion]
+
+        return None
+
+    def _get_fuente_lineal(self, clave: tuple):
+
+        # Con un costo igual a cero el recorrido original reinicia el minimo en la siguiente
+        # importación disponible ('if not min_costo'), se conserva ese comportamiento
+
+        ingrediente, p, t = clave
+
+        min_costo = None
+        min_importacion = None
+
+        for i in sorted(self.candidatos[clave]):
+            if self.disponible(i, t):
+                costo = self.arreglos.costo_despacho_camion[i, p, t]
+                if not min_costo:
+                    min_costo = costo
+                    min_importacion = i
+
+                if min_costo > costo:
+                    min_costo = costo
+                    min_importacion = i
+
+        return min_importacion
@@ -0,0 +1,119 @@
+import heapq
+from src.client.estado_plantas import EstadoPlantas
+
+
+# Criterios de selección de la heuristica: evitar backorder, alcanzar safety stock y alcanzar el target
+CRITERIOS = ['minimo', 'safety_stock', 'target']
+
+
+class IndiceUrgencia():
+
+    def __init__(self, problema: dict, estado: EstadoPlantas, criterio: str, periodo: int) -> None:
+
+        # Cola de prioridad de planta-ingrediente para un periodo, ordenada por
+        # (dio, -criterio secundario, orden de planta, orden de ingrediente).
+        # El desempate por orden reproduce el recorrido por plantas e ingredientes
+        # de los despachos de las fases 1 a 3.
+
+        if criterio not in CRITERIOS:
+            raise Exception(f"El criterio {criterio} no es valido, debe ser uno de {CRITERIOS}")
+
+        self.problema = problema
+        self.estado = estado
+        self.criterio = criterio
+        self.periodo = periodo
+        self.orden_ingrediente = {ingrediente: k for k, ingrediente in enumerate(problema['importaciones'].keys())}
+
+        self.version = [0]*len(estado.claves)
+        self.heap = list()
+
+        self._generar_heap()
+
+    def _generar_heap(self):
+
+        for j in range(len(self.estado.claves)):
+            entrada = self._get_entrada(j)
+            if entrada is not None:
+                self.heap.append(entrada)
+
+        heapq.heapify(self.heap)
+
+    def _get_entrada(self, j: int):
+
+        # Retorna la llave de prioridad de la planta-ingrediente o None si no puede recibir camiones
+
+        estado = self.estado
+        t = self.periodo
+        planta, ingrediente = estado.claves[j]
+        p = estado.planta_de[j]
+
+        if ingrediente not in self.orden_ingrediente.keys():
+            return None
+
+        ingrediente_values = self.problema['plantas'][planta]['ingredientes'][ingrediente]
+
+        t_disponible = self.problema['plantas'][planta]['tiempo_disponible']
+        t_consumido = estado.tiempo_consumido[p, t]
+
+        max_camiones_recepcion = int((t_disponible-t_consumido)/estado.tiempo_proceso[j])
+        max_camiones_inventario = int((estado.capacidad[j] - estado.inventario[j, t])/estado.cap_camion)
+
+        if min(max_camiones_recepcion, max_camiones_inventario) <= 0:
+            return None
+
+        dio = estado.dio[j, t]
+
+        if self.criterio == 'minimo':
+            secundario = estado.consumo_pendiente[j, t]
+
+        elif self.criterio == 'safety_stock':
+            if 'safety_stock_dio' not in ingrediente_values.keys():
+                return None
+            secundario = ingrediente_values['safety_stock_dio'][t] - dio
+            if secundario <= 0:
+                return None
+
+        else:
+            secundario = estado.capacidad_dio[j, t] - dio
+            if secundario <= 0 or dio >= estado.periodos:
+                return None
+
+        return (dio, -secundario, p, self.orden_ingrediente[ingrediente], j, self.version[j])
+
+    def actualizar_llegada(self, planta: str, t: int):
+
+        # Un camion que llega en t cambia el inventario de la planta desde t en adelante,
+        # por lo que una llegada posterior al periodo del indice no lo afecta
+        if t > self.periodo:
+            return
+
+        # Cambian el dio del ingrediente y el tiempo consumido de la planta, se reinsertan
+        # todos sus ingredientes y las entradas anteriores quedan obsoletas
+        p = self.estado.indice_planta[planta]
+
+        for j in self.estado.ingredientes_planta[p]:
+            self.version[j] += 1
+            entrada = self._get_entrada(j)
+            if entrada is not None:
+                heapq.heappush(self.heap, entrada)
+
+    def siguiente(self, ingredientes: list):
+
+        # Retorna la planta-ingrediente más urgente entre los ingredientes disponibles.
+        # Dentro de un periodo la disponibilidad en puerto solo disminuye, por lo que
+        # las entradas de ingredientes no disponibles se pueden descartar
+
+        ingredientes = set(ingredientes)
+
+        while len(self.heap) > 0:
+
+            dio, secundario, p, k, j, version = self.heap[0]
+            planta, ingrediente = self.estado.claves[j]
+
+            if version != self.version[j] or ingrediente not in ingredientes:
+                heapq.heappop(self.heap)
+                continue
+
+            return planta, ingrediente, dio, -secundario
+
+        return None, None, 1000, 0
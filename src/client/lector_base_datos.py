@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+import logging
+from sqlalchemy import create_engine
+from src.client.lector_libro import LectorLibro, HOJAS
+
+
+# Consultas que arman las hojas del archivo de entrada desde las tablas de load_file_db, una
+# consulta por hoja con los nombres ya resueltos por join
+CONSULTAS = {
+    'ingredientes': """
+        SELECT nombre
+        FROM ingredientes
+        ORDER BY id""",
+
+    'plantas': """
+        SELECT p.id, p.nombre AS planta, e.nombre AS empresa,
+               p.capacidad_recepcion_min_dia AS operacion_minutos,
+               p.tiempo_limpieza_min_dia AS minutos_limpieza
+        FROM plantas p
+        JOIN empresas e ON e.id = p.id_empresa
+        ORDER BY p.id""",
+
+    'tiempo_descargue': """
+        SELECT t.id, p.nombre AS planta, g.nombre AS ingrediente, t.tiempo_minutos
+        FROM tiempo_descargue_planta t
+        JOIN plantas p ON p.id = t.id_planta
+        JOIN ingredientes g ON g.id = t.id_ingrediente""",
+
+    'safety_stock': """
+        SELECT p.nombre AS planta, g.nombre AS ingrediente, s.dias_safety_stock AS dias_ss
+        FROM safety_stocks s
+        JOIN plantas p ON p.id = s.id_planta
+        JOIN ingredientes g ON g.id = s.id_ingrediente
+        ORDER BY s.id""",
+
+    'consumo_proyectado': """
+        SELECT c.id, p.nombre AS planta, g.nombre AS ingrediente, c.fecha_consumo AS fecha, c.consumo_kg
+        FROM consumo_proyectado c
+        JOIN plantas p ON p.id = c.id_planta
+        JOIN ingredientes g ON g.id = c.id_ingrediente""",
+
+    'unidades_almacenamiento': """
+        SELECT p.nombre AS planta, u.nombre AS unidad_almacenamiento, g.nombre AS ingrediente_actual,
+               u.inventario AS cantidad_actual, u.capacidad
+        FROM unidades u
+        JOIN plantas p ON p.id = u.id_planta
+        JOIN ingredientes g ON g.id = u.id_ingrediente
+        ORDER BY u.id""",
+
+    'tto_plantas': """
+        SELECT p.nombre AS planta, g.nombre AS ingrediente, t.fecha_llegada, t.cantidad
+        FROM transitos_planta t
+        JOIN plantas p ON p.id = t.id_planta
+        JOIN ingredientes g ON g.id = t.id_ingrediente
+        ORDER BY t.id""",
+
+    # Las importaciones con tránsitos son las de tto_puerto, las demás las del inventario en puerto
+    'importaciones': """
+        SELECT e.nombre AS empresa, o.nombre AS operador, p.nombre AS puerto, g.nombre AS ingrediente,
+               m.importacion, m.fecha_llegada, m.valor_kg, m.cantidad_puerto_kg,
+               t.cantidad AS cantidad_transito
+        FROM importaciones m
+        JOIN empresas e ON e.id = m.id_empresa
+        JOIN operadores o ON o.id = m.id_operador
+        JOIN puertos p ON p.id = m.id_puerto
+        JOIN ingredientes g ON g.id = m.id_ingrediente
+        LEFT JOIN (SELECT id_importacion, SUM(cantidad) AS cantidad
+                   FROM transitos_puerto
+                   GROUP BY id_importacion) t ON t.id_importacion = m.id
+        ORDER BY m.id""",
+
+    'costos_almacenamiento_cargas': """
+        SELECT e.nombre AS empresa, g.nombre AS ingrediente, o.nombre AS operador, p.nombre AS puerto,
+               m.importacion, c.fecha_cobro AS fecha_corte, c.valor_a_cobrar_kg AS valor_kg
+        FROM costos_almacenamiento_puerto c
+        JOIN importaciones m ON m.id = c.id_importacion
+        JOIN empresas e ON e.id = m.id_empresa
+        JOIN operadores o ON o.id = m.id_operador
+        JOIN puertos p ON p.id = m.id_puerto
+        JOIN ingredientes g ON g.id = m.id_ingrediente
+        ORDER BY c.id""",
+
+    'costos_operacion_portuaria': """
+        SELECT c.tipo_operacion, o.nombre AS operador, p.nombre AS puerto, g.nombre AS ingrediente, c.valor_kg
+        FROM costos_portuarios c
+        JOIN operadores o ON o.id = c.id_operador
+        JOIN puertos p ON p.id = c.id_puerto
+        JOIN ingredientes g ON g.id = c.id_ingrediente
+        ORDER BY c.id""",
+
+    'fletes_cop_per_kg': """
+        SELECT f.id, p.nombre AS puerto, o.nombre AS operador, g.nombre AS ingrediente,
+               l.id AS id_planta, l.nombre AS planta, f.valor_flete_kg
+        FROM fletes f
+        JOIN puertos p ON p.id = f.id_puerto
+        JOIN operadores o ON o.id = f.id_operador
+        JOIN ingredientes g ON g.id = f.id_ingrediente
+        JOIN plantas l ON l.id = f.id_planta""",
+
+    'venta_entre_empresas': """
+        SELECT i.id, o.nombre AS origen, d.nombre AS destino, i.valor_intercompany
+        FROM intercompanies i
+        JOIN empresas o ON o.id = i.id_empresa_origen
+        JOIN empresas d ON d.id = i.id_empresa_destino"""
+}
+
+# Columnas decimales que MySQL entrega como Decimal
+COLUMNAS_DECIMALES = ['valor_kg', 'valor_flete_kg', 'valor_intercompany', 'consumo_kg']
+
+
+class LectorBaseDatos(LectorLibro):
+
+    def __init__(self, origen: str, hojas=HOJAS) -> None:
+
+        # Arma las mismas hojas que LectorLibro desde la base que crea load_file_db, con una
+        # consulta por hoja, para que el Loader no tenga que leer el excel. origen es la ruta del
+        # archivo sqlite o la url de sqlalchemy de la base (por ejemplo de MySQL).
+
+        self.file = origen
+        self.hojas = list(hojas)
+        self.cache_dir = None
+
+        url = origen if '://' in origen else f'sqlite:///{origen}'
+
+        logging.debug("leyendo %s hojas desde la base de datos %s", len(self.hojas), url)
+
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conexion:
+                consultas = {nombre: self._consultar(conexion, sql) for nombre, sql in CONSULTAS.items()}
+        finally:
+            engine.dispose()
+
+        if consultas['consumo_proyectado'].shape[0] == 0:
+            logging.critical("La base de datos %s no tiene consumos proyectados", origen)
+            raise Exception(f"La base de datos {origen} no tiene consumos proyectados")
+
+        self._dataframes = self._generar_hojas(consultas)
+
+    def _consultar(self, conexion, sql: str) -> pd.DataFrame:
+
+        resultado = conexion.exec_driver_sql(sql)
+        df = pd.DataFrame(resultado.fetchall(), columns=list(resultado.keys()))
+
+        for columna in COLUMNAS_DECIMALES:
+            if columna in df.columns:
+                df[columna] = df[columna].astype(np.float64)
+
+        return df
+
+    def _generar_hojas(self, consultas: dict) -> dict:
+
+        hojas = dict()
+
+        hojas['ingredientes'] = consultas['ingredientes']
+
+        # Consumos con una columna por fecha, en el formato del archivo
+        df = consultas['consumo_proyectado']
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        df = _pivotear(df, ['planta', 'ingrediente'], 'fecha', 'consumo_kg')
+        df.columns = [x.strftime('%d/%m/%Y') if isinstance(x, pd.Timestamp) else x for x in df.columns]
+        hojas['consumo_proyectado'] = df
+
+        # La base guarda la capacidad de recepción ya multiplicada por las plataformas
+        plantas = consultas['plantas']
+        tiempos = _pivotear(consultas['tiempo_descargue'], ['planta'], 'ingrediente', 'tiempo_minutos',
+                            orden_columnas=list(consultas['ingredientes']['nombre']))
+        df = plantas.drop(columns='id').assign(plataformas=1)
+        hojas['plantas'] = df.merge(tiempos, on='planta', how='left')
+
+        hojas['safety_stock'] = consultas['safety_stock']
+
+        # Unidades ya asignadas, con su capacidad en la columna de su ingrediente
+        df = consultas['unidades_almacenamiento']
+        for ingrediente in consultas['ingredientes']['nombre']:
+            df[ingrediente] = np.where(df['ingrediente_actual'] == ingrediente, df['capacidad'], 0)
+        hojas['unidades_almacenamiento'] = df.drop(columns='capacidad')
+
+        df = consultas['tto_plantas']
+        df['fecha_llegada'] = pd.to_datetime(df['fecha_llegada'])
+        hojas['tto_plantas'] = df
+
+        df = consultas['importaciones']
+        df['fecha_llegada'] = pd.to_datetime(df['fecha_llegada'])
+        llaves = ['empresa', 'operador', 'puerto', 'ingrediente', 'importacion', 'fecha_llegada']
+        transito = df['cantidad_transito'].notna()
+
+        hojas['inventario_puerto'] = df.loc[~transito, llaves].assign(
+            valor_cif_kg=df.loc[~transito, 'valor_kg'].astype(np.float64),
+            cantidad_kg=df.loc[~transito, 'cantidad_puerto_kg'].astype(np.int64)).reset_index(drop=True)
+
+        # El Loader vuelve a repartir las llegadas según la capacidad de descarga
+        hojas['tto_puerto'] = df.loc[transito, llaves].assign(
+            valor_kg=df.loc[transito, 'valor_kg'].astype(np.float64),
+            cantidad_kg=df.loc[transito, 'cantidad_transito'].astype(np.int64)).reset_index(drop=True)
+
+        df = consultas['costos_almacenamiento_cargas']
+        df['fecha_corte'] = pd.to_datetime(df['fecha_corte'])
+        hojas['costos_almacenamiento_cargas'] = df
+
+        hojas['costos_operacion_portuaria'] = consultas['costos_operacion_portuaria']
+
+        df = consultas['fletes_cop_per_kg']
+        plantas_flete = list(df.sort_values('id_planta')['planta'].unique())
+        hojas['fletes_cop_per_kg'] = _pivotear(df, ['puerto', 'operador', 'ingrediente'], 'planta', 'valor_flete_kg',
+                                               orden_columnas=plantas_flete)
+
+        hojas['venta_entre_empresas'] = _pivotear(consultas['venta_entre_empresas'], ['origen'], 'destino', 'valor_intercompany')
+
+        return {nombre: hojas[nombre] for nombre in self.hojas}
+
+    def obtener_unidades_almacenamiento(self) -> pd.DataFrame:
+        # Las unidades de la base ya tienen ingrediente asignado, no pasan por el AsignadorCapacidad
+        return self.hoja('unidades_almacenamiento')
+
+
+def _pivotear(df: pd.DataFrame, filas: list, columna: str, valor: str, orden_columnas=None) -> pd.DataFrame:
+
+    # Una fila por llave en el orden en que se insertaron y una columna por cada valor de 'columna'
+    orden = df.groupby(filas, sort=False)['id'].min().sort_values().index
+
+    tabla = df.pivot(index=filas, columns=columna, values=valor).reindex(orden)
+    if orden_columnas is not None:
+        tabla = tabla[[x for x in orden_columnas if x in tabla.columns]]
+
+    tabla.columns = list(tabla.columns)
+
+    return tabla.reset_index()
@@ -0,0 +1,180 @@
+import pandas as pd
+import logging
+import hashlib
+import json
+import os
+import zipfile
+import posixpath
+from io import BytesIO
+from xml.etree import ElementTree
+
+
+# Hojas del archivo de entrada que usan los diferentes consumidores
+HOJAS = ['ingredientes',
+         'plantas',
+         'safety_stock',
+         'consumo_proyectado',
+         'unidades_almacenamiento',
+         'tto_plantas',
+         'tto_puerto',
+         'inventario_puerto',
+         'costos_almacenamiento_cargas',
+         'costos_operacion_portuaria',
+         'fletes_cop_per_kg',
+         'venta_entre_empresas']
+
+# Partes del libro que afectan el contenido de todas las hojas
+PARTES_COMPARTIDAS = ['xl/sharedStrings.xml', 'xl/styles.xml']
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+class LectorLibro():
+
+    def __init__(self, file, hojas=HOJAS, cache_dir=None) -> None:
+
+        self.file = file
+        self.hojas = list(hojas)
+        self.cache_dir = cache_dir
+
+        logging.debug("leyendo %s hojas del archivo en una sola pasada", len(self.hojas))
+
+        if cache_dir is None:
+            # Abrir el libro una sola vez y parsear todas las hojas requeridas
+            self._dataframes = pd.read_excel(io=file, sheet_name=self.hojas)
+        else:
+            self._dataframes = self._cargar_desde_cache()
+
+    def hoja(self, nombre: str) -> pd.DataFrame:
+        # Retorna una copia para que cada consumidor pueda modificar su dataframe
+        # sin alterar el de los demás
+        if nombre not in self._dataframes.keys():
+            raise Exception(f"La hoja {nombre} no fue cargada del archivo")
+
+        return self._dataframes[nombre].copy()
+
+    def _cargar_desde_cache(self) -> dict:
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        contenido = _leer_contenido(self.file)
+
+        # La llave del archivo completo evita inspeccionar el libro si ya se había visto
+        hash_archivo = hashlib.sha256(contenido).hexdigest()
+        manifiesto_path = os.path.join(self.cache_dir, f"{hash_archivo}.json")
+
+        if os.path.exists(manifiesto_path):
+            with open(manifiesto_path, 'r') as file:
+                huellas = json.load(file)
+        else:
+            huellas = dict()
+
+        if not all(hoja in huellas.keys() for hoja in self.hojas):
+            # Se conservan las huellas de las hojas que otros consumidores ya pidieron
+            huellas.update(_huellas_hojas(contenido=contenido,
+                                          hojas=self.hojas,
+                                          hash_archivo=hash_archivo))
+
+        dataframes = dict()
+        pendientes = list()
+
+        for hoja in self.hojas:
+            path = self._path_hoja(hoja, huellas[hoja])
+            if os.path.exists(path):
+                # Lectura columnar con memory map, sin pasar por openpyxl
+                dataframes[hoja] = pd.read_parquet(path, engine='pyarrow', memory_map=True)
+            else:
+                pendientes.append(hoja)
+
+        logging.debug("%s hojas tomadas del cache, %s hojas por leer del archivo",
+                      len(self.hojas) - len(pendientes), len(pendientes))
+
+        if len(pendientes) > 0:
+
+            # Solo se parsean las hojas que cambiaron
+            nuevas = pd.read_excel(io=BytesIO(contenido), sheet_name=pendientes)
+
+            for hoja, df in nuevas.items():
+                dataframes[hoja] = df
+                try:
+                    df.to_parquet(self._path_hoja(hoja, huellas[hoja]), engine='pyarrow')
+                except (ValueError, TypeError, NotImplementedError) as e:
+                    logging.warning("la hoja %s no se puede guardar en cache: %s", hoja, e)
+
+        with open(manifiesto_path, 'w') as file:
+            json.dump(huellas, file, indent=4)
+
+        return dataframes
+
+    def _path_hoja(self, hoja: str, huella: str) -> str:
+        return os.path.join(self.cache_dir, f"{hoja}_{huella}.parquet")
+
+
+def _leer_contenido(origen) -> bytes:
+    # Acepta rutas y objetos tipo archivo como los que entrega streamlit
+    if hasattr(origen, 'getvalue'):
+        return origen.getvalue()
+
+    if hasattr(origen, 'read'):
+        contenido = origen.read()
+        origen.seek(0)
+        return contenido
+
+    with open(origen, 'rb') as file:
+        return file.read()
+
+
+def _huellas_hojas(contenido: bytes, hojas: list, hash_archivo: str) -> dict:
+    # Calcula una huella por hoja a partir del CRC que el zip del xlsx ya guarda
+    # para cada parte, sin descomprimir ni parsear las hojas
+
+    try:
+        with zipfile.ZipFile(BytesIO(contenido)) as libro:
+
+            partes = {info.filename: info for info in libro.infolist()}
+
+            workbook = ElementTree.fromstring(libro.read('xl/workbook.xml'))
+            relaciones = ElementTree.fromstring(libro.read('xl/_rels/workbook.xml.rels'))
+
+            destinos = dict()
+            for rel in relaciones.iter(f"{NS_PKG_REL}Relationship"):
+                destino = rel.attrib['Target']
+                if destino.startswith('/'):
+                    destino = destino[1:]
+                else:
+                    destino = posixpath.normpath(posixpath.join('xl', destino))
+                destinos[rel.attrib['Id']] = destino
+
+            partes_hojas = dict()
+            for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+                partes_hojas[sheet.attrib['name']] = destinos[sheet.attrib[f"{NS_REL}id"]]
+
+            compartido = '-'.join(
+                [f"{partes[x].CRC}:{partes[x].file_size}" for x in PARTES_COMPARTIDAS if x in partes.keys()])
+
+            huellas = dict()
+            for hoja in hojas:
+                if hoja in partes_hojas.keys() and partes_hojas[hoja] in partes.keys():
+                    info = partes[partes_hojas[hoja]]
+                    llave = f"{hoja}|{info.CRC}:{info.file_size}|{compartido}"
+                else:
+                    llave = f"{hoja}|{hash_archivo}"
+                huellas[hoja] = hashlib.sha256(llave.encode('utf-8')).hexdigest()[:16]
+
+            return huellas
+
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        # Formatos que no son xlsx: se invalida el cache con cualquier cambio del archivo
+        logging.debug("no es posible calcular huellas por hoja, se usa el hash del archivo")
+        return {hoja: hashlib.sha256(f"{hoja}|{hash_archivo}".encode('utf-8')).hexdigest()[:16] for hoja in hojas}
+
+
+def abrir_libro(origen, cache_dir=None, hojas=HOJAS) -> LectorLibro:
+    # Permite que los consumidores reciban la ruta del archivo o un libro ya leído. Con una
+    # ruta solo se parsean las hojas indicadas.
+    if isinstance(origen, LectorLibro):
+        return origen
+
+    return LectorLibro(file=origen, hojas=hojas, cache_dir=cache_dir)
@@ -3,21 +3,45 @@ import numpy as np
 from tqdm import tqdm
 from src.client.asignador_capacidad import AsignadorCapacidad
 from src.client.fase4_model import Fase4Model
+from src.client.motores import ConfiguracionSolver
+from src.client.lector_libro import LectorLibro
+from src.client.lector_base_datos import LectorBaseDatos
+from src.client.problema_arreglos import ProblemaArreglos
+from src.client.costos_despacho import CostosDespacho
+from src.client.estado_plantas import EstadoPlantas
+from src.client.indice_urgencia import IndiceUrgencia
+from src.client.indice_fuentes import IndiceFuentes
+from src.client.flujo_despacho import FlujoDespacho
+from src.client.reportes import GeneradorReportes
 import logging
 import json
-from itertools import accumulate
 from datetime import datetime
-from src.client.clusters import asignar_etiquetas
+from src.client.clusters import asignar_niveles
 
 
+# De dónde se leen las hojas de entrada: el archivo de excel o la base que crea load_file_db
+FUENTES_DATOS = ['excel', 'base_datos']
+
 class Loader():
-    def __init__(self, input_file: str, cap_descarge=5000000, cap_camion=34000) -> None:
+    def __init__(self, input_file: str, cap_descarge=5000000, cap_camion=34000, cache_dir=None, fuente='excel') -> None:
 
         logging.basicConfig(level=logging.DEBUG,
                             format='%(asctime)s %(levelname)s: %(message)s',
                             datefmt='%m/%d/%Y %I:%M:%S %p')
 
+        if fuente not in FUENTES_DATOS:
+            logging.critical("La fuente %s no está soportada, use una de %s", fuente, FUENTES_DATOS)
+            raise Exception(f"La fuente {fuente} no está soportada, use una de {FUENTES_DATOS}")
+
         self.file = input_file
+        self.cache_dir = cache_dir
+        self.fuente = fuente
+        self.libro = None
+        self.costos = None
+        self.arreglos = None
+        self.estado_plantas = None
+        self.indice_urgencia = None
+        self.indice_fuentes = None
         self.problema = dict()
 
         self.problema["filename"] = input_file
@@ -28,6 +52,13 @@ class Loader():
 
     def load_data(self):
 
+        # Leer todas las hojas del archivo en una sola pasada, o desde el cache si se configuró.
+        # Con la base de datos el input_file es la ruta del sqlite o la url de la base.
+        if self.fuente == 'base_datos':
+            self.libro = LectorBaseDatos(self.file)
+        else:
+            self.libro = LectorLibro(file=self.file, cache_dir=self.cache_dir)
+
         self._load_consumos()
         self._load_inventario_planta()
         self._load_transito_planta()
@@ -46,6 +77,12 @@ class Loader():
 
         self.generar_variables_despacho()
 
+        # Respaldar las series de tiempo de las importaciones con arreglos densos
+        self.arreglos = ProblemaArreglos(self.problema, costos=self.costos)
+
+        # Inventarios en planta que se actualizan por ingrediente al asignar cada camion
+        self.estado_plantas = EstadoPlantas(self.problema)
+
         self.calcular_parametros()
 
     def _load_consumos(self):
@@ -54,7 +91,7 @@ class Loader():
 
         fixed_columns = ['planta', 'ingrediente']
 
-        df = pd.read_excel(self.file, sheet_name="consumo_proyectado")
+        df = self.libro.hoja("consumo_proyectado")
 
         temp = df[fixed_columns].duplicated()
 
@@ -95,9 +132,11 @@ class Loader():
 
         logging.debug("Cargando informacion de inventarios en planta")
 
-        asignador = AsignadorCapacidad(file=self.file)
-
-        df = asignador.obtener_unidades_almacenamiento()
+        if isinstance(self.libro, LectorBaseDatos):
+            df = self.libro.obtener_unidades_almacenamiento()
+        else:
+            asignador = AsignadorCapacidad(file=self.libro)
+            df = asignador.obtener_unidades_almacenamiento()
 
         df['Capacidad'] = df.apply(
             lambda x: x[x['ingrediente_actual']], axis=1)
@@ -139,7 +178,7 @@ class Loader():
 
         fixed_columns = ['planta', 'ingrediente', 'fecha_llegada']
 
-        df = pd.read_excel(self.file, sheet_name="tto_plantas")
+        df = self.libro.hoja("tto_plantas")
 
         df['fecha_llegada'] = df['fecha_llegada'].apply(lambda x: x.date())
         temp = df[fixed_columns].duplicated()
@@ -167,7 +206,7 @@ class Loader():
 
         logging.debug("cargando informacion de tiempos de proceso")
 
-        df = pd.read_excel(self.file, sheet_name='plantas')
+        df = self.libro.hoja('plantas')
 
         df.set_index('planta', inplace=True)
 
@@ -185,7 +224,7 @@ class Loader():
 
         logging.debug("cargando informacion de inventario de puertos")
 
-        df = pd.read_excel(self.file, sheet_name='inventario_puerto')
+        df = self.libro.hoja('inventario_puerto')
 
         df['importacion'] = df['importacion'].apply(
             lambda x: str(x).upper().strip().replace(' ', ''))
@@ -235,7 +274,7 @@ class Loader():
 
         logging.debug("cargando informacion de tránsitos a puerto")
 
-        df = pd.read_excel(self.file, sheet_name='tto_puerto')
+        df = self.libro.hoja('tto_puerto')
 
         if df[df[['empresa', 'operador', 'puerto', 'ingrediente', 'importacion']].duplicated()].shape[0] > 0:
             logging.critical("Existen transitos a puerto duplicados")
@@ -314,7 +353,7 @@ class Loader():
 
         fixed_columns = ['tipo_operacion', 'operador', 'puerto', 'ingrediente']
 
-        df = pd.read_excel(self.file, sheet_name="costos_operacion_portuaria")
+        df = self.libro.hoja("costos_operacion_portuaria")
 
         temp = df[df[fixed_columns].duplicated()]
 
@@ -371,7 +410,7 @@ class Loader():
 
         fixed_columns = ['puerto', 'operador', 'ingrediente']
 
-        df = pd.read_excel(self.file, sheet_name='fletes_cop_per_kg')
+        df = self.libro.hoja('fletes_cop_per_kg')
 
         df.set_index(fixed_columns, inplace=True)
 
@@ -393,7 +432,7 @@ class Loader():
 
         logging.debug("cargando informacion de costos intercompany")
 
-        df = pd.read_excel(self.file, sheet_name='venta_entre_empresas')
+        df = self.libro.hoja('venta_entre_empresas')
 
         df = pd.melt(frame=df, id_vars='origen', value_vars=df.drop(
             columns=['origen']).columns, var_name='destino', value_name='intercompany')
@@ -420,8 +459,7 @@ class Loader():
         fixed_columns = ['empresa', 'ingrediente', 'operador',
                          'puerto', 'importacion', 'fecha_corte']
 
-        df = pd.read_excel(
-            self.file, sheet_name='costos_almacenamiento_cargas')
+        df = self.libro.hoja('costos_almacenamiento_cargas')
 
         df['importacion'] = df['importacion'].apply(
             lambda x: str(x).upper().strip().replace(' ', ''))
@@ -462,7 +500,7 @@ class Loader():
 
     def _load_safety_stock(self):
 
-        df = pd.read_excel(self.file, sheet_name='safety_stock')
+        df = self.libro.hoja('safety_stock')
 
         df.set_index(['planta', 'ingrediente'], inplace=True)
 
@@ -509,112 +547,29 @@ class Loader():
 
     def calcular_clusters(self):
 
-        periodos = len(self.problema['fechas'])
-        importaciones = self.problema['importaciones']
-
-        cluster_data = list()
-        for ingrediente in importaciones.keys():
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'].keys():
-                                for t in range(periodos):
-                                    costo_camion = importaciones[ingrediente][puerto][operador][
-                                        empresa][importacion]['costo_despacho_camion'][planta][t]
-                                    dato = {
-                                        "ingrediente": ingrediente,
-                                        "puerto": puerto,
-                                        "operador": operador,
-                                        "empresa": empresa,
-                                        "importacion": importacion,
-                                        "planta": planta,
-                                        "periodo": t,
-                                        "costo": costo_camion
-                                    }
-                                    cluster_data.append(dato)
-
-        cluster_data_df = pd.DataFrame(cluster_data)
-
-        """
-        cluster_data = list()
-        plantas_list = list(cluster_data_df['planta'].unique())
-        for planta in tqdm(plantas_list):
-            ingredientes = list(cluster_data_df[cluster_data_df['planta']==planta]['ingrediente'].unique())
-            for ingrediente in ingredientes:
-                    df = cluster_data_df[(cluster_data_df['planta']==planta)&(cluster_data_df['ingrediente']==ingrediente)].copy()
-                    if df.shape[0]>30:
-                        ds = asignar_etiquetas(df=df, column_name='costo')
-                        cluster_data.append(ds)
-        
-        cluster_data_df = pd.concat(cluster_data)
-        """
-        cluster_data = list()
-        for ingrediente in tqdm(importaciones.keys()):
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            df = cluster_data_df[(cluster_data_df['ingrediente'] == ingrediente) &
-                                                 (cluster_data_df['puerto'] == puerto) &
-                                                 (cluster_data_df['operador'] == operador) &
-                                                 (cluster_data_df['empresa'] == empresa) &
-                                                 (cluster_data_df['importacion'] == importacion)].copy()
-
-                            if df.shape[0] > 30:
-                                ds = asignar_etiquetas(
-                                    df=df, column_name='costo')
-                                cluster_data.append(ds)
-
-        cluster_data_df = pd.concat(cluster_data)
-        ds = cluster_data_df.pivot_table(index=['ingrediente', 'puerto', 'operador', 'empresa', 'importacion', 'planta'],
-                                         columns='periodo',
-                                         values='etiqueta',
-                                         aggfunc='sum')
-
-        for ingrediente in importaciones.keys():
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            importaciones[ingrediente][puerto][operador][empresa][importacion]['cluster_despacho'] = dict(
-                            )
-                            for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'].keys():
-                                index = (ingrediente, puerto, operador,
-                                         empresa, importacion, planta)
-                                cluster_list = list(ds.loc[index])
-                                importaciones[ingrediente][puerto][operador][empresa][importacion]['cluster_despacho'][planta] = cluster_list
+        # Nivel de costo (alto, medio, bajo) de cada despacho posible, agrupando por importacion
+        # todas sus plantas y periodos, en una sola pasada sobre el tensor de costos
+        costos = self.costos
+
+        importacion, planta = np.nonzero(costos.con_costo)
+        valores = costos.costo_despacho_camion[importacion, planta]  # [arcos,T]
+        grupos = np.repeat(importacion, valores.shape[1])
+
+        etiquetas = asignar_niveles(valores=valores.ravel(), grupos=grupos).reshape(valores.shape)
+
+        fila = {(i, p): k for k, (i, p) in enumerate(zip(importacion, planta))}
+
+        for i, (ingrediente, puerto, operador, empresa, impo) in enumerate(costos.claves_importacion):
+            importacion_values = self.problema['importaciones'][ingrediente][puerto][operador][empresa][impo]
+            importacion_values['cluster_despacho'] = dict()
+            for nombre_planta in importacion_values['costo_despacho_camion'].keys():
+                k = fila[(i, costos.indice_planta[nombre_planta])]
+                importacion_values['cluster_despacho'][nombre_planta] = list(etiquetas[k])
 
     def calcular_costos(self):
-        for ingrediente, ingrediente_values in tqdm(self.problema['importaciones'].items()):
-            for puerto, puerto_values in ingrediente_values.items():
-                for operador, operador_values in puerto_values.items():
-                    for empresa, empresa_value in operador_values.items():
-                        for importacion, importacion_values in empresa_value.items():
-                            # Costos de almacenamiento
-                            costo_total_almacenamiento = list(self.cap_camion*(np.array(importacion_values['costo_almacenamiento']) + np.array(importacion_values['costos_bodegaje'])))
-                            costo_total_almacenamiento = [int(x) for x in costo_total_almacenamiento]
-                            ahorro_almacenamiento_camion = self.cap_camion*np.array(importacion_values['costo_almacenamiento'])
-                            ahorro_bodegaje_camion = self.cap_camion*np.array(importacion_values['costos_bodegaje'])
-                            
-                            importacion_values['costo_almacenamiento_camion'] = costo_total_almacenamiento
-                            importacion_values['ahorro_camion'] = list(accumulate(costo_total_almacenamiento[::-1]))[::-1]
-                            importacion_values['ahorro_almacenamiento_camion'] = list(accumulate(ahorro_almacenamiento_camion[::-1]))[::-1]
-                            importacion_values['ahorro_bodegaje_camion'] = list(accumulate(ahorro_bodegaje_camion[::-1]))[::-1]
-
-                            # Costos de despacho por camion
-                            importacion_values['costo_despacho_camion'] = dict()
-                            for planta in importacion_values['flete_camion'].keys():
-                                fletes = importacion_values['flete_camion'][planta] * np.ones(len(self.fechas))
-                                despacho_directo = self.cap_camion * np.array(importacion_values['costos_despacho_directo'])
-                                despacho_directo = [int(x) for x in despacho_directo]
-                                costo_intercompany = importacion_values['intercompany_camion'][planta] * np.ones(len(self.fechas))
-                                costo_intercompany = [int(x) for x in costo_intercompany]
-                                ahorro_almacenamiento = np.array(importacion_values['ahorro_camion'])
-                                ahorro_almacenamiento = [int(x) for x in ahorro_almacenamiento]
-                                costo_camion = fletes + despacho_directo + costo_intercompany - ahorro_almacenamiento
-                                costo_camion = [int(x) for x in costo_camion]
-                                importacion_values['costo_despacho_camion'][planta] = list(costo_camion)
+
+        # Tensor de costos de despacho por camion [I,P,T], compartido por clusters, heuristica, fase 4 y reportes
+        self.costos = CostosDespacho(self.problema, cap_camion=self.cap_camion)
 
     def generar_variables_despacho(self):
 
@@ -660,57 +615,14 @@ class Loader():
 
     def calcular_inventario_importacion(self, ingrediente: str, puerto: str, operador: str, empresa: str, importacion: str):
 
-        importaciones = self.problema['importaciones']
-
-        periodos = len(self.problema['fechas'])
+        i = self.arreglos.get_indice(ingrediente, puerto, operador, empresa, importacion)
 
-        inventario = importaciones[ingrediente][puerto][operador][empresa][importacion]['inventario_inicial']
-
-        if 'inventario' not in importaciones[ingrediente][puerto][operador][empresa][importacion].keys():
-            importaciones[ingrediente][puerto][operador][empresa][importacion]['inventario'] = [
-                0] * len(self.problema['fechas'])
-
-        for t in range(periodos):
-
-            llegadas = int(importaciones[ingrediente][puerto]
-                           [operador][empresa][importacion]['llegadas'][t])
-
-            despachos = 0
-
-            for planta, lista in importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'].items():
-                if 'minimo' in lista.keys():
-                    despachos += lista['minimo'][t]
-
-                if 'safety_stock' in lista.keys():
-                    despachos += lista['safety_stock'][t]
-
-                if 'target' in lista.keys():
-                    despachos += lista['target'][t]
-
-            despachos = despachos*self.cap_camion
-            try:
-                inventario = inventario + llegadas - despachos
-            except:
-                print('aqui fue!')
-            importaciones[ingrediente][puerto][operador][empresa][importacion]['inventario'][t] = int(
-                inventario)
+        self.arreglos.calcular_inventarios(indices=i)
 
     def calcular_inventarios_importaciones(self):
 
-        importaciones = self.problema['importaciones']
-
-        for ingrediente in importaciones.keys():
-
-            for puerto in importaciones[ingrediente].keys():
-
-                for operador in importaciones[ingrediente][puerto].keys():
-
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-
-                            self.calcular_inventario_importacion(
-                                ingrediente=ingrediente, puerto=puerto, operador=operador, empresa=empresa, importacion=importacion)
+        # Todas las importaciones en una sola operación sobre los arreglos
+        self.arreglos.calcular_inventarios()
 
     def get_total_arrivals(self, planta: str, ingrediente: str, periodo: int) -> int:
 
@@ -723,104 +635,10 @@ class Loader():
 
         return total_llegadas
 
-    def get_dio(self, inventario_actual: int, consumo: list, mode='count') -> int:
-
-        dio = 0
-        if mode == 'count':
-
-            horizonte = len(consumo)
-
-            if horizonte > 0:
-                while inventario_actual > consumo[dio] and dio < horizonte-1:
-
-                    inventario_actual -= consumo[dio]
-                    dio += 1
-
-                while inventario_actual > 0:
-                    inventario_actual -= consumo[-1]
-                    dio += 1
-
-        else:
-
-            promedio = np.mean(consumo)
-
-            if promedio > 0:
-                dio = inventario_actual / promedio
-
-        return int(dio)
-
     def calcular_inventario_planta(self, planta: str):
 
-        plantas = self.problema['plantas']
-
-        periodos = len(self.problema['fechas'])
-
-        plantas[planta]['tiempo_consumido'] = [0]*len(self.problema['fechas'])
-
-        for ingrediente in plantas[planta]['ingredientes'].keys():
-
-            if 'capacidad' not in plantas[planta]['ingredientes'][ingrediente].keys():
-                logging.critical(
-                    f"No hay capacidad para {ingrediente} en la planta {planta}")
-
-                if 'inventario_inicial' not in plantas[planta]['ingredientes'][ingrediente].keys():
-                    logging.critical(
-                        f"No hay inventario inicial de {ingrediente} en la planta {planta}")
-
-            else:
-
-                inventario = plantas[planta]['ingredientes'][ingrediente]['inventario_inicial']
-
-                if 'inventario' not in plantas[planta]['ingredientes'][ingrediente].keys():
-                    plantas[planta]['ingredientes'][ingrediente]['inventario'] = [
-                        0]*len(self.problema['fechas'])
-                    plantas[planta]['ingredientes'][ingrediente]['dio'] = [
-                        0]*len(self.problema['fechas'])
-                    plantas[planta]['ingredientes'][ingrediente]['capacidad_dio'] = [
-                        0]*len(self.problema['fechas'])
-                    plantas[planta]['ingredientes'][ingrediente]['camion_dio'] = [
-                        0]*len(self.problema['fechas'])
-                    plantas[planta]['ingredientes'][ingrediente]['inventario'] = [
-                        0]*len(self.problema['fechas'])
-                    plantas[planta]['ingredientes'][ingrediente]['backorder'] = [
-                        0]*len(self.problema['fechas'])
-
-                for t in range(periodos):
-
-                    consumo = plantas[planta]['ingredientes'][ingrediente]['consumo'][t]
-                    llegada_planeada = plantas[planta]['ingredientes'][ingrediente]['llegada_planeada'][t]
-
-                    llegadas = 0
-
-                    if 'llegadas' in plantas[planta]['ingredientes'][ingrediente].keys():
-                        for impo in plantas[planta]['ingredientes'][ingrediente]['llegadas'].keys():
-
-                            llegadas += plantas[planta]['ingredientes'][ingrediente]['llegadas'][impo][t]
-
-                            plantas[planta]['tiempo_consumido'][t] += plantas[planta]['ingredientes'][ingrediente]['llegadas'][impo][t] * \
-                                plantas[planta]['ingredientes'][ingrediente]['tiempo_proceso']
-
-                    llegadas = llegadas*self.cap_camion
-
-                    inventario = inventario + llegadas + llegada_planeada - consumo
-
-                    if inventario < 0:
-
-                        backorder = -1*inventario
-                        inventario = 0
-
-                    else:
-                        backorder = 0
-
-                    capacidad = plantas[planta]['ingredientes'][ingrediente]['capacidad']
-                    plantas[planta]['ingredientes'][ingrediente]['dio'][t] = self.get_dio(
-                        inventario_actual=inventario, consumo=plantas[planta]['ingredientes'][ingrediente]['consumo'][t:], mode='avg')
-                    plantas[planta]['ingredientes'][ingrediente]['capacidad_dio'][t] = self.get_dio(
-                        inventario_actual=capacidad, consumo=plantas[planta]['ingredientes'][ingrediente]['consumo'][t:], mode='avg')
-                    plantas[planta]['ingredientes'][ingrediente]['camion_dio'][t] = self.get_dio(
-                        inventario_actual=self.problema['capacidad_camion'], consumo=plantas[planta]['ingredientes'][ingrediente]['consumo'][t:], mode='avg')
-                    plantas[planta]['ingredientes'][ingrediente]['inventario'][t] = inventario
-                    plantas[planta]['ingredientes'][ingrediente]['backorder'][t] = backorder
+        # Recalculo completo de inventario, backorder, dio y tiempo consumido de la planta
+        self.estado_plantas.calcular_planta(planta=planta)
 
     def calcular_inventarios_planta(self):
 
@@ -829,6 +647,11 @@ class Loader():
         for planta in plantas.keys():
             self.calcular_inventario_planta(planta)
 
+    def calcular_costo_despachos(self) -> float:
+
+        # Costo de los camiones despachados en el plan actual
+        return float((self.arreglos.costo_despacho_camion[:, :, :, None]*self.arreglos.despachos).sum())
+
     def calcular_costo_backorder(self):
 
         costo_backorder = dict()
@@ -850,363 +673,49 @@ class Loader():
 
         self.calcular_inventarios_importaciones()
 
+        # Los inventarios en puerto se recalcularon, las fuentes agotadas pueden volver a estar disponibles
+        self.indice_fuentes = IndiceFuentes(self.arreglos)
+
         self.calcular_inventarios_planta()
 
         self.calcular_costo_backorder()
 
-    def get_ingredientes_disponibles(self, t: int) -> dict:
-
-        # Retorna un diccionario de ingredientes disponibles en un periodo de tiempo dado
-
-        ingredientes_disponibles = dict()
-
-        importaciones = self.problema['importaciones']
-
-        for ingrediente in importaciones.keys():
-            camiones_disponibles = 0
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            inventario_en_t = importaciones[ingrediente][puerto][
-                                operador][empresa][importacion]['inventario'][t]
-                            inventario_al_final = importaciones[ingrediente][puerto][
-                                operador][empresa][importacion]['inventario'][-1]
-                            camiones_disponibles += int(
-                                min(inventario_en_t, inventario_al_final)/self.problema['capacidad_camion'])
-
-                            if camiones_disponibles > 0:
-                                if ingrediente not in ingredientes_disponibles.keys():
-                                    ingredientes_disponibles[ingrediente] = dict(
-                                    )
-
-                                impo = f"{ingrediente}_{puerto}_{operador}_{empresa}_{importacion}"
-                                ingredientes_disponibles[ingrediente][impo] = dict(
-                                )
-                                ingredientes_disponibles[ingrediente][impo]["camiones_disponibles"] = camiones_disponibles
-                                ingredientes_disponibles[ingrediente][impo]["costo_despacho"] = dict(
-                                )
-
-                                for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'].keys():
-
-                                    ingredientes_disponibles[ingrediente][impo]["costo_despacho"][planta] = importaciones[
-                                        ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'][planta][t]
-
-        return ingredientes_disponibles
-
-    def get_ingredientes_disponibles_bajo_costo(self, t: int) -> dict:
-
-        # Retorna un diccionario de ingredientes disponibles en un periodo de tiempo dado
-
-        ingredientes_disponibles = dict()
-
-        importaciones = self.problema['importaciones']
-
-        for ingrediente in importaciones.keys():
-            camiones_disponibles = 0
-            for puerto in importaciones[ingrediente].keys():
-                for operador in importaciones[ingrediente][puerto].keys():
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                            inventario_en_t = importaciones[ingrediente][puerto][
-                                operador][empresa][importacion]['inventario'][t]
-                            inventario_al_final = importaciones[ingrediente][puerto][
-                                operador][empresa][importacion]['inventario'][-1]
-                            camiones_disponibles += int(
-                                min(inventario_en_t, inventario_al_final)/self.problema['capacidad_camion'])
-                            cluster = importaciones[ingrediente][puerto][operador][empresa][importacion]['cluster_despacho']
-                            if camiones_disponibles > 0 and cluster != 'alto':
-                                if ingrediente not in ingredientes_disponibles.keys():
-                                    ingredientes_disponibles[ingrediente] = dict(
-                                    )
-
-                                impo = f"{ingrediente}_{puerto}_{operador}_{empresa}_{importacion}"
-                                ingredientes_disponibles[ingrediente][impo] = dict(
-                                )
-                                ingredientes_disponibles[ingrediente][impo]["camiones_disponibles"] = camiones_disponibles
-                                ingredientes_disponibles[ingrediente][impo]["costo_despacho"] = dict(
-                                )
-
-                                for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'].keys():
-                                    ingredientes_disponibles[ingrediente][impo]["costo_despacho"][planta] = importaciones[
-                                        ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'][planta][t]
-
-        return ingredientes_disponibles
-
-    def get_dio_plantas(self, periodo: int) -> dict:
-
-        plantas_dio = dict()
-
-        plantas = self.problema['plantas']
-
-        for planta in plantas.keys():
-            for ingrediente in plantas[planta]['ingredientes'].keys():
-
-                t_disponible = plantas[planta]['tiempo_disponible']
-                t_consumido = plantas[planta]['tiempo_consumido'][periodo]
-
-                max_camiones_recepcion = int(
-                    (t_disponible-t_consumido)/plantas[planta]['ingredientes'][ingrediente]['tiempo_proceso'])
-                max_camiones_inventario = int((plantas[planta]['ingredientes'][ingrediente]['capacidad'] - plantas[planta]
-                                              ['ingredientes'][ingrediente]['inventario'][periodo])/self.problema['capacidad_camion'])
-
-                if min(max_camiones_recepcion, max_camiones_inventario) > 0:
-
-                    if planta not in plantas_dio.keys():
-                        plantas_dio[planta] = dict()
-
-                    if ingrediente not in plantas_dio[planta].keys():
-                        plantas_dio[planta][ingrediente] = dict()
-
-                    plantas_dio[planta][ingrediente]['dio'] = plantas[planta]['ingredientes'][ingrediente]['dio'][periodo]
-                    plantas_dio[planta][ingrediente]['capacidad_dio'] = plantas[planta]['ingredientes'][ingrediente]['capacidad_dio']
-                    plantas_dio[planta][ingrediente]['consumo_pendiente'] = sum(
-                        plantas[planta]['ingredientes'][ingrediente]['consumo'][periodo:])
-
-        return plantas_dio
-
-    def get_safety_stock_plantas(self, periodo: int) -> dict:
-
-        plantas_ss_dio = dict()
-
-        plantas = self.problema['plantas']
-
-        for planta in plantas.keys():
-            for ingrediente in plantas[planta]['ingredientes'].keys():
-                if 'safety_stock_dio' in plantas[planta]['ingredientes'][ingrediente].keys():
-
-                    t_disponible = plantas[planta]['tiempo_disponible']
-                    t_consumido = plantas[planta]['tiempo_consumido'][periodo]
-
-                    inventario = plantas[planta]['ingredientes'][ingrediente]['inventario'][periodo]
-                    dio = plantas[planta]['ingredientes'][ingrediente]['dio'][periodo]
-                    safety_stock_dio = plantas[planta]['ingredientes'][ingrediente]['safety_stock_dio'][periodo]
-                    faltante_ss_dio = safety_stock_dio - dio
+    def get_despacho_planta_minimo_costo(self, ingrediente: str, planta: str, t: int) -> dict:
 
-                    max_camiones_recepcion = int(
-                        (t_disponible-t_consumido)/plantas[planta]['ingredientes'][ingrediente]['tiempo_proceso'])
-                    max_camiones_inventario = int(
-                        (plantas[planta]['ingredientes'][ingrediente]['capacidad'] - inventario)/self.problema['capacidad_camion'])
+        # Importación disponible con el menor costo de despacho a la planta, primera en el recorrido si hay empate
+        i = self.indice_fuentes.get_fuente(ingrediente=ingrediente, planta=planta, t=t)
 
-                    if min(max_camiones_recepcion, max_camiones_inventario) > 0 and faltante_ss_dio > 0:
+        if i is None:
+            return '', '', '', ''
 
-                        if planta not in plantas_ss_dio.keys():
-                            plantas_ss_dio[planta] = dict()
+        ingrediente, puerto, operador, empresa, importacion = self.arreglos.claves_importacion[i]
 
-                        if ingrediente not in plantas_ss_dio[planta].keys():
-                            plantas_ss_dio[planta][ingrediente] = dict()
+        return puerto, operador, empresa, importacion
 
-                        plantas_ss_dio[planta][ingrediente]['dio'] = dio
-                        plantas_ss_dio[planta][ingrediente]['faltante_ss_dio'] = faltante_ss_dio
+    def asignar_camion(self, ingrediente: str, puerto: str, operador: str, empresa: str, importacion: str, planta: str, t: int, tipo: str):
 
-        return plantas_ss_dio
+        # Registrar el despacho y actualizar el inventario de la importacion desde t en adelante
+        i = self.arreglos.get_indice(ingrediente, puerto, operador, empresa, importacion)
+        p = self.arreglos.indice_planta[planta]
+        self.arreglos.agregar_despacho(i=i, p=p, t=t, tipo=tipo)
 
-    def get_target_plantas(self, periodo: int) -> dict:
+        self.problema['plantas'][planta]['ingredientes'][ingrediente]['llegadas'][
+            f"{ingrediente}_{puerto}_{operador}_{empresa}_{importacion}"][t+2] += 1
 
-        plantas_cap_dio = dict()
+        # Solo cambia el ingrediente que recibe el camion, desde su llegada en adelante
+        self.estado_plantas.registrar_llegada(planta=planta, ingrediente=ingrediente, t=t+2)
 
-        plantas = self.problema['plantas']
+        if self.indice_urgencia is not None:
+            self.indice_urgencia.actualizar_llegada(planta=planta, t=t+2)
 
-        for planta in plantas.keys():
-            for ingrediente in plantas[planta]['ingredientes'].keys():
-                if 'capacidad_dio' in plantas[planta]['ingredientes'][ingrediente].keys():
-
-                    t_disponible = plantas[planta]['tiempo_disponible']
-                    t_consumido = plantas[planta]['tiempo_consumido'][periodo]
-
-                    inventario = plantas[planta]['ingredientes'][ingrediente]['inventario'][periodo]
-                    dio = plantas[planta]['ingredientes'][ingrediente]['dio'][periodo]
-                    capacidad_dio = plantas[planta]['ingredientes'][ingrediente]['capacidad_dio'][periodo]
-                    faltante_capacidad_dio = capacidad_dio - dio
-                    aporte_camion = plantas[planta]['ingredientes'][ingrediente]['camion_dio'][periodo]
-
-                    max_camiones_recepcion = int(
-                        (t_disponible-t_consumido)/plantas[planta]['ingredientes'][ingrediente]['tiempo_proceso'])
-                    max_camiones_inventario = int(
-                        (plantas[planta]['ingredientes'][ingrediente]['capacidad'] - inventario)/self.problema['capacidad_camion'])
-
-                    if min(max_camiones_recepcion, max_camiones_inventario) > 0 and faltante_capacidad_dio > 0 and dio < len(self.problema['fechas']):
-
-                        if planta not in plantas_cap_dio.keys():
-                            plantas_cap_dio[planta] = dict()
-
-                        if ingrediente not in plantas_cap_dio[planta].keys():
-                            plantas_cap_dio[planta][ingrediente] = dict()
-
-                        plantas_cap_dio[planta][ingrediente]['dio'] = dio
-                        plantas_cap_dio[planta][ingrediente]['capacidad_dio'] = capacidad_dio
-                        plantas_cap_dio[planta][ingrediente]['camion_dio'] = aporte_camion
-                        plantas_cap_dio[planta][ingrediente]['faltante_target_dio'] = faltante_capacidad_dio
-
-        return plantas_cap_dio
-
-    def despacho_urgente(self, plantas_dio: dict, ingredientes: list):
-        # retorna la planta con la urgencia más alta
-
-        # Inicializar valores
-
-        peor_planta_dio = None
-        peor_ingrediente_dio = None
-        peor_dio = 1000
-        peor_consumo = 0
-
-        # Recorrer todas las plantas
-        for planta in plantas_dio.keys():
-            # recorrer totos los ingredientes
-            for ingrediente in ingredientes:
-                # verificar que el ingrediente este dentro de los despachable
-                if ingrediente in plantas_dio[planta].keys():
-
-                    # Inicializar variables si no se ha hecho
-                    if not peor_planta_dio:
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        peor_consumo = plantas_dio[planta][ingrediente]['consumo_pendiente']
-
-                    # Si estamos ante un peor DIO
-                    if peor_dio > plantas_dio[planta][ingrediente]['dio']:
-                        # Reasignar peor dio
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        peor_consumo = plantas_dio[planta][ingrediente]['consumo_pendiente']
-
-                    # Si los dios son iguales, comparar los consumos
-                    elif peor_dio == plantas_dio[planta][ingrediente]['dio']:
-                        if peor_consumo < plantas_dio[planta][ingrediente]['consumo_pendiente']:
-                            peor_planta_dio = planta
-                            peor_ingrediente_dio = ingrediente
-                            peor_dio = plantas_dio[planta][ingrediente]['dio']
-                            peor_consumo = plantas_dio[planta][ingrediente]['consumo_pendiente']
-
-        return peor_planta_dio, peor_ingrediente_dio, peor_dio
-
-    def despacho_para_ss(self, plantas_dio: dict, ingredientes: list):
-        # retorna la planta con la urgencia más alta
-
-        # Inicializar valores
-
-        peor_planta_dio = None
-        peor_ingrediente_dio = None
-        peor_dio = 1000
-        peor_faltante = 0
-
-        # Recorrer todas las plantas
-        for planta in plantas_dio.keys():
-            # recorrer totos los ingredientes
-            for ingrediente in ingredientes:
-                # verificar que el ingrediente este dentro de los despachable
-                if ingrediente in plantas_dio[planta].keys():
-
-                    # Inicializar variables si no se ha hecho
-                    if not peor_planta_dio:
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        try:
-                            peor_faltante = plantas_dio[planta][ingrediente]['faltante_ss_dio']
-                        except:
-                            print('Aqui es')
-
-                    # Si estamos ante un peor DIO
-                    if peor_dio > plantas_dio[planta][ingrediente]['dio']:
-                        # Reasignar peor dio
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        peor_faltante = plantas_dio[planta][ingrediente]['faltante_ss_dio']
-
-                    # Si los dios son iguales, comparar los consumos
-                    elif peor_dio == plantas_dio[planta][ingrediente]['dio']:
-                        if peor_faltante < plantas_dio[planta][ingrediente]['faltante_ss_dio']:
-                            peor_planta_dio = planta
-                            peor_ingrediente_dio = ingrediente
-                            peor_dio = plantas_dio[planta][ingrediente]['dio']
-                            peor_faltante = plantas_dio[planta][ingrediente]['faltante_ss_dio']
-
-        return peor_planta_dio, peor_ingrediente_dio, peor_dio, peor_faltante
-
-    def despacho_para_target(self, plantas_dio: dict, ingredientes: list):
-        # retorna la planta con la urgencia más alta
-
-        # Inicializar valores
-
-        peor_planta_dio = None
-        peor_ingrediente_dio = None
-        peor_dio = 1000
-        peor_faltante = 0
-
-        # Recorrer todas las plantas
-        for planta in plantas_dio.keys():
-            # recorrer totos los ingredientes
-            for ingrediente in ingredientes:
-                # verificar que el ingrediente este dentro de los despachable
-                if ingrediente in plantas_dio[planta].keys():
-
-                    # Inicializar variables si no se ha hecho
-                    if not peor_planta_dio:
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        peor_faltante = plantas_dio[planta][ingrediente]['faltante_target_dio']
-
-                    # Si estamos ante un peor DIO
-                    if peor_dio > plantas_dio[planta][ingrediente]['dio']:
-                        # Reasignar peor dio
-                        peor_planta_dio = planta
-                        peor_ingrediente_dio = ingrediente
-                        peor_dio = plantas_dio[planta][ingrediente]['dio']
-                        peor_faltante = plantas_dio[planta][ingrediente]['faltante_target_dio']
-
-                    # Si los dios son iguales, comparar los consumos
-                    elif peor_dio == plantas_dio[planta][ingrediente]['dio']:
-                        if peor_faltante < plantas_dio[planta][ingrediente]['faltante_target_dio']:
-                            peor_planta_dio = planta
-                            peor_ingrediente_dio = ingrediente
-                            peor_dio = plantas_dio[planta][ingrediente]['dio']
-                            peor_faltante = plantas_dio[planta][ingrediente]['faltante_target_dio']
-
-        return peor_planta_dio, peor_ingrediente_dio, peor_dio, peor_faltante
+    def abrir_indice_urgencia(self, criterio: str, periodo: int):
 
-    def get_despacho_planta_minimo_costo(self, ingrediente: str, planta: str, t: int) -> dict:
-
-        min_costo = None
-        min_puerto = ''
-        min_operador = ''
-        min_empresa = ''
-        min_impo = ''
-
-        importaciones = self.problema['importaciones']
-
-        for puerto in importaciones[ingrediente].keys():
-            for operador in importaciones[ingrediente][puerto].keys():
-                for empresa in importaciones[ingrediente][puerto][operador].keys():
-                    for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-                        inventario_en_t = importaciones[ingrediente][puerto][
-                            operador][empresa][importacion]['inventario'][t]
-                        inventario_al_final = importaciones[ingrediente][puerto][
-                            operador][empresa][importacion]['inventario'][-1]
-                        camiones_disponibles = int(
-                            min(inventario_en_t, inventario_al_final)/self.problema['capacidad_camion'])
-                        if camiones_disponibles > 0:
-                            if not min_costo:
-                                min_costo = importaciones[ingrediente][puerto][operador][
-                                    empresa][importacion]['costo_despacho_camion'][planta][t]
-                                min_puerto = puerto
-                                min_operador = operador
-                                min_empresa = empresa
-                                min_impo = importacion
-
-                            if min_costo > importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'][planta][t]:
-                                min_costo = importaciones[ingrediente][puerto][operador][
-                                    empresa][importacion]['costo_despacho_camion'][planta][t]
-                                min_puerto = puerto
-                                min_operador = operador
-                                min_empresa = empresa
-                                min_impo = importacion
-
-        return min_puerto, min_operador, min_empresa, min_impo
+        # Cola de prioridad de las plantas para el periodo, se actualiza con cada camion asignado
+        self.indice_urgencia = IndiceUrgencia(problema=self.problema,
+                                              estado=self.estado_plantas,
+                                              criterio=criterio,
+                                              periodo=periodo)
+        return self.indice_urgencia
 
     def gen_solucion_fase_01(self):
 
@@ -1226,44 +735,37 @@ class Loader():
         for t in tqdm(range(1, len(self.problema['fechas'])-2)):
 
             # Obtenga una lista de ingredientes disponibles en T
-            ingredientes_disponibles = self.get_ingredientes_disponibles(t)
+            ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(t)
 
             # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-            plantas_dio = self.get_dio_plantas(periodo=t+2)
+            indice = self.abrir_indice_urgencia(criterio='minimo', periodo=t+2)
 
             # Obtenga el siguiente despacho urgente
-            peor_planta_dio, peor_ingrediente_dio, dio = self.despacho_urgente(
-                plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+            peor_planta_dio, peor_ingrediente_dio, dio, consumo_pendiente = indice.siguiente(
+                ingredientes=ingredientes_disponibles)
 
-            while dio <= 1 and len(ingredientes_disponibles.keys()) > 0:
+            while dio <= 1 and len(ingredientes_disponibles) > 0:
 
                 # Obtenga la importacion cuyo despacho sea el más bajo posible
                 puerto, operador, empresa, importacion = self.get_despacho_planta_minimo_costo(
                     ingrediente=peor_ingrediente_dio, planta=peor_planta_dio, t=t)
 
                 # print(f"despachando {peor_ingrediente_dio} a {peor_planta_dio} con {dio}")
-                self.problema['importaciones'][peor_ingrediente_dio][puerto][operador][
-                    empresa][importacion]['despachos'][peor_planta_dio]['minimo'][t] += 1
-                self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['llegadas'][
-                    f"{peor_ingrediente_dio}_{puerto}_{operador}_{empresa}_{importacion}"][t+2] += 1
-
-                self.calcular_inventario_importacion(ingrediente=peor_ingrediente_dio,
-                                                     puerto=puerto,
-                                                     operador=operador,
-                                                     empresa=empresa,
-                                                     importacion=importacion)
-
-                self.calcular_inventario_planta(planta=peor_planta_dio)
+                self.asignar_camion(ingrediente=peor_ingrediente_dio,
+                                    puerto=puerto,
+                                    operador=operador,
+                                    empresa=empresa,
+                                    importacion=importacion,
+                                    planta=peor_planta_dio,
+                                    t=t,
+                                    tipo='minimo')
 
                 # Obtenga una lista de ingredientes disponibles en T
-                ingredientes_disponibles = self.get_ingredientes_disponibles(t)
-
-                # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-                plantas_dio = self.get_dio_plantas(periodo=t+2)
+                ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(t)
 
                 # Obtenga el siguiente despacho urgente
-                peor_planta_dio, peor_ingrediente_dio, dio = self.despacho_urgente(
-                    plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+                peor_planta_dio, peor_ingrediente_dio, dio, consumo_pendiente = indice.siguiente(
+                    ingredientes=ingredientes_disponibles)
 
     def gen_solucion_fase_02(self):
 
@@ -1276,19 +778,19 @@ class Loader():
         for t in tqdm(range(1, len(self.problema['fechas'])-2)):
 
             # Obtenga una lista de ingredientes disponibles en T
-            ingredientes_disponibles = self.get_ingredientes_disponibles(t)
+            ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(t)
 
-            # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-            plantas_dio = self.get_safety_stock_plantas(periodo=t+2)
+            # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el faltante más alto
+            indice = self.abrir_indice_urgencia(criterio='safety_stock', periodo=t+2)
 
             # Obtenga el siguiente despacho urgente
-            peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_ss(
-                plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+            peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+                ingredientes=ingredientes_disponibles)
 
             if peor_planta_dio and peor_ingrediente_dio:
 
                 iterar = dio <= self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['safety_stock_dio'][t] and len(
-                    ingredientes_disponibles.keys()) > 0
+                    ingredientes_disponibles) > 0
 
                 while iterar:
 
@@ -1297,33 +799,26 @@ class Loader():
                         ingrediente=peor_ingrediente_dio, planta=peor_planta_dio, t=t)
 
                     # print(f"despachando {peor_ingrediente_dio} a {peor_planta_dio} con {dio}")
-                    self.problema['importaciones'][peor_ingrediente_dio][puerto][operador][
-                        empresa][importacion]['despachos'][peor_planta_dio]['safety_stock'][t] += 1
-                    self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['llegadas'][
-                        f"{peor_ingrediente_dio}_{puerto}_{operador}_{empresa}_{importacion}"][t+2] += 1
-
-                    self.calcular_inventario_importacion(ingrediente=peor_ingrediente_dio,
-                                                         puerto=puerto,
-                                                         operador=operador,
-                                                         empresa=empresa,
-                                                         importacion=importacion)
-
-                    self.calcular_inventario_planta(planta=peor_planta_dio)
+                    self.asignar_camion(ingrediente=peor_ingrediente_dio,
+                                        puerto=puerto,
+                                        operador=operador,
+                                        empresa=empresa,
+                                        importacion=importacion,
+                                        planta=peor_planta_dio,
+                                        t=t,
+                                        tipo='safety_stock')
 
                     # Obtenga una lista de ingredientes disponibles en T
-                    ingredientes_disponibles = self.get_ingredientes_disponibles(
+                    ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(
                         t)
 
-                    # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-                    plantas_dio = self.get_safety_stock_plantas(periodo=t+2)
-
                     # Obtenga el siguiente despacho urgente
-                    peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_ss(
-                        plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+                    peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+                        ingredientes=ingredientes_disponibles)
 
                     if peor_planta_dio and peor_ingrediente_dio:
                         iterar = dio <= self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['safety_stock_dio'][t] and len(
-                            ingredientes_disponibles.keys()) > 0
+                            ingredientes_disponibles) > 0
                     else:
                         iterar = False
 
@@ -1336,11 +831,11 @@ class Loader():
         print("Ejecutando Fase 3: Incrementar DIO de manera nivelada hasta que ni haya cargas con bajo costo en cluster")
 
         t = len(self.problema['fechas'])-3
-        ingredientes_disponibles = self.get_ingredientes_disponibles_bajo_costo(
-            t=t)
-        plantas_dio = self.get_target_plantas(periodo=t+2)
-        peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_target(
-            plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+        ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(
+            t=t, bajo_costo=True)
+        indice = self.abrir_indice_urgencia(criterio='target', periodo=t+2)
+        peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+            ingredientes=ingredientes_disponibles)
 
         while peor_planta_dio and peor_ingrediente_dio:
 
@@ -1348,22 +843,22 @@ class Loader():
             for t in tqdm(range(1, len(self.problema['fechas'])-2)):
 
                 # Obtenga una lista de ingredientes disponibles en T
-                ingredientes_disponibles = self.get_ingredientes_disponibles_bajo_costo(
-                    t)
+                ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(
+                    t, bajo_costo=True)
 
-                # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-                plantas_dio = self.get_target_plantas(periodo=t+2)
+                # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el faltante más alto
+                indice = self.abrir_indice_urgencia(criterio='target', periodo=t+2)
 
                 # Obtenga el siguiente despacho urgente
-                peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_target(
-                    plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+                peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+                    ingredientes=ingredientes_disponibles)
 
                 # print(f"iterando: peor planta {peor_planta_dio}; peor ingrediente {peor_ingrediente_dio}; dio {dio}, peor faltante {peor_faltante}, t {t}")
 
                 if peor_planta_dio and peor_ingrediente_dio:
 
                     iterar = dio <= self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['capacidad_dio'][t] and len(
-                        ingredientes_disponibles.keys()) > 0
+                        ingredientes_disponibles) > 0
 
                     while iterar:
 
@@ -1372,63 +867,81 @@ class Loader():
                             ingrediente=peor_ingrediente_dio, planta=peor_planta_dio, t=t)
 
                         # print(f"despachando {peor_ingrediente_dio} a {peor_planta_dio} con {dio}")
-                        self.problema['importaciones'][peor_ingrediente_dio][puerto][operador][
-                            empresa][importacion]['despachos'][peor_planta_dio]['target'][t] += 1
-                        self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['llegadas'][
-                            f"{peor_ingrediente_dio}_{puerto}_{operador}_{empresa}_{importacion}"][t+2] += 1
-
-                        self.calcular_inventario_importacion(ingrediente=peor_ingrediente_dio,
-                                                             puerto=puerto,
-                                                             operador=operador,
-                                                             empresa=empresa,
-                                                             importacion=importacion)
-
-                        self.calcular_inventario_planta(planta=peor_planta_dio)
+                        self.asignar_camion(ingrediente=peor_ingrediente_dio,
+                                            puerto=puerto,
+                                            operador=operador,
+                                            empresa=empresa,
+                                            importacion=importacion,
+                                            planta=peor_planta_dio,
+                                            t=t,
+                                            tipo='target')
 
                         # Obtenga una lista de ingredientes disponibles en T
-                        ingredientes_disponibles = self.get_ingredientes_disponibles_bajo_costo(
-                            t)
-
-                        # identifique dentro de la lista de ingredientes, cuál planta tiene el valor más bajo en DIO. Romper empate por el consumo pendiente más alto
-                        plantas_dio = self.get_target_plantas(periodo=t+2)
+                        ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(
+                            t, bajo_costo=True)
 
                         # Obtenga el siguiente despacho urgente
-                        peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_target(
-                            plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+                        peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+                            ingredientes=ingredientes_disponibles)
 
                         if peor_planta_dio and peor_ingrediente_dio:
                             iterar = dio <= self.problema['plantas'][peor_planta_dio]['ingredientes'][peor_ingrediente_dio]['capacidad_dio'][t] and len(
-                                ingredientes_disponibles.keys()) > 0
+                                ingredientes_disponibles) > 0
                         else:
                             iterar = False
 
             t = len(self.problema['fechas'])-3
-            ingredientes_disponibles = self.get_ingredientes_disponibles_bajo_costo(
-                t=t)
-            plantas_dio = self.get_target_plantas(periodo=t+2)
-            peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = self.despacho_para_target(
-                plantas_dio=plantas_dio, ingredientes=list(ingredientes_disponibles.keys()))
+            ingredientes_disponibles = self.arreglos.get_ingredientes_disponibles(
+                t=t, bajo_costo=True)
+            indice = self.abrir_indice_urgencia(criterio='target', periodo=t+2)
+            peor_planta_dio, peor_ingrediente_dio, dio, peor_faltante = indice.siguiente(
+                ingredientes=ingredientes_disponibles)
             
             
-    def gen_solucion_fase_04(self):
+    def gen_solucion_flujo(self, configuracion: ConfiguracionSolver = None, ventana: int = None, avance: int = None):
+
+        # Alternativa a las fases 1 a 3: resolver la red de despachos como flujo de costo minimo
+        print("Ejecutando flujo de despacho: fases 1 a 3 como red de flujo")
+
+        flujo = FlujoDespacho(self.problema, arreglos=self.arreglos, estado=self.estado_plantas, configuracion=configuracion,
+                              ventana=ventana, avance=avance)
+
+        self.indice_urgencia = None
+
+        # Los camiones se asignan en orden de periodo, cada uno con el tipo que le corresponde
+        # según el inventario de la planta cuando llega, como lo haría la heuristica
+        for i, p, j, t, camiones in flujo.get_despachos():
+
+            ingrediente, puerto, operador, empresa, importacion = self.arreglos.claves_importacion[i]
+            planta = self.arreglos.plantas[p]
+
+            for _ in range(camiones):
+                self.asignar_camion(ingrediente=ingrediente,
+                                    puerto=puerto,
+                                    operador=operador,
+                                    empresa=empresa,
+                                    importacion=importacion,
+                                    planta=planta,
+                                    t=t,
+                                    tipo=flujo.get_tipo(j, t+2))
+
+    def gen_solucion_fase_04(self, por_ingrediente=False, procesos: int = None, configuracion: ConfiguracionSolver = None,
+                             ventana: int = None, avance: int = None, agregacion: str = None):
         
         # Usar modelo LP fase 4
-        fase4 = Fase4Model(self.problema)
+        fase4 = Fase4Model(self.problema, arreglos=self.arreglos, por_ingrediente=por_ingrediente, procesos=procesos,
+                           configuracion=configuracion, ventana=ventana, avance=avance, agregacion=agregacion)
         
+        if not fase4.resuelto:
+            return
+
+        costo_heuristica = self.calcular_costo_despachos()
+        plan_heuristica = self.arreglos.despachos.copy()
+
         df = fase4.reporte2_df
         
-        # Inicializar vectores de despachos        
-        for ingrediente in self.problema['importaciones'].keys():
-            for puerto in self.problema['importaciones'][ingrediente].keys():
-                for operador in self.problema['importaciones'][ingrediente][puerto].keys():
-                    for empresa in self.problema['importaciones'][ingrediente][puerto][operador].keys():
-                        for importacion in self.problema['importaciones'][ingrediente][puerto][operador][empresa].keys():
-                            for planta in self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'].keys():
-                                if 'minimo' in self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta].keys():
-                                
-                                    self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['minimo'] = np.zeros(len(self.fechas)).tolist()
-                                    self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['safety_stock'] = np.zeros(len(self.fechas)).tolist()
-                                    self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['target'] = np.zeros(len(self.fechas)).tolist()
+        # Inicializar vectores de despachos sin romper las vistas del diccionario problema
+        self.arreglos.despachos[:] = 0
         
         
         # Volver a colocar los despachos con base en el modelo fase4
@@ -1449,6 +962,19 @@ class Loader():
                 self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['minimo'][periodo] = minimo
                 self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['safety_stock'][periodo] = safety
                 self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['target'][periodo] = target
+
+        # El ahorro se mide sobre el plan aplicado, los camiones del modelo que no corresponden a
+        # un despacho requerido ya no están
+        costo_optimizado = self.calcular_costo_despachos()
+        ahorro = costo_heuristica - costo_optimizado
+        porcentaje = 100*ahorro/abs(costo_heuristica) if costo_heuristica != 0 else 0.0
+        print(f'costo heuristica {costo_heuristica:,.0f} costo fase 4 {costo_optimizado:,.0f} ahorro {ahorro:,.0f} ({porcentaje:.2f}%)')
+
+        # Con importaciones agregadas o por ventanas el plan repartido puede salir más caro que el
+        # de la heuristica, que cumple los mismos despachos requeridos
+        if costo_optimizado >= costo_heuristica:
+            logging.warning("El plan de la fase 4 no es más barato que el de la heuristica, se conserva la heuristica")
+            self.arreglos.despachos[:] = plan_heuristica
         
         self.calcular_parametros()
         
@@ -1457,158 +983,31 @@ class Loader():
     def save(self):
         with open(self.file.replace('.xlsm', '.json'), 'w') as file:
             json.dump(self.problema, file, indent=4,
-                      sort_keys=True, default=str)
-
-    def save_reports(self):
-
-        # Guardar reporte puertos
-
-        puertos_df = list()
-
-        importaciones = self.problema['importaciones']
-
-        periodos = len(self.problema['fechas'])
-
-        print("Guardando reporte de puertos")
-
-        for ingrediente in tqdm(importaciones.keys()):
-
-            for puerto in importaciones[ingrediente].keys():
-
-                for operador in importaciones[ingrediente][puerto].keys():
-
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
+                      sort_keys=True, default=lambda x: x.tolist() if isinstance(x, np.ndarray) else str(x))
 
-                            for t in range(periodos):
+    def save_reports(self, directorio: str = None, omitir_vacios=False):
 
-                                data = {
-                                    "Empresa": empresa,
-                                    "Puerto": puerto,
-                                    "Operador": operador,
-                                    "ingrediente": ingrediente,
-                                    "Importacion": importacion,
-                                    "Fecha": self.problema['fechas'][t],
-                                    "Inventario": importaciones[ingrediente][puerto][operador][empresa][importacion]['inventario'][t],
-                                    "llegadas": importaciones[ingrediente][puerto][operador][empresa][importacion]['llegadas'][t],
-                                    "Costo_Almacenamiento": importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_almacenamiento'][t],
-                                    "Costo_Total_Almacenamiento": importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_almacenamiento'][t]*importaciones[ingrediente][puerto][operador][empresa][importacion]['inventario'][t]
-                                }
+        # Reportes de plantas, puertos y despachos armados desde los arreglos. Con directorio
+        # también se escriben como csv, el de despachos por bloques
+        reportes = GeneradorReportes(self.problema, self.arreglos, self.costos, self.estado_plantas,
+                                     omitir_vacios=omitir_vacios)
 
-                                puertos_df.append(data)
+        if directorio is not None:
+            print("Guardando reportes en", directorio)
+            reportes.guardar_csv(directorio)
 
-        puertos_df = pd.DataFrame(puertos_df)
+        print("Generando reportes de plantas, puertos y despachos")
 
-        puertos_df.to_csv(r"C:\Users\luisf\Documents\reporte_puerto.csv")
+        plantas_df = reportes.reporte_plantas()
+        puertos_df = reportes.reporte_puertos()
+        despachos_df = reportes.reporte_despachos()
 
-        # Guardando reporte de despachos
-        despachos_df = list()
-
-        importaciones = self.problema['importaciones']
-
-        periodos = len(self.problema['fechas'])
-
-        print("Guardando reporte de despachos")
-
-        for ingrediente in tqdm(importaciones.keys()):
-
-            for puerto in importaciones[ingrediente].keys():
-
-                for operador in importaciones[ingrediente][puerto].keys():
-
-                    for empresa in importaciones[ingrediente][puerto][operador].keys():
-
-                        for importacion in importaciones[ingrediente][puerto][operador][empresa].keys():
-
-                            for planta in importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'].keys():
-
-                                for t in range(periodos):
-
-                                    if 'minimo' in importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta].keys():
-                                        minimo = importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['minimo'][t]
-                                        safety_stock = importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['safety_stock'][t]
-                                        target = importaciones[ingrediente][puerto][operador][empresa][importacion]['despachos'][planta]['target'][t]
-                                        camiones_despachados = minimo + safety_stock + target
-                                    else:
-                                        camiones_despachados = 0
-                                    flete_camion = importaciones[ingrediente][puerto][operador][empresa][importacion]['flete_camion'][planta]
-                                    intercompany_camion = importaciones[ingrediente][puerto][operador][empresa][importacion]['intercompany_camion'][planta]
-                                    costo_despacho_camion = importaciones[ingrediente][puerto][operador][empresa][importacion]['costo_despacho_camion'][planta][t]
-                                    cluster_despacho = importaciones[ingrediente][puerto][operador][empresa][importacion]['cluster_despacho'][planta][t]
-                                    costos_despacho_directo = importaciones[ingrediente][puerto][operador][empresa][importacion]['costos_despacho_directo'][t]
-                                    ahorro_almacenamiento_camion = importaciones[ingrediente][puerto][operador][empresa][importacion]['ahorro_almacenamiento_camion'][t]
-                                    ahorro_bodegaje_camion = importaciones[ingrediente][puerto][operador][empresa][importacion]['ahorro_bodegaje_camion'][t]
-                                    tipo_despacho = importaciones[ingrediente][puerto][operador][empresa][importacion]['tipo_despacho'][t]
-                                    data = {
-                                        "Empresa": empresa,
-                                        "Puerto": puerto,
-                                        "Operador": operador,
-                                        "ingrediente": ingrediente,
-                                        "Importacion": importacion,
-                                        "Fecha": self.problema['fechas'][t],
-                                        "Planta": planta,
-                                        "Camiones_despachados": camiones_despachados,
-                                        "Costo_Transporte_camion": flete_camion,
-                                        "Costo_Transprote": camiones_despachados * flete_camion,
-                                        "Minimo Despacho": minimo,
-                                        "Despacho para Safety Stock": safety_stock,
-                                        "Depsacho hasta Target": target,
-                                        "intercompany_camion": intercompany_camion,
-                                        "costo_despacho_camion": costo_despacho_camion,
-                                        "cluster_despacho": cluster_despacho,
-                                        "costos_despacho_directo": self.cap_camion* costos_despacho_directo,
-                                        "ahorro_almacenamiento_camion": ahorro_almacenamiento_camion,
-                                        "ahorro_bodegaje_camion": ahorro_bodegaje_camion,
-                                        "tipo_despacho":tipo_despacho
-                                    }
-
-                                    despachos_df.append(data)
-
-        despachos_df = pd.DataFrame(despachos_df)
-
-        despachos_df.to_csv(r"C:\Users\luisf\Documents\reporte_despachos.csv")
-
-        # Guardando reporte de despachos
-        plantas_df = list()
-
-        plantas = self.problema['plantas']
-
-        periodos = len(self.problema['fechas'])
-
-        print("Guardando reporte de plantas")
+        return plantas_df, puertos_df, despachos_df
 
-        for planta in plantas.keys():
-            for ingrediente in plantas[planta]['ingredientes']:
+    def generar_reportes(self, omitir_vacios=False) -> dict:
 
-                for t in range(periodos):
+        # Reportes para escribir_reportes, el de despachos por bloques sin armarlo completo
+        reportes = GeneradorReportes(self.problema, self.arreglos, self.costos, self.estado_plantas,
+                                     omitir_vacios=omitir_vacios)
 
-                    inventario = plantas[planta]['ingredientes'][ingrediente]['inventario'][t]
-                    capacidad = plantas[planta]['ingredientes'][ingrediente]['capacidad']
-                    consumo = plantas[planta]['ingredientes'][ingrediente]['consumo'][t]
-                    backorder = plantas[planta]['ingredientes'][ingrediente]['backorder'][t]
-                    objetivo = capacidad
-                    if 'safety_stock' in plantas[planta]['ingredientes'][ingrediente].keys():
-                        safety_stock = plantas[planta]['ingredientes'][ingrediente]['safety_stock'][t]
-                    else:
-                        safety_stock = 0
-                    data = {
-                        "variable": "inventario en planta",
-                        "planta": planta,
-                        "ingrediente": ingrediente,
-                        "periodo": self.problema['fechas'][t],
-                        "inventario": inventario,
-                        "capacidad": capacidad,
-                        "consumo": consumo,
-                        "backorder": backorder,
-                        "objetivo": objetivo,
-                        "safety_stock": safety_stock
-                    }
-
-                    plantas_df.append(data)
-
-        plantas_df = pd.DataFrame(plantas_df)
-
-        plantas_df.to_csv(r"C:\Users\luisf\Documents\reporte_plantas.csv")
-
-        return plantas_df, puertos_df, despachos_df
+        return reportes.reportes()
@@ -0,0 +1,374 @@
+import numpy as np
+import pulp as pu
+import scipy.sparse as sp
+from scipy.optimize import milp, Bounds, LinearConstraint
+from src.client.motores import ConfiguracionSolver, highs_disponible
+import subprocess
+import copy
+import tempfile
+import logging
+import os
+
+
+class ModeloLineal():
+
+    def __init__(self, c: np.ndarray, filas: np.ndarray, columnas: np.ndarray, coeficientes: np.ndarray,
+                 fila_inf: np.ndarray, fila_sup: np.ndarray, x_inf: np.ndarray, x_sup: np.ndarray, enteras: np.ndarray) -> None:
+
+        # Modelo lineal entero en forma matricial:
+        # min c·x  sujeto a  fila_inf <= A·x <= fila_sup,  x_inf <= x <= x_sup
+        # La matriz A se arma a partir de tripletas (fila, columna, coeficiente) sin nombres de variables
+
+        self.c = np.asarray(c, dtype=np.float64)
+        self.fila_inf = np.asarray(fila_inf, dtype=np.float64)
+        self.fila_sup = np.asarray(fila_sup, dtype=np.float64)
+        self.x_inf = np.asarray(x_inf, dtype=np.float64)
+        self.x_sup = np.asarray(x_sup, dtype=np.float64)
+        self.enteras = np.asarray(enteras, dtype=bool)
+
+        self.A = sp.csc_matrix((np.asarray(coeficientes, dtype=np.float64), (filas, columnas)),
+                               shape=(self.fila_inf.shape[0], self.c.shape[0]))
+        self.A.sum_duplicates()
+
+    @property
+    def variables(self) -> int:
+        return self.c.shape[0]
+
+    @property
+    def restricciones(self) -> int:
+        return self.fila_inf.shape[0]
+
+    def escribir_mps(self, path: str):
+
+        # Formato MPS con el mismo espaciado que escribe PuLP, variables x{j} y restricciones r{i}
+
+        lineas = ["NAME          BIOS", "ROWS", " N  obj"]
+
+        sentido = np.where(self.fila_inf == self.fila_sup, 'E', np.where(np.isinf(self.fila_sup), 'G', 'L'))
+        lineas += [f" {s}  r{i}" for i, s in enumerate(sentido)]
+
+        lineas.append("COLUMNS")
+
+        entera_abierta = False
+        for j in range(self.variables):
+
+            if self.enteras[j] and not entera_abierta:
+                lineas.append("    MARKER    'MARKER'                 'INTORG'")
+                entera_abierta = True
+            elif not self.enteras[j] and entera_abierta:
+                lineas.append("    MARKER    'MARKER'                 'INTEND'")
+                entera_abierta = False
+
+            if self.c[j] != 0:
+                lineas.append(f"    {'x%d' % j:<8}  {'obj':<8}  {self.c[j]:.12g}")
+
+            inicio, fin = self.A.indptr[j], self.A.indptr[j+1]
+            lineas += [f"    {'x%d' % j:<8}  {'r%d' % i:<8}  {v:.12g}" for i, v in zip(self.A.indices[inicio:fin], self.A.data[inicio:fin])]
+
+            # Las variables sin coeficientes también se declaran
+            if self.c[j] == 0 and inicio == fin:
+                lineas.append(f"    {'x%d' % j:<8}  {'obj':<8}  0")
+
+        if entera_abierta:
+            lineas.append("    MARKER    'MARKER'                 'INTEND'")
+
+        lineas.append("RHS")
+        rhs = np.where(sentido == 'L', self.fila_sup, self.fila_inf)
+        lineas += [f"    {'rhs':<8}  {'r%d' % i:<8}  {v:.12g}" for i, v in enumerate(rhs) if v != 0]
+
+        # Cotas explícitas, COIN asume variables binarias si una entera no tiene cotas
+        lineas.append("BOUNDS")
+        for j in range(self.variables):
+            if np.isinf(self.x_inf[j]):
+                lineas.append(f" MI BND       x{j}")
+            else:
+                lineas.append(f" LO BND       {'x%d' % j:<8}  {self.x_inf[j]:.12g}")
+            if not np.isinf(self.x_sup[j]):
+                lineas.append(f" UP BND       {'x%d' % j:<8}  {self.x_sup[j]:.12g}")
+
+        lineas.append("ENDATA")
+
+        with open(path, 'w') as file:
+            file.write("\n".join(lineas) + "\n")
+
+    def submodelo(self, filas: np.ndarray, columnas: np.ndarray):
+
+        # Modelo restringido a un subconjunto de filas y columnas, para bloques independientes de A
+        A = self.A[:, columnas][filas, :].tocoo()
+
+        return ModeloLineal(c=self.c[columnas],
+                            filas=A.row,
+                            columnas=A.col,
+                            coeficientes=A.data,
+                            fila_inf=self.fila_inf[filas],
+                            fila_sup=self.fila_sup[filas],
+                            x_inf=self.x_inf[columnas],
+                            x_sup=self.x_sup[columnas],
+                            enteras=self.enteras[columnas])
+
+    def variante(self, x_inf: np.ndarray = None, x_sup: np.ndarray = None, enteras: np.ndarray = None):
+
+        # Mismo modelo con otras cotas o integralidad, comparte la matriz A
+        modelo = copy.copy(self)
+
+        if x_inf is not None:
+            modelo.x_inf = np.asarray(x_inf, dtype=np.float64)
+        if x_sup is not None:
+            modelo.x_sup = np.asarray(x_sup, dtype=np.float64)
+        if enteras is not None:
+            modelo.enteras = np.asarray(enteras, dtype=bool)
+
+        return modelo
+
+    def costo(self, x: np.ndarray) -> float:
+        return float(self.c @ x)
+
+    def es_factible(self, x: np.ndarray, tolerancia=1e-6) -> bool:
+
+        # Cumple filas, cotas e integralidad. La tolerancia de filas y cotas es relativa, los
+        # balances en kilogramos se escriben con pocas cifras significativas en el archivo de CBC
+        fila = self.A @ x
+        return bool(np.all(fila >= self.fila_inf - tolerancia*(1 + np.abs(self.fila_inf))) and
+                    np.all(fila <= self.fila_sup + tolerancia*(1 + np.abs(self.fila_sup))) and
+                    np.all(x >= self.x_inf - tolerancia*(1 + np.abs(self.x_inf))) and
+                    np.all(x <= self.x_sup + tolerancia*(1 + np.abs(self.x_sup))) and
+                    np.all(np.abs(x[self.enteras] - np.rint(x[self.enteras])) <= tolerancia))
+
+
+def resolver_por_ventanas(modelo: ModeloLineal, periodo_fila: np.ndarray, periodo_columna: np.ndarray,
+                          ventana: int, avance: int, resolver_ventana, reserva: np.ndarray = None) -> np.ndarray:
+
+    # Horizonte rodante: resuelve las filas de 'ventana' periodos, fija las decisiones de los
+    # primeros 'avance' periodos y desplaza la ventana. Las columnas de periodos anteriores que
+    # aparecen en la ventana (inventarios finales, camiones en tránsito) entran fijas con su valor.
+    # Filas y columnas se ordenan por periodo una sola vez, así cada ventana cuesta lo que mide.
+    # 'reserva' es una cota inferior para las columnas del último periodo fijado en cada paso,
+    # con ella una solución conocida sigue siendo factible para el resto del horizonte.
+
+    if avance < 1 or avance > ventana:
+        raise Exception(f"El avance debe estar entre 1 y el tamaño de la ventana ({ventana}), se recibió {avance}")
+
+    periodo_fila = np.asarray(periodo_fila)
+    periodo_columna = np.asarray(periodo_columna)
+
+    orden_filas = np.argsort(periodo_fila, kind='stable')
+    orden_columnas = np.argsort(periodo_columna, kind='stable')
+    filas_ordenadas = periodo_fila[orden_filas]
+    columnas_ordenadas = periodo_columna[orden_columnas]
+
+    A = modelo.A.tocsr()
+    T = int(max(periodo_fila.max(initial=0), periodo_columna.max(initial=0))) + 1
+
+    solucion = np.zeros(modelo.variables, dtype=np.float64)
+    inicio = 0
+
+    while inicio < T:
+
+        fin = min(T, inicio + ventana)
+
+        filas = orden_filas[np.searchsorted(filas_ordenadas, inicio):np.searchsorted(filas_ordenadas, fin)]
+        propias = orden_columnas[np.searchsorted(columnas_ordenadas, inicio):np.searchsorted(columnas_ordenadas, fin)]
+
+        # Columnas de periodos anteriores que tienen coeficientes en las filas de la ventana
+        anteriores = np.unique(A[filas].indices)
+        anteriores = anteriores[periodo_columna[anteriores] < inicio]
+
+        columnas = np.concatenate((anteriores, propias))
+        fijas = np.arange(columnas.shape[0]) < anteriores.shape[0]
+
+        submodelo = modelo.submodelo(filas, columnas)
+        x_inf = submodelo.x_inf.copy()
+        x_sup = submodelo.x_sup.copy()
+        x_inf[fijas] = solucion[anteriores]
+        x_sup[fijas] = solucion[anteriores]
+
+        hasta = T if fin == T else inicio + avance
+
+        if reserva is not None and hasta < T:
+            corte = ~fijas & (periodo_columna[columnas] == hasta - 1)
+            x_inf[corte] = np.maximum(x_inf[corte], reserva[columnas[corte]])
+
+        parcial = resolver_ventana(submodelo.variante(x_inf=x_inf, x_sup=x_sup))
+        nuevas = ~fijas & (periodo_columna[columnas] < hasta)
+        solucion[columnas[nuevas]] = parcial[nuevas]
+
+        inicio = hasta
+
+    return solucion
+
+
+def resolver(modelo: ModeloLineal, configuracion: ConfiguracionSolver, inicial: np.ndarray = None) -> np.ndarray:
+
+    # Resuelve el modelo con el motor de la configuración.
+    # Si se entrega una solución inicial factible se usa como incumbente (MIP start)
+
+    if not configuracion.arranque_en_caliente:
+        inicial = None
+
+    if configuracion.motor == 'highs':
+        return resolver_highs(modelo, configuracion, inicial)
+
+    return resolver_cbc(modelo, configuracion, inicial)
+
+
+def resolver_cbc(modelo: ModeloLineal, configuracion: ConfiguracionSolver, inicial: np.ndarray = None) -> np.ndarray:
+
+    # CBC que incluye PuLP, la matriz se pasa en un archivo MPS. Sigue escribiendo el modelo, la
+    # solución inicial y la solución en un directorio temporal y lanza un proceso por cada llamada,
+    # el binario no tiene otra interfaz; resolver en memoria requiere motor='highs'.
+
+    cbc_path = pu.PULP_CBC_CMD().path
+
+    with tempfile.TemporaryDirectory() as directorio:
+
+        mps_path = os.path.join(directorio, 'modelo.mps')
+        sol_path = os.path.join(directorio, 'modelo.sol')
+
+        modelo.escribir_mps(mps_path)
+
+        comando = [cbc_path, mps_path]
+        if inicial is not None:
+            mst_path = os.path.join(directorio, 'modelo.mst')
+            _escribir_solucion_cbc(mst_path, inicial, modelo.costo(inicial))
+            comando += ['-mips', mst_path]
+        if configuracion.tiempo_limite is not None:
+            # Con varios hilos CBC cuenta segundos de CPU salvo que se pida tiempo transcurrido
+            comando += ['-timeMode', 'elapsed', '-sec', str(configuracion.tiempo_limite)]
+        if configuracion.gap_relativo is not None:
+            comando += ['-ratio', str(configuracion.gap_relativo)]
+        if configuracion.hilos > 1:
+            comando += ['-threads', str(configuracion.hilos)]
+        if not configuracion.presolve:
+            comando += ['-presolve', 'off']
+        comando += ['-branch', '-printingOptions', 'all', '-solution', sol_path]
+
+        salida = None if configuracion.msg else subprocess.DEVNULL
+        resultado = subprocess.run(comando, stdout=salida, stderr=salida, stdin=subprocess.DEVNULL)
+
+        if resultado.returncode != 0 or not os.path.exists(sol_path):
+            raise Exception(f"Error ejecutando CBC sobre el modelo, código {resultado.returncode}")
+
+        estado, solucion = _leer_solucion_cbc(sol_path, modelo.variables)
+
+    return _validar_solucion(modelo, solucion, 'CBC', estado, optima=estado.startswith('Optimal'))
+
+
+def resolver_highs(modelo: ModeloLineal, configuracion: ConfiguracionSolver, inicial: np.ndarray = None) -> np.ndarray:
+
+    # HiGHS dentro del mismo proceso, sin archivos intermedios. Con highspy se pasan la
+    # matriz, los hilos y la solución inicial, sin él se usa el HiGHS que trae scipy
+
+    if not highs_disponible():
+        return _resolver_highs_scipy(modelo, configuracion)
+
+    import highspy
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = modelo.variables
+    lp.num_row_ = modelo.restricciones
+    lp.col_cost_ = modelo.c
+    lp.col_lower_ = modelo.x_inf
+    lp.col_upper_ = modelo.x_sup
+    lp.row_lower_ = modelo.fila_inf
+    lp.row_upper_ = modelo.fila_sup
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = modelo.A.indptr
+    lp.a_matrix_.index_ = modelo.A.indices
+    lp.a_matrix_.value_ = modelo.A.data
+    lp.integrality_ = [highspy.HighsVarType.kInteger if entera else highspy.HighsVarType.kContinuous for entera in modelo.enteras]
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', configuracion.msg)
+    highs.setOptionValue('threads', configuracion.hilos)
+    highs.setOptionValue('presolve', 'on' if configuracion.presolve else 'off')
+    if configuracion.tiempo_limite is not None:
+        highs.setOptionValue('time_limit', float(configuracion.tiempo_limite))
+    if configuracion.gap_relativo is not None:
+        highs.setOptionValue('mip_rel_gap', configuracion.gap_relativo)
+
+    highs.passModel(lp)
+
+    if inicial is not None:
+        solucion_inicial = highspy.HighsSolution()
+        solucion_inicial.col_value = list(inicial)
+        highs.setSolution(solucion_inicial)
+
+    highs.run()
+
+    estado = highs.getModelStatus()
+
+    solucion = np.array(highs.getSolution().col_value, dtype=np.float64)
+    if solucion.shape[0] != modelo.variables:
+        raise Exception(f"HiGHS no encontró solución, estado {highs.modelStatusToString(estado)}")
+
+    return _validar_solucion(modelo, solucion, 'HiGHS', highs.modelStatusToString(estado),
+                             optima=estado == highspy.HighsModelStatus.kOptimal)
+
+
+def _resolver_highs_scipy(modelo: ModeloLineal, configuracion: ConfiguracionSolver) -> np.ndarray:
+
+    # scipy no recibe hilos ni solución inicial
+    opciones = {'disp': configuracion.msg, 'presolve': configuracion.presolve}
+    if configuracion.tiempo_limite is not None:
+        opciones['time_limit'] = configuracion.tiempo_limite
+    if configuracion.gap_relativo is not None:
+        opciones['mip_rel_gap'] = configuracion.gap_relativo
+
+    resultado = milp(c=modelo.c,
+                     integrality=modelo.enteras.astype(np.int64),
+                     bounds=Bounds(modelo.x_inf, modelo.x_sup),
+                     constraints=LinearConstraint(modelo.A, modelo.fila_inf, modelo.fila_sup),
+                     options=opciones)
+
+    if resultado.x is None:
+        raise Exception(f"HiGHS no encontró solución: {resultado.message}")
+
+    return _validar_solucion(modelo, resultado.x, 'HiGHS', resultado.message, optima=resultado.status == 0)
+
+
+def _validar_solucion(modelo: ModeloLineal, solucion: np.ndarray, motor: str, estado: str, optima: bool) -> np.ndarray:
+
+    # Si el motor se detuvo por tiempo o por gap solo sirve el incumbente entero factible. Un modelo
+    # infactible o sin incumbente deja el punto de la relajación, que no se puede aplicar como plan.
+    if optima:
+        return solucion
+
+    if not modelo.es_factible(solucion):
+        raise Exception(f"{motor} terminó con estado {estado} sin una solución entera factible")
+
+    logging.warning("%s terminó con estado: %s, se usa la mejor solución entera encontrada", motor, estado)
+
+    return solucion
+
+
+def _escribir_solucion_cbc(path: str, x: np.ndarray, objetivo: float):
+
+    # Mismo formato del archivo de solución de CBC, que es el que lee -mips
+    lineas = [f"Feasible - objective value {objetivo:.12g}"]
+    lineas += [f"{j:>7} x{j} {v:.12g} 0" for j, v in enumerate(x)]
+
+    with open(path, 'w') as file:
+        file.write("\n".join(lineas) + "\n")
+
+
+def _leer_solucion_cbc(path: str, variables: int) -> tuple:
+
+    # Retorna el estado que reporta CBC y el punto del archivo de solución
+    solucion = np.zeros(variables, dtype=np.float64)
+
+    with open(path, 'r') as file:
+
+        estado = file.readline().strip()
+
+        for linea in file:
+            campos = linea.split()
+            if len(campos) < 3:
+                break
+            # en soluciones infactibles CBC marca las filas con **
+            if campos[0] == '**':
+                campos = campos[1:]
+            nombre = campos[1]
+            if nombre.startswith('x'):
+                solucion[int(nombre[1:])] = float(campos[2])
+
+    return estado, solucion
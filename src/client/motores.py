@@ -0,0 +1,71 @@
+import pulp as pu
+import logging
+import os
+
+
+# Motores de optimización soportados
+MOTORES = ['cbc', 'highs']
+
+
+class ConfiguracionSolver():
+
+    def __init__(self, motor='cbc', hilos: int = None, gap_relativo: float = None, tiempo_limite: float = None,
+                 arranque_en_caliente=True, presolve=True, msg=True) -> None:
+
+        # Parámetros comunes a todos los modelos, tiempo_limite en segundos
+
+        if motor not in MOTORES:
+            logging.critical("El motor %s no está soportado, use uno de %s", motor, MOTORES)
+            raise Exception(f"El motor {motor} no está soportado, use uno de {MOTORES}")
+
+        # Sin highspy los modelos matriciales caen a scipy (sin hilos ni arranque) y los de PuLP a CBC
+        if motor == 'highs' and not highs_disponible():
+            logging.warning("highspy no está instalado, el motor highs se resuelve con scipy y CBC")
+
+        self.motor = motor
+        self.hilos = hilos if hilos is not None else max(1, os.cpu_count()-1)
+        self.gap_relativo = gap_relativo
+        self.tiempo_limite = tiempo_limite
+        self.arranque_en_caliente = arranque_en_caliente
+        self.presolve = presolve
+        self.msg = msg
+
+    def copiar(self, **cambios):
+
+        # Misma configuración con algunos parámetros cambiados
+        parametros = dict(self.__dict__)
+        parametros.update(cambios)
+
+        return ConfiguracionSolver(**parametros)
+
+
+def highs_disponible() -> bool:
+
+    try:
+        import highspy
+    except ImportError:
+        return False
+
+    return True
+
+
+def crear_motor_pulp(configuracion: ConfiguracionSolver):
+
+    # Motor de PuLP para los modelos que se arman con LpProblem
+
+    if configuracion.motor == 'highs':
+        if highs_disponible():
+            return pu.HiGHS(msg=configuracion.msg,
+                            gapRel=configuracion.gap_relativo,
+                            threads=configuracion.hilos,
+                            timeLimit=configuracion.tiempo_limite,
+                            presolve='on' if configuracion.presolve else 'off')
+
+        logging.warning("highspy no está instalado, se resuelve con CBC")
+
+    return pu.PULP_CBC_CMD(msg=configuracion.msg,
+                           timeLimit=configuracion.tiempo_limite,
+                           gapRel=configuracion.gap_relativo,
+                           presolve=configuracion.presolve,
+                           warmStart=configuracion.arranque_en_caliente,
+                           threads=configuracion.hilos)
@@ -0,0 +1,223 @@
+import pandas as pd
+import numpy as np
+from src.client.costos_despacho import CostosDespacho
+
+
+# Tipos de despacho que genera la heuristica, en el orden del ultimo eje de despachos
+TIPOS_DESPACHO = ['minimo', 'safety_stock', 'target']
+
+
+class ProblemaArreglos():
+
+    def __init__(self, problema: dict, costos: CostosDespacho = None) -> None:
+
+        # Representación compacta del problema con dimensiones indexadas por enteros:
+        # I importaciones, P plantas, T periodos y K tipos de despacho.
+        # Las series de tiempo del diccionario problema quedan como vistas sobre
+        # estos arreglos, de modo que el código que recorre el diccionario sigue
+        # funcionando y el que necesite velocidad puede operar sobre los arreglos.
+
+        self.problema = problema
+        self.costos = costos
+        self.cap_camion = problema['capacidad_camion']
+        self.periodos = len(problema['fechas'])
+
+        self.importaciones_df = None
+        self.indice_importacion = dict()
+        self.claves_importacion = list()
+        self.nombres_importacion = list()
+        self.ingredientes = list(problema['importaciones'].keys())
+        self.plantas = list(problema['plantas'].keys())
+        self.indice_planta = dict()
+
+        if costos is not None:
+            self.plantas = list(costos.plantas)
+
+        self._generar_tabla_importaciones()
+        self._generar_arreglos()
+        self._vincular_problema()
+
+    def _generar_tabla_importaciones(self):
+
+        importaciones = self.problema['importaciones']
+
+        registros = list()
+
+        for ingrediente in importaciones.keys():
+            for puerto in importaciones[ingrediente].keys():
+                for operador in importaciones[ingrediente][puerto].keys():
+                    for empresa in importaciones[ingrediente][puerto][operador].keys():
+                        for importacion, importacion_values in importaciones[ingrediente][puerto][operador][empresa].items():
+
+                            # Plantas con costo de despacho que no tienen consumo proyectado
+                            for planta in importacion_values['costo_despacho_camion'].keys():
+                                if planta not in self.plantas:
+                                    self.plantas.append(planta)
+
+                            self.indice_importacion[(ingrediente, puerto, operador, empresa, importacion)] = len(registros)
+                            self.claves_importacion.append((ingrediente, puerto, operador, empresa, importacion))
+                            self.nombres_importacion.append(f"{ingrediente}_{puerto}_{operador}_{empresa}_{importacion}")
+
+                            registros.append({'ingrediente': ingrediente,
+                                              'puerto': puerto,
+                                              'operador': operador,
+                                              'empresa': empresa,
+                                              'importacion': importacion})
+
+        df = pd.DataFrame(registros, columns=['ingrediente', 'puerto', 'operador', 'empresa', 'importacion'])
+
+        # Codigos enteros por dimension, los ingredientes en el mismo orden del problema
+        df['codigo_ingrediente'] = df['ingrediente'].map(
+            {ingrediente: k for k, ingrediente in enumerate(self.ingredientes)}).astype(np.int32)
+
+        for columna in ['puerto', 'operador', 'empresa', 'importacion']:
+            df[f"codigo_{columna}"] = pd.Categorical(df[columna]).codes.astype(np.int32)
+
+        self.importaciones_df = df
+        self.indice_planta = {planta: k for k, planta in enumerate(self.plantas)}
+
+    def _generar_arreglos(self):
+
+        I = self.importaciones_df.shape[0]
+        P = len(self.plantas)
+        T = self.periodos
+        K = len(TIPOS_DESPACHO)
+
+        self.ingrediente = np.array(self.importaciones_df['codigo_ingrediente'], dtype=np.int32)  # [I]
+        self.inventario_inicial = np.zeros(I, dtype=np.int64)  # [I]
+        self.llegadas = np.zeros((I, T), dtype=np.float64)  # [I,T]
+        self.inventario = np.zeros((I, T), dtype=np.int64)  # [I,T]
+        self.despachos = np.zeros((I, P, T, K), dtype=np.int64)  # [I,P,T,K]
+
+        if self.costos is not None:
+            if self.costos.claves_importacion != self.claves_importacion:
+                raise Exception("Los costos de despacho no corresponden a las importaciones del problema")
+
+            # Se comparte el tensor de costos en lugar de copiarlo
+            self.costo_despacho_camion = self.costos.costo_despacho_camion  # [I,P,T]
+            self.con_costo = self.costos.con_costo  # [I,P] existe flete entre la importacion y la planta
+        else:
+            self.costo_despacho_camion = np.zeros((I, P, T), dtype=np.int64)  # [I,P,T]
+            self.con_costo = np.zeros((I, P), dtype=bool)  # [I,P] existe flete entre la importacion y la planta
+
+        self.factible = np.zeros((I, P), dtype=bool)  # [I,P] la planta consume el ingrediente de la importacion
+        self.maximo = np.zeros((I, P), dtype=np.int64)  # [I,P] camiones maximos por periodo
+
+        # Disponibilidad en puerto, se mantiene al dia cada vez que cambia el inventario de una importacion
+        self.importaciones_de = [np.flatnonzero(self.ingrediente == k) for k in range(len(self.ingredientes))]
+        self.camiones_disponibles = np.zeros((I, T), dtype=np.int64)  # [I,T]
+        self.disponibles_ingrediente = np.zeros((len(self.ingredientes), T), dtype=np.int64)  # [ingredientes,T]
+        self.negativos_ingrediente = np.zeros((len(self.ingredientes), T), dtype=np.int64)  # [ingredientes,T]
+        self.bajo_costo = np.ones(I, dtype=bool)  # [I]
+
+    def _vincular_problema(self):
+
+        for (ingrediente, puerto, operador, empresa, importacion), i in self.indice_importacion.items():
+
+            importacion_values = self.problema['importaciones'][ingrediente][puerto][operador][empresa][importacion]
+
+            self.inventario_inicial[i] = int(importacion_values['inventario_inicial'])
+
+            # cluster_despacho es un diccionario por planta, por lo que la comparación
+            # del filtro de bajo costo nunca excluía la importación
+            self.bajo_costo[i] = importacion_values.get('cluster_despacho') != 'alto'
+
+            self.llegadas[i] = importacion_values['llegadas']
+            importacion_values['llegadas'] = self.llegadas[i]
+
+            if 'inventario' in importacion_values.keys():
+                self.inventario[i] = importacion_values['inventario']
+            importacion_values['inventario'] = self.inventario[i]
+
+            # Con los costos compartidos las series del diccionario ya son vistas del tensor
+            if self.costos is None:
+                for planta, costo in importacion_values['costo_despacho_camion'].items():
+                    p = self.indice_planta[planta]
+                    self.con_costo[i, p] = True
+                    self.costo_despacho_camion[i, p] = costo
+                    importacion_values['costo_despacho_camion'][planta] = self.costo_despacho_camion[i, p]
+
+            for planta, despachos in importacion_values['despachos'].items():
+                p = self.indice_planta[planta]
+                if 'minimo' in despachos.keys():
+                    self.factible[i, p] = True
+                    self.maximo[i, p] = despachos['maximo']
+                    for k, tipo in enumerate(TIPOS_DESPACHO):
+                        self.despachos[i, p, :, k] = despachos[tipo]
+                        despachos[tipo] = self.despachos[i, p, :, k]
+
+    def get_indice(self, ingrediente: str, puerto: str, operador: str, empresa: str, importacion: str) -> int:
+        return self.indice_importacion[(ingrediente, puerto, operador, empresa, importacion)]
+
+    def get_importaciones_ingrediente(self, ingrediente: str) -> np.ndarray:
+        return self.importaciones_de[self.ingredientes.index(ingrediente)]
+
+    def calcular_inventarios(self, indices=None):
+
+        # inventario[i,t] = inventario_inicial[i] + sum(llegadas[i,:t] - cap_camion*despachos[i,:,:t,:])
+
+        if indices is None:
+            indices = slice(None)
+
+        llegadas = np.trunc(self.llegadas[indices]).astype(np.int64)
+        despachos = self.despachos[indices].sum(axis=(-3, -1))*self.cap_camion
+
+        self.inventario[indices] = self.inventario_inicial[indices, None] + np.cumsum(llegadas - despachos, axis=-1)
+
+        self._actualizar_disponibles(indices)
+
+    def _actualizar_disponibles(self, indices):
+
+        # Recalcula los camiones despachables de las importaciones y ajusta los totales por ingrediente
+
+        indices = np.atleast_1d(np.arange(self.importaciones_df.shape[0])[indices])
+
+        inventario = self.inventario[indices]
+        inventario = np.minimum(inventario, inventario[:, -1:])
+
+        # int(x/cap_camion) trunca hacia cero, igual que el recorrido del diccionario
+        nuevos = np.trunc(inventario/self.cap_camion).astype(np.int64)
+        anteriores = self.camiones_disponibles[indices]
+
+        np.add.at(self.disponibles_ingrediente, self.ingrediente[indices], nuevos - anteriores)
+        np.add.at(self.negativos_ingrediente, self.ingrediente[indices],
+                  (nuevos < 0).astype(np.int64) - (anteriores < 0).astype(np.int64))
+
+        self.camiones_disponibles[indices] = nuevos
+
+    def get_camiones_despachables(self, t: int) -> np.ndarray:
+        # Camiones que se pueden sacar de cada importacion en t sin dejar inventario negativo después
+        return self.camiones_disponibles[:, t].copy()
+
+    def get_camiones_ingrediente(self, ingrediente: str, t: int) -> int:
+        return int(self.disponibles_ingrediente[self.ingredientes.index(ingrediente), t])
+
+    def ingrediente_disponible(self, k: int, t: int, bajo_costo=False) -> bool:
+
+        importaciones = self.importaciones_de[k]
+
+        if self.negativos_ingrediente[k, t] == 0 and (not bajo_costo or self.bajo_costo[importaciones].all()):
+            return self.disponibles_ingrediente[k, t] > 0
+
+        # Con conteos negativos o importaciones excluidas se recorre en el orden del diccionario,
+        # donde los camiones se acumulan sobre todas las importaciones del ingrediente
+        acumulado = 0
+        for i in importaciones:
+            acumulado += self.camiones_disponibles[i, t]
+            if acumulado > 0 and (not bajo_costo or self.bajo_costo[i]):
+                return True
+
+        return False
+
+    def get_ingredientes_disponibles(self, t: int, bajo_costo=False) -> list:
+        # Ingredientes con alguna importación disponible en t, sin reconstruir el diccionario
+        return [ingrediente for k, ingrediente in enumerate(self.ingredientes) if self.ingrediente_disponible(k, t, bajo_costo)]
+
+    def agregar_despacho(self, i: int, p: int, t: int, tipo: str, camiones=1):
+
+        # Actualización incremental: un camion que sale en t solo reduce el
+        # inventario de la importacion desde t en adelante
+        self.despachos[i, p, t, TIPOS_DESPACHO.index(tipo)] += camiones
+        self.inventario[i, t:] -= camiones*self.cap_camion
+
+        self._actualizar_disponibles(i)
@@ -0,0 +1,202 @@
+import pandas as pd
+import numpy as np
+import logging
+import os
+from src.client.problema_arreglos import ProblemaArreglos, TIPOS_DESPACHO
+from src.client.costos_despacho import CostosDespacho
+from src.client.estado_plantas import EstadoPlantas
+
+
+# Nombres de los archivos csv de cada reporte
+ARCHIVOS_REPORTE = {'plantas': 'reporte_plantas.csv',
+                    'puertos': 'reporte_puerto.csv',
+                    'despachos': 'reporte_despachos.csv'}
+
+
+class GeneradorReportes():
+
+    def __init__(self, problema: dict, arreglos: ProblemaArreglos, costos: CostosDespacho, estado: EstadoPlantas,
+                 omitir_vacios=False, filas_por_bloque=500000) -> None:
+
+        # Arma los reportes de plantas, puertos y despachos por columnas directamente desde los
+        # arreglos, sin recorrer el diccionario por fila. El de despachos (importaciones x plantas x
+        # periodos) se entrega por bloques de a lo sumo 'filas_por_bloque' filas, y con omitir_vacios
+        # solo trae las filas con camiones despachados.
+
+        self.problema = problema
+        self.arreglos = arreglos
+        self.costos = costos
+        self.estado = estado
+        self.omitir_vacios = omitir_vacios
+        self.filas_por_bloque = filas_por_bloque
+        self.cap_camion = problema['capacidad_camion']
+
+        self.fechas = np.array(problema['fechas'])
+        self.claves = pd.DataFrame(arreglos.claves_importacion,
+                                   columns=['ingrediente', 'puerto', 'operador', 'empresa', 'importacion'])
+
+        # Plantas del reporte de despachos, en el orden del problema
+        self.plantas = np.array([arreglos.indice_planta[planta] for planta in problema['plantas'].keys()], dtype=np.int64)
+
+        self.costo_almacenamiento = None  # [I,T]
+        self.tipo_despacho = None         # [I,T]
+        self.cluster_despacho = None      # [I,P,T]
+
+        self._generar_series_importaciones()
+
+    def _generar_series_importaciones(self):
+
+        # Las series que no tienen arreglo propio se leen una vez por importacion o arco
+        arreglos = self.arreglos
+        importaciones = self.problema['importaciones']
+        I = len(arreglos.claves_importacion)
+        P = len(arreglos.plantas)
+        T = self.fechas.shape[0]
+
+        self.costo_almacenamiento = self.costos.costo_almacenamiento
+        self.tipo_despacho = np.empty((I, T), dtype=object)
+        self.cluster_despacho = np.full((I, P, T), None, dtype=object)
+
+        for i, (ingrediente, puerto, operador, empresa, importacion) in enumerate(arreglos.claves_importacion):
+            importacion_values = importaciones[ingrediente][puerto][operador][empresa][importacion]
+            self.tipo_despacho[i] = importacion_values['tipo_despacho']
+            for planta, cluster in importacion_values['cluster_despacho'].items():
+                self.cluster_despacho[i, arreglos.indice_planta[planta]] = cluster
+
+    def reporte_puertos(self) -> pd.DataFrame:
+
+        arreglos = self.arreglos
+        I, T = arreglos.inventario.shape
+        i = np.repeat(np.arange(I), T)
+        t = np.tile(np.arange(T), I)
+
+        return pd.DataFrame({"Empresa": self.claves['empresa'].to_numpy()[i],
+                             "Puerto": self.claves['puerto'].to_numpy()[i],
+                             "Operador": self.claves['operador'].to_numpy()[i],
+                             "ingrediente": self.claves['ingrediente'].to_numpy()[i],
+                             "Importacion": self.claves['importacion'].to_numpy()[i],
+                             "Fecha": self.fechas[t],
+                             "Inventario": arreglos.inventario.ravel(),
+                             "llegadas": arreglos.llegadas.ravel(),
+                             "Costo_Almacenamiento": self.costo_almacenamiento.ravel(),
+                             "Costo_Total_Almacenamiento": (self.costo_almacenamiento*arreglos.inventario).ravel()})
+
+    def reporte_plantas(self) -> pd.DataFrame:
+
+        estado = self.estado
+        plantas_values = self.problema['plantas']
+        J, T = estado.inventario.shape
+
+        safety_stock = np.zeros((J, T), dtype=np.int64)
+        for (planta, ingrediente), j in estado.indice.items():
+            ingrediente_values = plantas_values[planta]['ingredientes'][ingrediente]
+            if 'safety_stock' in ingrediente_values.keys():
+                safety_stock[j] = ingrediente_values['safety_stock']
+
+        claves = np.array(estado.claves, dtype=object).reshape(J, 2)
+        j = np.repeat(np.arange(J), T)
+        t = np.tile(np.arange(T), J)
+        capacidad = np.repeat(estado.capacidad, T)
+
+        return pd.DataFrame({"variable": "inventario en planta",
+                             "planta": claves[j, 0],
+                             "ingrediente": claves[j, 1],
+                             "periodo": self.fechas[t],
+                             "inventario": estado.inventario.ravel(),
+                             "capacidad": capacidad,
+                             "consumo": estado.consumo.ravel(),
+                             "backorder": estado.backorder.ravel(),
+                             "objetivo": capacidad,
+                             "safety_stock": safety_stock.ravel()})
+
+    def iterar_despachos(self):
+
+        # Bloques de importaciones completas, así cada bloque tiene a lo sumo filas_por_bloque filas.
+        # Sin filas se entrega un bloque vacío para que quien escribe tenga las columnas
+        arreglos = self.arreglos
+        I = len(arreglos.claves_importacion)
+        T = self.fechas.shape[0]
+        filas_importacion = max(1, self.plantas.shape[0]*T)
+        paso = max(1, self.filas_por_bloque // filas_importacion)
+
+        vacio = True
+        for desde in range(0, I, paso):
+            bloque = self._generar_bloque_despachos(np.arange(desde, min(I, desde + paso)))
+            if bloque.shape[0] > 0:
+                vacio = False
+                yield bloque
+
+        if vacio:
+            yield self._generar_bloque_despachos(np.zeros(0, dtype=np.int64))
+
+    def _generar_bloque_despachos(self, importaciones: np.ndarray) -> pd.DataFrame:
+
+        arreglos = self.arreglos
+        costos = self.costos
+        T = self.fechas.shape[0]
+
+        # Camiones por tipo de las importaciones del bloque hacia las plantas del problema [b,P,T,K]
+        despachos = arreglos.despachos[importaciones[:, None], self.plantas[None, :]]
+        camiones = despachos.sum(axis=3)
+
+        if self.omitir_vacios:
+            b, q, t = np.nonzero(camiones)
+        else:
+            b, q, t = np.unravel_index(np.arange(camiones.size), camiones.shape)
+
+        i = importaciones[b]
+        p = self.plantas[q]
+
+        flete = costos.flete_camion[i, p]
+        camiones = camiones[b, q, t]
+        tipos = {tipo: despachos[b, q, t, k] for k, tipo in enumerate(TIPOS_DESPACHO)}
+
+        return pd.DataFrame({"Empresa": self.claves['empresa'].to_numpy()[i],
+                             "Puerto": self.claves['puerto'].to_numpy()[i],
+                             "Operador": self.claves['operador'].to_numpy()[i],
+                             "ingrediente": self.claves['ingrediente'].to_numpy()[i],
+                             "Importacion": self.claves['importacion'].to_numpy()[i],
+                             "Fecha": self.fechas[t],
+                             "Planta": np.array(arreglos.plantas, dtype=object)[p],
+                             "Camiones_despachados": camiones,
+                             "Costo_Transporte_camion": flete,
+                             "Costo_Transprote": camiones*flete,
+                             "Minimo Despacho": tipos['minimo'],
+                             "Despacho para Safety Stock": tipos['safety_stock'],
+                             "Depsacho hasta Target": tipos['target'],
+                             "intercompany_camion": costos.intercompany_camion[i, p],
+                             "costo_despacho_camion": costos.costo_despacho_camion[i, p, t],
+                             "cluster_despacho": self.cluster_despacho[i, p, t],
+                             "costos_despacho_directo": self.cap_camion*costos.costos_despacho_directo[i, t],
+                             "ahorro_almacenamiento_camion": costos.ahorro_almacenamiento_camion[i, t],
+                             "ahorro_bodegaje_camion": costos.ahorro_bodegaje_camion[i, t],
+                             "tipo_despacho": self.tipo_despacho[i, t]})
+
+    def reporte_despachos(self) -> pd.DataFrame:
+        return pd.concat(list(self.iterar_despachos()), ignore_index=True)
+
+    def reportes(self) -> dict:
+
+        # Los tres reportes para escribir_reportes, el de despachos como iterador de bloques
+        return {'plantas': self.reporte_plantas(),
+                'puertos': self.reporte_puertos(),
+                'despachos': self.iterar_despachos()}
+
+    def guardar_csv(self, directorio: str):
+
+        # Escribe los tres reportes en el directorio, el de despachos bloque a bloque
+        if not os.path.isdir(directorio):
+            logging.critical("El directorio de reportes %s no existe", directorio)
+            raise Exception(f"El directorio de reportes {directorio} no existe")
+
+        self.reporte_puertos().to_csv(os.path.join(directorio, ARCHIVOS_REPORTE['puertos']))
+        self.reporte_plantas().to_csv(os.path.join(directorio, ARCHIVOS_REPORTE['plantas']))
+
+        archivo = os.path.join(directorio, ARCHIVOS_REPORTE['despachos'])
+        fila = 0
+        encabezado = True
+        for bloque in self.iterar_despachos():
+            bloque.index = pd.RangeIndex(fila, fila + bloque.shape[0])
+            bloque.to_csv(archivo, mode='w' if encabezado else 'a', header=encabezado)
+            fila += bloque.shape[0]
+            encabezado = False
@@ -0,0 +1,149 @@
+import pandas as pd
+import logging
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Formatos de salida soportados
+FORMATOS_SALIDA = ['excel', 'parquet', 'csv']
+
+# Hoja de cada reporte en el libro de salida
+HOJAS_REPORTE = {'plantas': 'Reporte_Plantas',
+                 'puertos': 'Reporte_Puertos',
+                 'despachos': 'Reporte_Despachos'}
+
+# Filas que se convierten a la vez al escribir con xlsxwriter
+FILAS_POR_BLOQUE = 100000
+
+
+def xlsxwriter_disponible() -> bool:
+
+    try:
+        import xlsxwriter
+    except ImportError:
+        return False
+
+    return True
+
+
+def escribir_reportes(reportes: dict, base: str, formato='excel', separados=False, procesos: int = None) -> list:
+
+    # Escribe los reportes {'plantas': df, 'puertos': df, 'despachos': df} con el nombre base
+    # (sin extensión). Cada reporte puede ser un DataFrame o un iterador de bloques con las mismas
+    # columnas, que se escriben uno a uno sin juntarlos. En excel van como hojas de un solo libro, salvo con separados.
+    # Parquet y csv.gz siempre escriben un archivo por reporte. Los archivos se escriben a la vez,
+    # hasta 'procesos' en paralelo. Retorna las rutas escritas.
+
+    if formato not in FORMATOS_SALIDA:
+        logging.critical("El formato %s no está soportado, use uno de %s", formato, FORMATOS_SALIDA)
+        raise Exception(f"El formato {formato} no está soportado, use uno de {FORMATOS_SALIDA}")
+
+    if formato == 'excel' and not separados:
+        archivo = f"{base}.xlsx"
+        _escribir_excel(archivo, {HOJAS_REPORTE[nombre]: df for nombre, df in reportes.items()})
+        return [archivo]
+
+    trabajos = list()
+    for nombre, df in reportes.items():
+        if formato == 'excel':
+            trabajos.append((f"{base}_{nombre}.xlsx", _escribir_excel, {HOJAS_REPORTE[nombre]: df}))
+        elif formato == 'parquet':
+            trabajos.append((f"{base}_{nombre}.parquet", _escribir_parquet, df))
+        else:
+            trabajos.append((f"{base}_{nombre}.csv.gz", _escribir_csv, df))
+
+    procesos = procesos if procesos is not None else len(trabajos)
+
+    with ThreadPoolExecutor(max_workers=max(1, procesos)) as executor:
+        futuros = [executor.submit(escribir, archivo, datos) for archivo, escribir, datos in trabajos]
+        for futuro in futuros:
+            futuro.result()
+
+    return [archivo for archivo, _, _ in trabajos]
+
+
+def _escribir_excel(archivo: str, hojas: dict):
+
+    if not xlsxwriter_disponible():
+        logging.warning("xlsxwriter no está instalado, se escribe %s con openpyxl", archivo)
+        with pd.ExcelWriter(archivo) as writer:
+            for hoja, datos in hojas.items():
+                pd.concat(list(_bloques(datos)), ignore_index=True).to_excel(writer, sheet_name=hoja, index=False)
+        return
+
+    import xlsxwriter
+
+    # Con constant_memory cada fila se escribe a disco apenas se completa, pandas escribe por
+    # columnas y no sirve en ese modo, por eso las filas se escriben aquí en orden
+    libro = xlsxwriter.Workbook(archivo, {'constant_memory': True,
+                                          'default_date_format': 'yyyy-mm-dd',
+                                          'strings_to_numbers': False,
+                                          'strings_to_urls': False})
+    try:
+        for hoja, datos in hojas.items():
+            pestana = libro.add_worksheet(hoja)
+            fila = 0
+
+            for bloque in _bloques(datos):
+                if fila == 0:
+                    pestana.write_row(0, 0, [str(columna) for columna in bloque.columns])
+                    fila = 1
+
+                for valores in zip(*(_valores_columna(bloque[columna]) for columna in bloque.columns)):
+                    pestana.write_row(fila, 0, valores)
+                    fila += 1
+    finally:
+        libro.close()
+
+
+def _bloques(datos):
+
+    # Bloques de a lo sumo FILAS_POR_BLOQUE filas, de un DataFrame o de un iterador de DataFrames
+    if isinstance(datos, pd.DataFrame):
+        datos = [datos]
+
+    for df in datos:
+        if df.shape[0] == 0:
+            yield df
+        for desde in range(0, df.shape[0], FILAS_POR_BLOQUE):
+            yield df.iloc[desde:desde + FILAS_POR_BLOQUE]
+
+
+def _valores_columna(serie: pd.Series) -> list:
+
+    # Escalares de python, con celdas vacías en lugar de nulos
+    if serie.isna().any():
+        return serie.astype(object).where(serie.notna(), None).tolist()
+
+    return serie.tolist()
+
+
+def _escribir_parquet(archivo: str, datos):
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Un grupo de filas por bloque. El esquema sale del primer bloque, las columnas que ahí
+    # solo tienen nulos se toman como texto para que los bloques siguientes calcen
+    escritor = None
+    try:
+        for bloque in _bloques(datos):
+            if escritor is None:
+                esquema = pa.Schema.from_pandas(bloque, preserve_index=False)
+                for k, campo in enumerate(esquema):
+                    if pa.types.is_null(campo.type):
+                        esquema = esquema.set(k, campo.with_type(pa.string()))
+                escritor = pq.ParquetWriter(archivo, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _escribir_csv(archivo: str, datos):
+
+    with gzip.open(archivo, 'wt', newline='') as salida:
+        encabezado = True
+        for bloque in _bloques(datos):
+            bloque.to_csv(salida, index=False, header=encabezado)
+            encabezado = False
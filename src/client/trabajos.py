@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+import logging
+import traceback
+from datetime import datetime
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Estados de un trabajo de optimización
+ESTADOS_TRABAJO = ['en_cola', 'ejecutando', 'terminado', 'fallido']
+
+# Trabajos que se ejecutan a la vez si no se indica otra cosa, cada uno ya usa varios núcleos en la fase 4
+PROCESOS_TRABAJOS = 2
+
+# Nombre con el que se guarda el libro subido en la carpeta del trabajo, el original solo queda en el estado
+ARCHIVO_ENTRADA = 'entrada'
+EXTENSIONES_LIBRO = ['.xlsx', '.xlsm']
+
+
+def fases_ejecucion(despacho='heuristica') -> list:
+
+    # Fases que reporta una ejecución, en orden
+    if despacho == 'flujo':
+        return ['carga', 'flujo', 'fase_04', 'reportes']
+
+    return ['carga', 'fase_01', 'fase_02', 'fase_03', 'fase_04', 'reportes']
+
+
+def ejecutar_optimizacion(archivo: str, base: str, progreso=None, cache_dir=None, fuente='excel', despacho='heuristica',
+                          por_ingrediente=False, procesos=None, motor='cbc', hilos=None, tiempo_limite=300, gap=0.00005,
+                          ventana=None, avance=None, agregacion=None, formato='csv', separados=False) -> list:
+
+    # Carga el archivo, ejecuta las fases y escribe los reportes con el nombre base (sin extensión),
+    # es la misma secuencia para main.py y para los trabajos encolados.
+    # Al iniciar y terminar cada fase llama progreso(fase, 'ejecutando' | 'terminada').
+    # Retorna las rutas de los reportes.
+
+    from src.client.loader import Loader
+    from src.client.motores import ConfiguracionSolver
+    from src.client.salida_reportes import escribir_reportes
+
+    if progreso is None:
+        def progreso(fase, estado):
+            pass
+
+    configuracion = ConfiguracionSolver(motor=motor, hilos=hilos, tiempo_limite=tiempo_limite, gap_relativo=gap)
+    loader = Loader(archivo, cache_dir=cache_dir, fuente=fuente)
+
+    pasos = {'carga': loader.load_data,
+             'fase_01': loader.gen_solucion_fase_01,
+             'fase_02': loader.gen_solucion_fase_02,
+             'fase_03': loader.gen_solucion_fase_03}
+
+    pasos['flujo'] = lambda: loader.gen_solucion_flujo(configuracion=configuracion,
+                                                       ventana=ventana, avance=avance)
+
+    pasos['fase_04'] = lambda: loader.gen_solucion_fase_04(por_ingrediente=por_ingrediente, procesos=procesos,
+                                                           configuracion=configuracion, ventana=ventana,
+                                                           avance=avance, agregacion=agregacion)
+
+    rutas = list()
+
+    def guardar_reportes():
+        rutas.extend(escribir_reportes(loader.generar_reportes(), base, formato=formato, separados=separados))
+
+    pasos['reportes'] = guardar_reportes
+
+    for fase in fases_ejecucion(despacho):
+        progreso(fase, 'ejecutando')
+        pasos[fase]()
+        progreso(fase, 'terminada')
+
+    return rutas
+
+
+def _ejecutar_trabajo(estados, id_trabajo: str, archivo: str, directorio: str, opciones: dict):
+
+    # Corre en el proceso del pool. El estado se reemplaza completo porque el diccionario
+    # compartido no ve los cambios dentro de sus valores.
+    inicios = dict()
+
+    def actualizar(**cambios):
+        estado = dict(estados[id_trabajo])
+        estado.update(cambios)
+        estados[id_trabajo] = estado
+
+    def progreso(fase, estado_fase):
+        fases = dict(estados[id_trabajo]['fases'])
+        if estado_fase == 'ejecutando':
+            inicios[fase] = time.time()
+            fases[fase] = {'estado': estado_fase, 'segundos': None}
+        else:
+            fases[fase] = {'estado': estado_fase, 'segundos': time.time() - inicios[fase]}
+        actualizar(estado='ejecutando', fase=fase, fases=fases)
+
+    try:
+        reportes = ejecutar_optimizacion(archivo, os.path.join(directorio, 'reporte'), progreso=progreso,
+                                         separados=True, **opciones)
+    except Exception as e:
+        logging.error("El trabajo %s falló: %s", id_trabajo, e)
+        fase = estados[id_trabajo]['fase']
+        fases = dict(estados[id_trabajo]['fases'])
+        if fase is not None:
+            fases[fase] = {'estado': 'fallida', 'segundos': time.time() - inicios.get(fase, time.time())}
+        actualizar(estado='fallido', fases=fases, error=f"{e}\n{traceback.format_exc()}",
+                   terminado=datetime.now().isoformat())
+        return
+
+    actualizar(estado='terminado', fase=None, reportes=[os.path.basename(x) for x in reportes],
+               terminado=datetime.now().isoformat())
+
+
+class ColaTrabajos():
+
+    def __init__(self, directorio='trabajos', procesos: int = None) -> None:
+
+        # Cola local de ejecuciones sin broker externo. Cada trabajo guarda su archivo y sus
+        # reportes en directorio/<id> y corre en un pool de a lo sumo 'procesos' procesos, así
+        # el que encola no queda bloqueado. El avance por fase queda en un diccionario compartido
+        # con los procesos.
+
+        self.directorio = directorio
+        self.procesos = procesos if procesos is not None else PROCESOS_TRABAJOS
+
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self._manager = Manager()
+        self.estados = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=max(1, self.procesos))
+        self._futuros = dict()
+
+    def encolar(self, nombre: str, contenido: bytes, **opciones) -> str:
+
+        # Guarda el archivo subido con un nombre fijo, el nombre que envió el cliente no se usa
+        # como ruta, y encola su ejecución. Retorna el id del trabajo
+        id_trabajo = uuid.uuid4().hex
+        carpeta = os.path.join(self.directorio, id_trabajo)
+        os.makedirs(carpeta)
+
+        nombre = nombre or ''
+        extension = os.path.splitext(nombre)[1].lower()
+        if extension not in EXTENSIONES_LIBRO:
+            extension = EXTENSIONES_LIBRO[0]
+
+        archivo = os.path.join(carpeta, ARCHIVO_ENTRADA + extension)
+        with open(archivo, 'wb') as file:
+            file.write(contenido)
+
+        self.estados[id_trabajo] = {'id': id_trabajo,
+                                    'archivo': nombre,
+                                    'estado': 'en_cola',
+                                    'fase': None,
+                                    'fases': {fase: {'estado': 'pendiente', 'segundos': None}
+                                              for fase in fases_ejecucion(opciones.get('despacho', 'heuristica'))},
+                                    'reportes': list(),
+                                    'error': None,
+                                    'creado': datetime.now().isoformat(),
+                                    'terminado': None}
+
+        futuro = self._executor.submit(_ejecutar_trabajo, self.estados, id_trabajo, archivo, carpeta, opciones)
+        futuro.add_done_callback(lambda x: self._al_terminar(id_trabajo, x))
+        self._futuros[id_trabajo] = futuro
+
+        return id_trabajo
+
+    def _al_terminar(self, id_trabajo: str, futuro):
+
+        # Si el proceso murió sin alcanzar a reportar, el trabajo queda como fallido
+        if futuro.cancelled():
+            error = 'cancelado'
+        elif futuro.exception() is not None:
+            error = str(futuro.exception())
+        else:
+            return
+
+        try:
+            estado = dict(self.estados[id_trabajo])
+            if estado['estado'] not in ['terminado', 'fallido']:
+                estado.update(estado='fallido', error=error, terminado=datetime.now().isoformat())
+                self.estados[id_trabajo] = estado
+        except (EOFError, BrokenPipeError, ConnectionError):
+            # La cola ya se cerró
+            pass
+
+    def estado(self, id_trabajo: str) -> dict:
+
+        if id_trabajo not in self.estados.keys():
+            return None
+
+        return dict(self.estados[id_trabajo])
+
+    def listar(self) -> list:
+        return sorted([dict(estado) for estado in self.estados.values()], key=lambda x: x['creado'])
+
+    def reporte(self, id_trabajo: str, nombre: str) -> str:
+
+        # Ruta de un reporte terminado, solo de los que escribió el trabajo
+        estado = self.estado(id_trabajo)
+        if estado is None or nombre not in estado['reportes']:
+            return None
+
+        return os.path.join(self.directorio, id_trabajo, nombre)
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
@@ -1,8 +1,84 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from src.client.trabajos import ColaTrabajos, PROCESOS_TRABAJOS
+from src.client.motores import MOTORES
+from src.client.salida_reportes import FORMATOS_SALIDA
+from src.client.agregacion import NIVELES_AGREGACION
 
-app = FastAPI()
+
+# Directorio donde cada trabajo guarda el archivo subido y sus reportes
+DIRECTORIO_TRABAJOS = 'trabajos'
+
+DESPACHOS = ['heuristica', 'flujo']
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    # La cola de trabajos vive lo mismo que el servidor
+    app.state.cola = ColaTrabajos(directorio=DIRECTORIO_TRABAJOS, procesos=PROCESOS_TRABAJOS)
+    yield
+    app.state.cola.cerrar()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _validar_opcion(nombre: str, valor, opciones: list):
+    if valor is not None and valor not in opciones:
+        raise HTTPException(status_code=422, detail=f"{nombre} debe ser uno de {opciones}")
 
 
 @app.get("/")
 async def root():
-    return {"message": "Hello World"}
\ No newline at end of file
+    return {"message": "Hello World"}
+
+
+@app.post("/trabajos")
+async def crear_trabajo(archivo: UploadFile = File(...), despacho: str = 'heuristica', motor: str = 'cbc',
+                        tiempo_limite: float = 300, gap: float = 0.00005, agregacion: str = None,
+                        formato: str = 'csv'):
+
+    # Encola la optimización del libro subido y responde de inmediato con el id del trabajo
+    _validar_opcion('despacho', despacho, DESPACHOS)
+    _validar_opcion('motor', motor, MOTORES)
+    _validar_opcion('agregacion', agregacion, NIVELES_AGREGACION)
+    _validar_opcion('formato', formato, FORMATOS_SALIDA)
+
+    contenido = await archivo.read()
+
+    id_trabajo = app.state.cola.encolar(archivo.filename, contenido, despacho=despacho, motor=motor,
+                                        tiempo_limite=tiempo_limite, gap=gap, agregacion=agregacion,
+                                        formato=formato)
+
+    return {"id": id_trabajo}
+
+
+@app.get("/trabajos")
+async def listar_trabajos():
+    return app.state.cola.listar()
+
+
+@app.get("/trabajos/{id_trabajo}")
+async def estado_trabajo(id_trabajo: str):
+
+    # Estado del trabajo y de cada una de sus fases
+    estado = app.state.cola.estado(id_trabajo)
+
+    if estado is None:
+        raise HTTPException(status_code=404, detail=f"El trabajo {id_trabajo} no existe")
+
+    return estado
+
+
+@app.get("/trabajos/{id_trabajo}/reportes/{nombre}")
+async def descargar_reporte(id_trabajo: str, nombre: str):
+
+    # Solo se entregan los archivos que el trabajo reportó como suyos
+    ruta = app.state.cola.reporte(id_trabajo, nombre)
+
+    if ruta is None:
+        raise HTTPException(status_code=404, detail=f"El trabajo {id_trabajo} no tiene el reporte {nombre}")
+
+    return FileResponse(ruta, filename=nombre)
@@ -5,7 +5,7 @@ Created on Mon Aug 26 06:57:03 2024
 @author: luisf
 """
 import pulp as pu
-import os
+from src.client.motores import ConfiguracionSolver, crear_motor_pulp
 
 class MinCostoTotal():
     
@@ -250,31 +250,16 @@ class MinCostoTotal():
         
     
     
-    def solve(self):
+    def solve(self, configuracion: ConfiguracionSolver = None):
         
-        # Cantidad CPU habilitadas para trabajar
-        cpu_count = max(1, os.cpu_count()-1)
-        
-
-        
-        t_limit_minutes = 25
+        if configuracion is None:
+            configuracion = ConfiguracionSolver(gap_relativo=0.05,
+                                                arranque_en_caliente=True)
 
-        print('cpu count', cpu_count)
-        print('t_limit_minutes ', t_limit_minutes, "/", t_limit_minutes*60,"seconds")
-        
-        engine_glpk = pu.GLPK_CMD(
-            mip=True,
-            # timeLimit=60*t_limit_minutes,
-            options=["--mipgap", "0.05"]
-        )
-        
-        engine_cbc = pu.PULP_CBC_CMD(
-            # timeLimit=60*t_limit_minutes,
-            gapRel=0.05,
-            warmStart=True,
-            threads=cpu_count)
+        print('cpu count', configuracion.hilos)
+        print('tiempo limite', configuracion.tiempo_limite, "seconds")
         
-        self.model.solve(solver=engine_cbc)
+        self.model.solve(solver=crear_motor_pulp(configuracion))
 
 
     def report_inventario_planta(self):
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from src.client.agregacion import ImportacionesAgregadas
+
+
+CAP_CAMION = 34000
+
+
+def _arreglos(semilla: int, I=6, P=3, T=12, K=3) -> SimpleNamespace:
+
+    # Arreglos mínimos de ProblemaArreglos con dos ingredientes en dos puertos
+    rng = np.random.default_rng(semilla)
+
+    codigo_ingrediente = np.arange(I) % 2
+    importaciones_df = pd.DataFrame({'codigo_ingrediente': codigo_ingrediente,
+                                     'codigo_puerto': (np.arange(I)//2) % 2})
+
+    llegadas = np.zeros((I, T), dtype=np.float64)
+    llegadas[np.arange(I), rng.integers(0, T, I)] = rng.integers(0, 20*CAP_CAMION, I)
+
+    return SimpleNamespace(importaciones_df=importaciones_df,
+                           ingrediente=codigo_ingrediente.astype(np.int32),
+                           ingredientes=['maiz', 'soya'],
+                           plantas=[f"p{p}" for p in range(P)],
+                           cap_camion=CAP_CAMION,
+                           periodos=T,
+                           factible=np.ones((I, P), dtype=bool),
+                           inventario_inicial=rng.integers(0, 5*CAP_CAMION, I).astype(np.float64),
+                           llegadas=llegadas,
+                           costo_despacho_camion=rng.uniform(1000, 5000, (I, P, T)),
+                           despachos=np.zeros((I, P, T, K), dtype=np.int64))
+
+
+def _despachos_agregados(agregadas: ImportacionesAgregadas, semilla: int) -> np.ndarray:
+
+    # Camiones al azar que respetan el inventario de cada importación agregada, como el modelo
+    rng = np.random.default_rng(semilla)
+
+    G, P, T = len(agregadas.miembros), len(agregadas.plantas), agregadas.periodos
+    disponibles = (agregadas.inventario_inicial[:, None] + np.cumsum(agregadas.llegadas, axis=1))/CAP_CAMION
+
+    despachos = np.zeros((G, P, T), dtype=np.int64)
+    for g in range(G):
+        usados = 0
+        for t in range(T):
+            for p in range(P):
+                camiones = int(rng.integers(0, int(disponibles[g, t]) - usados + 1))
+                despachos[g, p, t] = camiones
+                usados += camiones
+
+    return despachos
+
+
+@pytest.mark.parametrize('nivel', ['ingrediente', 'puerto'])
+@pytest.mark.parametrize('semilla', range(20))
+def test_desagregar_no_deja_inventario_negativo(nivel, semilla):
+
+    arreglos = _arreglos(semilla)
+    agregadas = ImportacionesAgregadas(arreglos, nivel)
+    despachos = _despachos_agregados(agregadas, semilla)
+
+    resultado = agregadas.desagregar(despachos)
+
+    # Cada camion del modelo agregado sale de alguna de sus importaciones
+    por_grupo = np.zeros(despachos.shape, dtype=np.int64)
+    np.add.at(por_grupo, agregadas.grupo_importacion, resultado)
+    assert (por_grupo == despachos).all()
+
+    # Ninguna importación real despacha más de lo que tiene en puerto en ningún periodo
+    entradas = arreglos.llegadas.copy()
+    entradas[:, 0] += arreglos.inventario_inicial
+    inventario = np.cumsum(entradas - CAP_CAMION*resultado.sum(axis=1), axis=1)
+    assert (inventario >= 0).all()
+
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_agregado_no_promete_mas_camiones_que_sus_importaciones(semilla):
+
+    arreglos = _arreglos(semilla)
+    agregadas = ImportacionesAgregadas(arreglos, 'ingrediente')
+
+    # El inventario del agregado son camiones completos que sus importaciones pueden despachar
+    inventario = agregadas.inventario_inicial[:, None] + np.cumsum(agregadas.llegadas, axis=1)
+
+    entradas = arreglos.llegadas.copy()
+    entradas[:, 0] += arreglos.inventario_inicial
+    reales = np.zeros(inventario.shape)
+    np.add.at(reales, agregadas.grupo_importacion, np.cumsum(entradas, axis=1))
+
+    assert (inventario % CAP_CAMION == 0).all()
+    assert (inventario <= reales).all()
+    assert (np.diff(inventario, axis=1) >= 0).all()
+
+
+def test_desagregar_falla_si_el_agregado_no_tiene_camiones():
+
+    arreglos = _arreglos(0)
+    agregadas = ImportacionesAgregadas(arreglos, 'ingrediente')
+
+    despachos = np.zeros((len(agregadas.miembros), len(agregadas.plantas), agregadas.periodos), dtype=np.int64)
+    despachos[0, 0, 0] = int(agregadas.camiones[agregadas.miembros[0], -1].sum()) + 1
+
+    with pytest.raises(Exception):
+        agregadas.desagregar(despachos)
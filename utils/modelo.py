@@ -14,7 +14,8 @@ from utils.problema_matrix import obtener_matriz_plantas
 from utils.problema_matrix import obtener_matriz_importaciones
 from utils.problema_matrix import validacion_eliminar_cargas_sin_inventario
 from utils.problema_matrix import validacion_eliminar_ingredientes_sin_consumo
-import os
+from src.client.lector_libro import abrir_libro
+from src.client.motores import ConfiguracionSolver, crear_motor_pulp
 from tqdm import tqdm
 from datetime import timedelta
 import math
@@ -714,7 +715,10 @@ def generar_modelo(bios_input_file: str, reducido=False):
 
     variables = dict()
 
-    dataframes = leer_archivo(bios_input_file=bios_input_file)
+    # Leer el archivo una sola vez para todas las consultas
+    libro = abrir_libro(bios_input_file)
+
+    dataframes = leer_archivo(bios_input_file=libro)
 
     periodos = __generar_periodos(dataframes)
 
@@ -730,7 +734,7 @@ def generar_modelo(bios_input_file: str, reducido=False):
 
         totalizar_costos_almacenamiento(dataframes)
 
-    estadisticas = obtener_objetivo_inventario(bios_input_file)
+    estadisticas = obtener_objetivo_inventario(libro)
 
     plantas_df = obtener_matriz_plantas(dataframes, periodos, estadisticas)
 
@@ -757,10 +761,10 @@ def generar_modelo(bios_input_file: str, reducido=False):
     return plantas_df, cargas_df, estadisticas, periodos, variables, validation_list
 
 
-def resolver_modelo(variables: dict, periodos: list, cargas_df: pd.DataFrame, plantas_df: pd.DataFrame):
+def resolver_modelo(variables: dict, periodos: list, cargas_df: pd.DataFrame, plantas_df: pd.DataFrame, configuracion: ConfiguracionSolver = None):
 
-    # Cantidad CPU habilitadas para trabajar
-    cpu_count = max(1, os.cpu_count()-1)
+    if configuracion is None:
+        configuracion = ConfiguracionSolver(arranque_en_caliente=False)
 
     # Gap en millones de pesos
     gap = 5000000
@@ -812,17 +816,8 @@ def resolver_modelo(variables: dict, periodos: list, cargas_df: pd.DataFrame, pl
         problema += rest
     """
 
-    engine = pu.PULP_CBC_CMD(
-        # timeLimit=300,
-        # gapAbs=gap,
-        # gapRel=0.01,
-        # warmStart=True,
-        # cuts=True,
-        # presolve=True,
-        threads=cpu_count)
-
     print('Resolviendo fase 1: balances de inventario')
-    problema.solve(solver=engine)
+    problema.solve(solver=crear_motor_pulp(configuracion))
     print('fin fase 1')
 
 
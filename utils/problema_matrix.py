@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-from utils.asignador_capacidad import AsignadorCapacidad
-from utils.objetivo_inventario import obtener_objetivo_inventario
+from bios_utils.asignador_capacidad import AsignadorCapacidad
+from src.client.lector_libro import abrir_libro
+from bios_utils.objetivo_inventario import obtener_objetivo_inventario
 from tqdm import tqdm
 from datetime import datetime, timedelta
 
@@ -39,13 +40,15 @@ def leer_archivo(bios_input_file: str) -> dict:
 
     data_frames = dict()
 
-    asignador = AsignadorCapacidad(bios_input_file)
+    # Abrir el libro una sola vez y compartir las hojas con el asignador
+    libro = abrir_libro(bios_input_file)
+
+    asignador = AsignadorCapacidad(libro)
 
     data_frames['unidades_almacenamiento_df'] = asignador.obtener_unidades_almacenamiento()
 
     for sheet in tqdm(sheets):
-        data_frames[sheet] = pd.read_excel(
-            io=bios_input_file, sheet_name=sheet)
+        data_frames[sheet] = libro.hoja(sheet)
 
     return data_frames
 
@@ -970,11 +973,13 @@ if __name__ == '__main__':
 
     bios_input_file = 'data/0_model_template_2204.xlsm'
 
-    dataframes = leer_archivo(bios_input_file=bios_input_file)
+    libro = abrir_libro(bios_input_file)
+
+    dataframes = leer_archivo(bios_input_file=libro)
 
     periodos = __generar_periodos(dataframes)
 
-    estadisticas = obtener_objetivo_inventario(bios_input_file)
+    estadisticas = obtener_objetivo_inventario(libro)
 
     plantas_df = obtener_matriz_plantas(dataframes, periodos, estadisticas)
 